@@ -1,6 +1,6 @@
 # alpaca_trader.py
 import os
-from alpaca_trade_api.rest import REST # שימוש בספרייה הישנה יותר, כפי שהיה לך
+from rate_limiter import mount_rate_limiter
 from settings import setup_logger, ALPACA_BASE_URL, TRADE_QUANTITY
 
 logger = setup_logger(__name__)
@@ -20,7 +20,9 @@ def trade_stock(symbol: str, decision: str, quantity: int = TRADE_QUANTITY) -> b
     logger.info(f"Attempting to trade {symbol}. Decision: {decision.upper()}, Quantity: {quantity}, URL: {ALPACA_BASE_URL}")
 
     try:
+        from alpaca_trade_api.rest import REST # שימוש בספרייה הישנה יותר, כפי שהיה לך; נטענת רק כששולחים פקודה
         api = REST(key_id=api_key, secret_key=secret_key, base_url=ALPACA_BASE_URL, api_version='v2')
+        mount_rate_limiter(api._session, "alpaca") # ה-session הפנימי של הספרייה עובר דרך מגביל הקצב המשותף
         
         # בדיקת חשבון (אופציונלי, טוב לוודא שהמפתחות תקינים)
         account = api.get_account()
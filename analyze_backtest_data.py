@@ -2,7 +2,7 @@ import pandas as pd
 import numpy as np
 import os
 import logging
-import requests 
+import http_client
 from datetime import datetime 
 
 # --- הגדרות ---
@@ -53,24 +53,7 @@ LOCAL_BACKTEST_CSV_PATH = "downloaded_backtesting_dataset.csv"
 FUTURE_RETURN_DAYS = [1, 2, 3, 5, 10] 
 
 def download_file_from_google_drive(file_id: str, destination: str, file_description: str):
-    # ... (הפונקציה נשארת זהה לקודם) ...
-    logger.info(f"Attempting to download {file_description} from Google Drive (ID: {file_id}) to {destination}...")
-    url = f"https://drive.google.com/uc?export=download&id={file_id}"
-    try:
-        response = requests.get(url, stream=True, timeout=180) 
-        response.raise_for_status()
-        with open(destination, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=81920): 
-                f.write(chunk)
-        download_size_mb = os.path.getsize(destination)/(1024*1024) if os.path.exists(destination) else 0
-        logger.info(f"{file_description} downloaded successfully to {destination} ({download_size_mb:.2f} MB).")
-        return True
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error downloading {file_description}: {e}")
-        return False
-    except Exception as e:
-        logger.error(f"An unexpected error occurred during download of {file_description}: {e}")
-        return False
+    return http_client.download_file_from_google_drive(file_id, destination, file_description, timeout=180)
 
 def run_analysis():
     # הודעת הפתיחה הזו תיכתב גם לקובץ הלוג של הניתוח
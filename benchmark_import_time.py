@@ -0,0 +1,66 @@
+# benchmark_import_time.py
+# מדידת זמן ה-import של main.py (העלות שמשולמת בכל הפעלה של ה-cron) עם python -X importtime, בתהליך חדש בכל פעם.
+# מדפיס את הזמן הכולל, את המודולים הכבדים ביותר, ואילו מודולים "כבדים" אופציונליים נטענו למרות שלא היו צריכים להיטען,
+# ומוסיף שורה לקובץ היסטוריה כדי לעקוב אחרי השינוי לאורך זמן.
+# הערה: "-c import main" ולא "main.py" – הרצת main.py כסקריפט מריצה את כל הבוט.
+# שימוש: python benchmark_import_time.py [module] [runs]
+import csv
+import os
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+
+from settings import REPORTS_BASE_DIR
+
+IMPORT_TIME_HISTORY_CSV = os.path.join(REPORTS_BASE_DIR, "import_time_history.csv")
+TOP_MODULES_TO_SHOW = 15
+# מודולים שאמורים להיטען רק כשהמקור/הפיצ'ר שלהם מאופשר ונמצא בשימוש
+OPTIONAL_HEAVY_MODULES = ["praw", "bs4", "alpaca_trade_api", "smtplib", "investors_scraper", "marketwatch_scraper", "nltk", "vaderSentiment"]
+
+def measure_import(module_name: str) -> dict[str, tuple[int, int]]:
+    """מריץ import של module_name בתהליך חדש ומחזיר name -> (self_us, cumulative_us) לכל מודול שנטען."""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        cwd=script_dir, capture_output=True, text=True, check=True
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+def append_history(module_name: str, runs: int, totals_ms: list[float], heavy_loaded: list[str]):
+    os.makedirs(os.path.dirname(IMPORT_TIME_HISTORY_CSV) or ".", exist_ok=True)
+    write_header = not os.path.exists(IMPORT_TIME_HISTORY_CSV)
+    with open(IMPORT_TIME_HISTORY_CSV, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if write_header:
+            writer.writerow(["datetime", "module", "runs", "median_ms", "min_ms", "optional_heavy_modules_loaded"])
+        writer.writerow([
+            datetime.now().isoformat(timespec="seconds"), module_name, runs,
+            f"{statistics.median(totals_ms):.1f}", f"{min(totals_ms):.1f}", " ".join(heavy_loaded)
+        ])
+
+if __name__ == "__main__":
+    module_name = sys.argv[1] if len(sys.argv) > 1 else "main"
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    all_timings = [measure_import(module_name) for _ in range(runs)]
+    totals_ms = [timings[module_name][1] / 1000 for timings in all_timings]
+    last_timings = all_timings[-1]
+
+    print(f"import {module_name}: median {statistics.median(totals_ms):.1f} ms, min {min(totals_ms):.1f} ms ({runs} runs)")
+    print(f"\nTop {TOP_MODULES_TO_SHOW} modules by cumulative import time (last run):")
+    top_level = [(name, cumulative) for name, (_, cumulative) in last_timings.items() if name != module_name and "." not in name]
+    for name, cumulative_us in sorted(top_level, key=lambda item: item[1], reverse=True)[:TOP_MODULES_TO_SHOW]:
+        print(f"  {name:<30} {cumulative_us / 1000:8.1f} ms")
+
+    heavy_loaded = [name for name in OPTIONAL_HEAVY_MODULES if name in last_timings]
+    print(f"\nOptional heavy modules loaded at import: {', '.join(heavy_loaded) if heavy_loaded else 'none'}")
+
+    append_history(module_name, runs, totals_ms, heavy_loaded)
+    print(f"Appended result to {IMPORT_TIME_HISTORY_CSV}")
@@ -0,0 +1,67 @@
+# benchmark_vader_engine.py
+# השוואת המנוע הווקטורי (vader_engine.py) למימוש המקורי של VADER: קצב (טקסטים לשנייה) והפרש בציוני ה-compound.
+# שימוש:
+#   python benchmark_vader_engine.py                      – קורפוס סינתטי (כותרות קצרות ופוסטים ארוכים בסגנון Reddit)
+#   python benchmark_vader_engine.py <csv_path> <column>  – עמודת טקסט מקובץ CSV (למשל קובץ ה-Reddit המעובד)
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+from vader_engine import VectorizedVader, COMPOUND_TOLERANCE
+
+HEADLINE_COUNT = 20000
+POST_COUNT = 3000
+
+def build_synthetic_corpus(analyzer: SentimentIntensityAnalyzer, seed: int = 0) -> dict[str, list[str]]:
+    rng = random.Random(seed)
+    lexicon_words = list(analyzer.lexicon)
+    filler = ["the", "stock", "shares", "market", "earnings", "guidance", "quarter", "AAPL", "TSLA", "$NVDA", "today",
+              "not", "very", "extremely", "but", "never", "kind of", "without doubt", "least", "so", "!!", "?", ":)", "LOL"]
+
+    def make_text(min_words: int, max_words: int) -> str:
+        words = []
+        for _ in range(rng.randint(min_words, max_words)):
+            word = rng.choice(lexicon_words) if rng.random() < 0.3 else rng.choice(filler)
+            words.append(word.upper() if rng.random() < 0.05 else word)
+        return " ".join(words) + rng.choice(["", ".", "!", "?", "!!!"])
+
+    return {
+        "headlines": [make_text(5, 15) for _ in range(HEADLINE_COUNT)],
+        "reddit_posts": [make_text(40, 250) for _ in range(POST_COUNT)],
+    }
+
+def run_benchmark(name: str, texts: list[str], analyzer: SentimentIntensityAnalyzer, engine: VectorizedVader):
+    start = time.perf_counter()
+    reference_scores = np.array([analyzer.polarity_scores(text)["compound"] for text in texts])
+    reference_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    engine_scores = engine.compound_scores(texts)
+    engine_seconds = time.perf_counter() - start
+
+    diff = np.abs(engine_scores - reference_scores)
+    print(f"\n--- {name}: {len(texts)} texts ---")
+    print(f"Reference VADER:   {reference_seconds:.2f}s ({len(texts) / reference_seconds:,.0f} texts/sec)")
+    print(f"Vectorized engine: {engine_seconds:.2f}s ({len(texts) / engine_seconds:,.0f} texts/sec)")
+    print(f"Speedup: x{reference_seconds / engine_seconds:.1f}")
+    print(f"Max abs diff: {diff.max() if len(diff) else 0.0:.6f}")
+    print(f"Exact: {np.mean(diff == 0):.2%}, within tolerance ({COMPOUND_TOLERANCE}): {np.mean(diff <= COMPOUND_TOLERANCE):.2%}")
+
+if __name__ == "__main__":
+    analyzer = SentimentIntensityAnalyzer()
+    # הבנייה (קומפילציית הלקסיקון) נמדדת בנפרד – היא חד-פעמית לתהליך
+    start = time.perf_counter()
+    engine = VectorizedVader(analyzer)
+    print(f"Engine build time: {time.perf_counter() - start:.3f}s")
+
+    if len(sys.argv) > 2:
+        csv_path, column = sys.argv[1], sys.argv[2]
+        texts = pd.read_csv(csv_path, usecols=[column])[column].dropna().astype(str).tolist()
+        run_benchmark(f"{csv_path}:{column}", texts, analyzer, engine)
+    else:
+        for corpus_name, texts in build_synthetic_corpus(analyzer).items():
+            run_benchmark(corpus_name, texts, analyzer, engine)
@@ -1,86 +1,105 @@
 # cnbc_scraper.py
 import feedparser
-import socket
+import threading
+from functools import lru_cache
 from settings import setup_logger, MIN_HEADLINE_LENGTH
+from keyword_matcher import KeywordMatcher
+from http_cache import fetch_url
+from symbol_names import KEYWORDS_BY_SYMBOL
 
 logger = setup_logger(__name__)
 
-KEYWORDS_BY_SYMBOL = {
-    "TSLA": ["Tesla", "Elon Musk", "TSLA"],
-    "NVDA": ["Nvidia", "Jensen Huang", "NVDA", "GPU"],
-    "AAPL": ["Apple", "AAPL", "iPhone", "MacBook", "iPad", "Tim Cook"],
-    "MSFT": ["Microsoft", "MSFT", "Azure", "Windows", "Satya Nadella", "OpenAI"],
-    "META": ["Meta", "Facebook", "META", "Instagram", "WhatsApp", "Zuckerberg"],
-    "AMZN": ["Amazon", "AMZN", "AWS", "Bezos", "Prime"],
-    "GOOGL": ["Google", "Alphabet", "GOOGL", "GOOG", "Android", "Search", "Sundar Pichai", "Waymo"],
-    "GOOG": ["Google", "Alphabet", "GOOG", "Android", "Search", "Sundar Pichai", "Waymo"],
-    "PFE": ["Pfizer", "PFE", "BioNTech"],
-    "XOM": ["Exxon", "ExxonMobil", "XOM", "oil", "gas"],
-    "JPM": ["JPMorgan", "JPM", "Jamie Dimon", "Chase"],
-    "DIS": ["Disney", "DIS", "Disney+", "ESPN", "parks"],
-    "WMT": ["Walmart", "WMT", "retail"],
-    "GME": ["GameStop", "GME", "Gamestop"],
-    "AMC": ["AMC", "AMC Entertainment"],
-    "PLTR": ["Palantir", "PLTR"],
-    "COIN": ["Coinbase", "COIN", "crypto"],
-    "MSTR": ["MicroStrategy", "MSTR", "Saylor", "Bitcoin"],
-    "BYND": ["Beyond Meat", "BYND"],
-    "RIVN": ["Rivian", "RIVN"],
-    "AFRM": ["Affirm", "AFRM"],
-    "SOFI": ["SoFi", "SOFI"],
-    "BB": ["BlackBerry", "BB"],
-    "BBBYQ": ["Bed Bath", "BBBYQ"],
-    "NIO": ["NIO Inc", "NIO"],
-    "LCID": ["Lucid", "Lucid Motors", "LCID"],
-    "NKLA": ["Nikola", "NKLA"],
-    "SNAP": ["Snap", "Snapchat", "SNAP"],
-}
+CNBC_REQUEST_TIMEOUT_SECONDS = 15
 
-def get_cnbc_titles(symbol: str, cnbc_general_rss_url: str, max_feed_items_to_scan: int = 50) -> list[tuple[str, str]]:
-    source_name = "CNBC"
-    symbol_upper = symbol.upper()
-    keywords_for_symbol = KEYWORDS_BY_SYMBOL.get(symbol_upper, [symbol_upper]) 
-    headlines = []
+# --- Snapshot של הפיד הכללי לכל ריצה ---
+# ה-URL של CNBC זהה לכל הסמלים, ולכן מורידים ומפענחים אותו פעם אחת בריצה ומנתבים כל כותרת לכל הסמלים שהיא מזכירה.
+_feed_snapshots = {}
+_feed_snapshots_lock = threading.Lock()
 
-    if not cnbc_general_rss_url:
-        logger.error(f"CNBC general RSS URL not provided. Cannot fetch news for {symbol_upper}.")
-        return []
+def reset_cnbc_feed_snapshot():
+    """מנקה את ה-snapshot של הפיד (נקרא בתחילת כל ריצה של main.py)."""
+    with _feed_snapshots_lock:
+        _feed_snapshots.clear()
+
+def get_cnbc_feed_snapshot(cnbc_general_rss_url: str, max_feed_items_to_scan: int = 50) -> list[str] | None:
+    """
+    מחזיר את רשימת הכותרות התקינות (באורך MIN_HEADLINE_LENGTH לפחות) מתוך max_feed_items_to_scan הפריטים הראשונים בפיד.
+    הפיד יורד פעם אחת לכל (URL, max_feed_items_to_scan) בריצה; קריאות מקבילות ממתינות להורדה הראשונה.
+    מחזיר None אם ההורדה/הפענוח נכשלו (וגם הכישלון נשמר עד סוף הריצה, כדי לא לחזור עליו לכל סמל).
+    """
+    snapshot_key = (cnbc_general_rss_url, max_feed_items_to_scan)
+    with _feed_snapshots_lock:
+        if snapshot_key in _feed_snapshots:
+            return _feed_snapshots[snapshot_key]
+        titles = _download_feed_titles(cnbc_general_rss_url, max_feed_items_to_scan)
+        _feed_snapshots[snapshot_key] = titles
+        return titles
 
-    logger.info(f"Fetching news for '{symbol_upper}' from {source_name} using keywords: {keywords_for_symbol} (Scanning up to {max_feed_items_to_scan} feed items from {cnbc_general_rss_url})")
+def _download_feed_titles(cnbc_general_rss_url: str, max_feed_items_to_scan: int) -> list[str] | None:
+    source_name = "CNBC"
+    logger.info(f"Downloading general {source_name} RSS feed once for this run (Scanning up to {max_feed_items_to_scan} feed items from {cnbc_general_rss_url})")
 
-    original_timeout = socket.getdefaulttimeout()
-    socket.setdefaulttimeout(15)
     try:
-        feed = feedparser.parse(cnbc_general_rss_url)
+        response = fetch_url(cnbc_general_rss_url, timeout=CNBC_REQUEST_TIMEOUT_SECONDS)
+        feed = feedparser.parse(response.body, response_headers=response.headers)
 
         if feed.bozo:
             bozo_reason = feed.get("bozo_exception", "Unknown parsing error")
             logger.warning(f"Failed to parse RSS feed from {source_name}. Reason: {bozo_reason} (URL: {cnbc_general_rss_url})")
-            return []
+            return None
         
         if not feed.entries:
             logger.info(f"No entries found in general RSS feed from {source_name}. (URL: {cnbc_general_rss_url})")
             return []
 
-        logger.debug(f"Scanning {len(feed.entries)} total entries from {source_name} for '{symbol_upper}' (limit scan to {max_feed_items_to_scan})...")
-        
-        relevant_headlines_count = 0
+        titles = []
         for entry in feed.entries[:max_feed_items_to_scan]:  
             title = entry.get("title", "").strip()
-            
-            if not title or len(title) < MIN_HEADLINE_LENGTH: 
-                continue
-
-            if any(keyword.lower() in title.lower() for keyword in keywords_for_symbol):
-                headlines.append((title, source_name))
-                relevant_headlines_count += 1
-                logger.debug(f"    Found relevant title for '{symbol_upper}': '{title}'")
-        
-        logger.info(f"Found {len(headlines)} relevant headlines for '{symbol_upper}' from {source_name} (scanned up to {max_feed_items_to_scan} feed items).")
+            if title and len(title) >= MIN_HEADLINE_LENGTH: 
+                titles.append(title)
+        logger.info(f"Loaded {len(titles)} valid titles from {source_name} feed snapshot ({len(feed.entries)} total entries).")
+        return titles
 
     except Exception as e:
-        logger.error(f"An unexpected error occurred in {source_name} scraper for '{symbol_upper}': {e} (URL: {cnbc_general_rss_url})", exc_info=True)
-    finally:
-        socket.setdefaulttimeout(original_timeout)
+        logger.error(f"An unexpected error occurred while downloading the {source_name} feed: {e} (URL: {cnbc_general_rss_url})", exc_info=True)
+        return None
+
+@lru_cache(maxsize=32)
+def _get_keyword_matcher(symbols: tuple[str, ...]) -> KeywordMatcher:
+    return KeywordMatcher({symbol: KEYWORDS_BY_SYMBOL.get(symbol, [symbol]) for symbol in symbols})
 
-    return headlines
+def route_cnbc_headlines(symbols: list[str], cnbc_general_rss_url: str, max_feed_items_to_scan: int = 50) -> dict[str, list[tuple[str, str]]]:
+    """
+    מעבר אחד על ה-snapshot של הפיד: כל כותרת מנותבת לכל הסמלים שמילות המפתח שלהם (KEYWORDS_BY_SYMBOL) מופיעות בה.
+    מחזיר מילון symbol -> רשימת (title, "CNBC") לפי סדר הפיד.
+    """
+    source_name = "CNBC"
+    symbols_upper = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+    headlines_by_symbol = {symbol: [] for symbol in symbols_upper}
+
+    if not cnbc_general_rss_url:
+        logger.error(f"CNBC general RSS URL not provided. Cannot fetch news for {', '.join(symbols_upper)}.")
+        return headlines_by_symbol
+
+    feed_titles = get_cnbc_feed_snapshot(cnbc_general_rss_url, max_feed_items_to_scan)
+    if not feed_titles:
+        return headlines_by_symbol
+
+    matcher = _get_keyword_matcher(tuple(symbols_upper))
+    for title in feed_titles:
+        for symbol in matcher.find_labels(title):
+            headlines_by_symbol[symbol].append((title, source_name))
+            logger.debug("    Found relevant title for '%s': '%s'", symbol, title)
+
+    for symbol in symbols_upper:
+        logger.info(f"Found {len(headlines_by_symbol[symbol])} relevant headlines for '{symbol}' from {source_name} (scanned up to {max_feed_items_to_scan} feed items).")
+    return headlines_by_symbol
+
+def get_cnbc_titles_for_symbols(symbols: list[str], cnbc_general_rss_url: str, max_feed_items_to_scan: int = 50) -> dict[str, list[tuple[str, str]]]:
+    headlines_by_symbol_upper = route_cnbc_headlines(symbols, cnbc_general_rss_url, max_feed_items_to_scan)
+    return {symbol: headlines_by_symbol_upper.get(symbol.upper(), []) for symbol in symbols}
+
+def get_cnbc_titles(symbol: str, cnbc_general_rss_url: str, max_feed_items_to_scan: int = 50) -> list[tuple[str, str]]:
+    symbol_upper = symbol.upper()
+    logger.info(f"Fetching news for '{symbol_upper}' from CNBC using keywords: {KEYWORDS_BY_SYMBOL.get(symbol_upper, [symbol_upper])}")
+    return route_cnbc_headlines([symbol_upper], cnbc_general_rss_url, max_feed_items_to_scan)[symbol_upper]
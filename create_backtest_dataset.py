@@ -1,17 +1,20 @@
 import pandas as pd
 import os
 import logging
+import multiprocessing
 from datetime import datetime, timedelta
 from pandas.tseries.offsets import BDay 
 import numpy as np 
-import requests 
+import http_client
 
 # --- הגדרות ---
 EMAIL_SENDER_AVAILABLE = False
 SENTIMENT_ANALYZER_AVAILABLE = False
+BACKTEST_SENTIMENT_WORKERS = 0
+BACKTEST_SENTIMENT_CHUNK_SIZE = 200
 try:
     from email_sender import send_email
-    from settings import setup_logger
+    from settings import setup_logger, BACKTEST_SENTIMENT_WORKERS, BACKTEST_SENTIMENT_CHUNK_SIZE
     EMAIL_SENDER_AVAILABLE = True
     logger = setup_logger("CreateBacktestDataset", level=logging.INFO)
 except ImportError:
@@ -20,12 +23,15 @@ except ImportError:
     logger.warning("Could not import from email_sender or settings. Email/advanced logging functionality may be limited.")
 
 try:
-    from sentiment_analyzer import analyze_sentiment 
+    from sentiment_analyzer import analyze_sentiments, load_sentiment_backend
+    from sentiment_cache import get_sentiment_cache
     SENTIMENT_ANALYZER_AVAILABLE = True
     logger.info("Sentiment analyzer imported successfully.")
 except ImportError:
-    logger.error("Could not import 'analyze_sentiment' from sentiment_analyzer.py. Sentiment analysis will assign default scores.")
-    def analyze_sentiment(text, source_name=None): return 0.0 
+    logger.error("Could not import 'analyze_sentiments' from sentiment_analyzer.py. Sentiment analysis will assign default scores.")
+    def analyze_sentiments(texts, sources=None): return np.zeros(len(texts))
+    def get_sentiment_cache(): return None
+    def load_sentiment_backend(): return None
 
 # --- קישורים לקבצים ב-Google Drive (מעודכנים לפי מה ששלחת) ---
 # קובץ מחירי המניות ההיסטוריים
@@ -44,24 +50,17 @@ FINAL_BACKTEST_DATASET_CSV = f"backtesting_dataset_v1_{datetime.now().strftime('
 # --- פרמטרים לחישוב תשואות עתידיות ---
 FUTURE_RETURN_DAYS = [1, 2, 3, 5, 10] 
 
+# עמודות הרדיט שעוברות לקובץ הסופי (אם קיימות בקובץ המעובד – הצבירות הפוסט-פוסט והטקסט המאוחד הן אופציונליות)
+REDDIT_COLUMNS_TO_MERGE = [
+    'Date', 'Ticker', 'avg_daily_reddit_sentiment',
+    'score_weighted_daily_reddit_sentiment', 'std_daily_reddit_sentiment', 'num_scored_posts_today',
+    'positive_posts_ratio_today', 'negative_posts_ratio_today',
+    'num_relevant_posts_today', 'avg_score_today',
+    'avg_num_comments_today', 'combined_reddit_text_for_day'
+]
+
 def download_file_from_google_drive(file_id: str, destination: str, file_description: str):
-    logger.info(f"Attempting to download {file_description} from Google Drive (ID: {file_id}) to {destination}...")
-    url = f"https://drive.google.com/uc?export=download&id={file_id}"
-    try:
-        response = requests.get(url, stream=True, timeout=120) 
-        response.raise_for_status()
-        with open(destination, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=81920): 
-                f.write(chunk)
-        download_size_mb = os.path.getsize(destination)/(1024*1024) if os.path.exists(destination) else 0
-        logger.info(f"{file_description} downloaded successfully to {destination} ({download_size_mb:.2f} MB).")
-        return True
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error downloading {file_description}: {e}")
-        return False
-    except Exception as e:
-        logger.error(f"An unexpected error occurred during download of {file_description}: {e}")
-        return False
+    return http_client.download_file_from_google_drive(file_id, destination, file_description, timeout=120)
 
 def load_and_prepare_reddit_data(filepath: str) -> pd.DataFrame:
     logger.info(f"Loading processed Reddit data from: {filepath}")
@@ -71,13 +70,18 @@ def load_and_prepare_reddit_data(filepath: str) -> pd.DataFrame:
     try:
         df = pd.read_csv(filepath)
         df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-        required_cols = ['Date', 'Ticker', 'combined_reddit_text_for_day', 'num_relevant_posts_today', 'avg_score_today', 'avg_num_comments_today']
+        required_cols = ['Date', 'Ticker', 'num_relevant_posts_today', 'avg_score_today', 'avg_num_comments_today']
         missing_cols = [col for col in required_cols if col not in df.columns]
         if missing_cols:
             logger.error(f"Missing required columns in Reddit data: {missing_cols}. Cannot proceed.")
             return pd.DataFrame()
-            
-        df.dropna(subset=['Date', 'Ticker', 'combined_reddit_text_for_day'], inplace=True)
+        # קבצים חדשים של process_reddit_data.py כבר מכילים צבירות סנטימנט יומיות (פוסט-פוסט); בקבצים ישנים יש רק את הטקסט המאוחד
+        sentiment_col = 'avg_daily_reddit_sentiment' if 'avg_daily_reddit_sentiment' in df.columns else 'combined_reddit_text_for_day'
+        if sentiment_col not in df.columns:
+            logger.error("Reddit data has neither daily sentiment aggregates nor 'combined_reddit_text_for_day'. Cannot proceed.")
+            return pd.DataFrame()
+
+        df.dropna(subset=['Date', 'Ticker', sentiment_col], inplace=True)
         logger.info(f"Loaded {len(df)} valid rows from processed Reddit data.")
         return df
     except Exception as e:
@@ -105,7 +109,49 @@ def load_and_prepare_price_data(filepath: str) -> pd.DataFrame:
         logger.error(f"Error loading historical price data from {filepath}: {e}", exc_info=True)
         return pd.DataFrame()
 
+# הטקסטים לניקוד מקבילי – נקבעים לפני יצירת ה-pool ועוברים ל-workers דרך fork (כמו מנוע הסנטימנט והלקסיקון שנטענו מראש),
+# כך שכל worker מקבל רק את גבולות ה-chunk ולא את הטקסטים עצמם
+_texts_for_workers = []
+
+def _score_text_chunk(bounds: tuple[int, int]) -> np.ndarray:
+    start, end = bounds
+    scores = analyze_sentiments(_texts_for_workers[start:end], "Reddit_Combined")
+    cache = get_sentiment_cache()
+    if cache is not None:
+        cache.flush() # תהליכי ה-pool יוצאים בלי atexit, לכן כל worker כותב את הציונים החדשים שלו בעצמו
+    return scores
+
+def score_texts_in_parallel(texts: list[str], workers: int = BACKTEST_SENTIMENT_WORKERS, chunk_size: int = BACKTEST_SENTIMENT_CHUNK_SIZE) -> np.ndarray:
+    """
+    ניקוד הטקסטים ב-pool של תהליכים: הרשימה מחולקת ל-chunks של chunk_size שורות, והתוצאות חוזרות בסדר המקורי.
+    workers=0 – מספר הליבות. אם יש worker אחד, chunk אחד, או שאין fork במערכת – ניקוד סדרתי באותו תהליך.
+    """
+    global _texts_for_workers
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    chunk_bounds = [(start, min(start + chunk_size, len(texts))) for start in range(0, len(texts), chunk_size)]
+    workers = min(workers, len(chunk_bounds))
+    if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        return analyze_sentiments(texts, "Reddit_Combined")
+
+    logger.info(f"Scoring {len(texts)} texts with {workers} worker processes ({len(chunk_bounds)} chunks of up to {chunk_size} rows)...")
+    load_sentiment_backend() # טעינה אחת בתהליך הראשי, לפני ה-fork
+    cache = get_sentiment_cache()
+    if cache is not None:
+        cache.flush() # שה-workers לא יירשו ויכתבו שוב ציונים שעוד לא נשמרו
+    _texts_for_workers = texts
+    try:
+        with multiprocessing.get_context("fork").Pool(processes=workers) as pool:
+            chunk_scores = pool.map(_score_text_chunk, chunk_bounds) # map מחזיר את התוצאות בסדר ה-chunks
+    finally:
+        _texts_for_workers = []
+    return np.concatenate(chunk_scores)
+
 def calculate_sentiment_scores(df_reddit: pd.DataFrame) -> pd.DataFrame:
+    if 'avg_daily_reddit_sentiment' in df_reddit.columns:
+        logger.info(f"Using precomputed per-post daily sentiment aggregates for {len(df_reddit)} Reddit daily records.")
+        return df_reddit
+
     if not SENTIMENT_ANALYZER_AVAILABLE:
         logger.warning("Sentiment analyzer not available. Assigning default sentiment score 0.0.")
         df_reddit['avg_daily_reddit_sentiment'] = 0.0
@@ -117,9 +163,7 @@ def calculate_sentiment_scores(df_reddit: pd.DataFrame) -> pd.DataFrame:
         return df_reddit
 
     logger.info(f"Calculating sentiment scores for {len(df_reddit)} Reddit daily texts...")
-    df_reddit['avg_daily_reddit_sentiment'] = df_reddit['combined_reddit_text_for_day'].apply(
-        lambda text: analyze_sentiment(text=str(text), source_name="Reddit_Combined")
-    )
+    df_reddit['avg_daily_reddit_sentiment'] = score_texts_in_parallel(df_reddit['combined_reddit_text_for_day'].astype(str).tolist())
     logger.info("Finished calculating sentiment scores.")
     return df_reddit
 
@@ -176,11 +220,7 @@ if __name__ == "__main__":
 
     df_reddit_with_sentiment = calculate_sentiment_scores(df_reddit_processed)
     
-    df_reddit_to_merge = df_reddit_with_sentiment[[
-        'Date', 'Ticker', 'avg_daily_reddit_sentiment', 
-        'num_relevant_posts_today', 'avg_score_today', 
-        'avg_num_comments_today', 'combined_reddit_text_for_day'
-    ]].copy()
+    df_reddit_to_merge = df_reddit_with_sentiment[[col for col in REDDIT_COLUMNS_TO_MERGE if col in df_reddit_with_sentiment.columns]].copy()
 
     logger.info("Merging Reddit sentiment data with price data...")
     df_prices_historical['Date'] = pd.to_datetime(df_prices_historical['Date'])
@@ -205,9 +245,7 @@ if __name__ == "__main__":
             final_columns_to_keep = [
                 'Date', 'Ticker', 
                 'Open', 'High', 'Low', 'Close', 'Volume', 'Adj Close', # מחירים מקוריים של יום T
-                'avg_daily_reddit_sentiment', 'num_relevant_posts_today', 
-                'avg_score_today', 'avg_num_comments_today', 'combined_reddit_text_for_day' # נתוני רדיט
-            ]
+            ] + REDDIT_COLUMNS_TO_MERGE[2:] # נתוני רדיט
             # הוסף את עמודות התשואה העתידית שנוצרו
             for days in FUTURE_RETURN_DAYS:
                 final_columns_to_keep.append(f'Entry_Open_T+1B')
@@ -0,0 +1,155 @@
+# http_cache.py
+# Cache על הדיסק לפידי RSS בין ריצות: שומר את ה-body יחד עם ETag/Last-Modified, שולח If-None-Match/If-Modified-Since,
+# ובתשובת 304 מחזיר את התוכן מה-cache בלי להוריד אותו שוב.
+import hashlib
+import json
+import os
+import threading
+import time
+
+from settings import setup_logger, HTTP_CACHE_DIR, HTTP_CACHE_TTL_SECONDS, HTTP_CACHE_MAX_BYTES
+from http_client import http_get
+
+logger = setup_logger(__name__)
+
+_eviction_lock = threading.Lock()
+
+class CachedResponse:
+    """
+    תשובה מ-fetch_url. headers – מילון עם שמות באותיות קטנות (כפי ש-feedparser מצפה).
+    תשובת 304 מוגשת מה-cache באותה צורה כמו תשובה חדשה: ה-scrapers מחזירים את כל הכותרות בכל ריצה (ה-main צריך אותן
+    לממוצע של הריצה), והניקוד החוזר של כותרות שלא השתנו נחסך ב-cache של הסנטימנט (sentiment_cache).
+    """
+    def __init__(self, url: str, body: bytes, status: int, headers: dict):
+        self.url = url
+        self.body = body
+        self.status = status
+        self.headers = headers
+
+def _entry_paths(url: str, cache_dir: str) -> tuple[str, str]:
+    url_hash = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, f"{url_hash}.json"), os.path.join(cache_dir, f"{url_hash}.body")
+
+def _atomic_write(path: str, data: bytes):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _load_entry(url: str, cache_dir: str) -> tuple[dict, bytes] | None:
+    meta_path, body_path = _entry_paths(url, cache_dir)
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(body_path, "rb") as f:
+            body = f.read()
+    except (OSError, ValueError):
+        return None
+    if meta.get("url") != url or meta.get("body_size") != len(body):
+        return None # רשומה חלקית/פגומה – נתעלם ממנה ונוריד מחדש
+    return meta, body
+
+def _store_entry(url: str, cache_dir: str, body: bytes, status: int, headers: dict):
+    etag = headers.get("etag")
+    last_modified = headers.get("last-modified")
+    if not etag and not last_modified:
+        return # אין לשרת דרך לאמת את הרשומה – אין טעם לשמור אותה
+    meta_path, body_path = _entry_paths(url, cache_dir)
+    meta = {
+        "url": url, "status": status, "headers": headers,
+        "etag": etag, "last_modified": last_modified,
+        "validated_at": time.time(), "body_size": len(body),
+    }
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # קודם ה-body ואז ה-meta, כך ש-meta תמיד מתאר body שלם (נבדק דרך body_size)
+        _atomic_write(body_path, body)
+        _atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+    except OSError as e:
+        logger.warning(f"Could not write HTTP cache entry for {url} to {cache_dir}: {e}")
+
+def _touch_entry(url: str, cache_dir: str, meta: dict):
+    meta_path, _ = _entry_paths(url, cache_dir)
+    meta["validated_at"] = time.time()
+    try:
+        _atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+    except OSError as e:
+        logger.warning(f"Could not update HTTP cache entry for {url}: {e}")
+
+def fetch_url(url: str, headers: dict | None = None, timeout: float = 20, cache_dir: str = HTTP_CACHE_DIR) -> CachedResponse:
+    """
+    GET (דרך ה-Session המשותף של http_client) עם Conditional GET מול ה-cache.
+    זורק את החריגה של requests (HTTPError/ConnectionError/Timeout) אם הבקשה נכשלה.
+    """
+    request_headers = dict(headers) if headers else {}
+
+    cached = _load_entry(url, cache_dir)
+    if cached is not None:
+        meta, _ = cached
+        if meta.get("etag"):
+            request_headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            request_headers["If-Modified-Since"] = meta["last_modified"]
+
+    response = http_get(url, headers=request_headers, timeout=timeout)
+    if response.status_code == 304 and cached is not None:
+        meta, body = cached
+        _touch_entry(url, cache_dir, meta)
+        logger.info(f"Not modified since last run (HTTP 304), serving {len(body)} bytes from cache: {url}")
+        return CachedResponse(url, body, meta.get("status", 200), meta.get("headers", {}))
+    response.raise_for_status()
+
+    body = response.content
+    status = response.status_code
+    # requests כבר פתח את ה-gzip, ולכן לא שומרים headers שמתארים את הקידוד של התשובה המקורית
+    response_headers = {
+        key.lower(): value for key, value in response.headers.items()
+        if key.lower() not in ("content-encoding", "content-length", "transfer-encoding", "connection")
+    }
+
+    _store_entry(url, cache_dir, body, status, response_headers)
+    return CachedResponse(url, body, status, response_headers)
+
+def evict_http_cache(cache_dir: str = HTTP_CACHE_DIR, ttl_seconds: int = HTTP_CACHE_TTL_SECONDS, max_bytes: int = HTTP_CACHE_MAX_BYTES) -> int:
+    """
+    מוחק רשומות שלא אומתו מול השרת יותר מ-ttl_seconds, ואז את הרשומות הישנות ביותר עד שהגודל הכולל קטן מ-max_bytes.
+    מחזיר את מספר הרשומות שנמחקו.
+    """
+    if not os.path.isdir(cache_dir):
+        return 0
+
+    with _eviction_lock:
+        entries = []
+        for filename in os.listdir(cache_dir):
+            if not filename.endswith(".json"):
+                continue
+            meta_path = os.path.join(cache_dir, filename)
+            body_path = meta_path[:-len(".json")] + ".body"
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    validated_at = float(json.load(f).get("validated_at", 0))
+                size = os.path.getsize(meta_path) + (os.path.getsize(body_path) if os.path.exists(body_path) else 0)
+            except (OSError, ValueError):
+                validated_at, size = 0.0, 0
+            entries.append((validated_at, size, meta_path, body_path))
+
+        now = time.time()
+        entries.sort() # הישנות ביותר קודם
+        total_bytes = sum(size for _, size, _, _ in entries)
+        evicted = 0
+        for validated_at, size, meta_path, body_path in entries:
+            if now - validated_at <= ttl_seconds and total_bytes <= max_bytes:
+                break
+            for path in (meta_path, body_path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning(f"Could not remove HTTP cache file {path}: {e}")
+            total_bytes -= size
+            evicted += 1
+
+    if evicted:
+        logger.info(f"Evicted {evicted} HTTP cache entries from {cache_dir} (TTL: {ttl_seconds}s, max size: {max_bytes} bytes).")
+    return evicted
@@ -0,0 +1,94 @@
+# http_client.py
+# שכבת HTTP משותפת לכל ה-scrapers וה-downloaders: Session יחיד עם keep-alive (חוסך DNS ו-TLS handshake לכל בקשה לאותו שרת),
+# pool חיבורים לכל שרת, retry עם backoff, ו-User-Agent/עוגיות משותפים. כל בקשה עוברת דרך מגביל הקצב של השירות (rate_limiter).
+import os
+import threading
+from urllib.parse import urlparse
+
+import requests
+from urllib3.util.retry import Retry
+
+from rate_limiter import RateLimitedAdapter
+from settings import (
+    setup_logger, HTTP_USER_AGENT, HTTP_POOL_MAXSIZE_DEFAULT, HTTP_POOL_MAXSIZE_BY_HOST,
+    HTTP_MAX_RETRIES, HTTP_RETRY_BACKOFF_FACTOR
+)
+
+logger = setup_logger(__name__)
+
+DEFAULT_HEADERS = {
+    "User-Agent": HTTP_USER_AGENT,
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+def _build_retry() -> Retry:
+    return Retry(
+        total=HTTP_MAX_RETRIES,
+        backoff_factor=HTTP_RETRY_BACKOFF_FACTOR,
+        status_forcelist=(500, 502, 503, 504), # על 429 ממתין ושולח שוב RateLimitedAdapter, כך שכל ה-threads עוצרים יחד
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        raise_on_status=False, # אחרי הניסיון האחרון מחזירים את התשובה, והקורא מחליט (raise_for_status וכו')
+    )
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+
+    default_adapter = RateLimitedAdapter(pool_connections=len(HTTP_POOL_MAXSIZE_BY_HOST) + 10,
+                                  pool_maxsize=HTTP_POOL_MAXSIZE_DEFAULT, max_retries=_build_retry())
+    session.mount("https://", default_adapter)
+    session.mount("http://", default_adapter)
+    # requests בוחר את ה-adapter עם ה-prefix הארוך ביותר, כך שלשרתים האלה יש pool משלהם
+    for host, pool_maxsize in HTTP_POOL_MAXSIZE_BY_HOST.items():
+        host_adapter = RateLimitedAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=_build_retry())
+        session.mount(f"https://{host}/", host_adapter)
+        session.mount(f"http://{host}/", host_adapter)
+    return session
+
+def get_session() -> requests.Session:
+    """ה-Session המשותף של התהליך (נוצר בשימוש הראשון). requests.Session בטוח לבקשות GET מכמה threads."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+                logger.debug("Created shared HTTP session.")
+    return _session
+
+def set_host_cookies(domain: str, cookies: dict[str, str]):
+    """מגדיר עוגיות ל-domain מסוים ב-Session המשותף, כך שיישלחו רק לשרתים של אותו domain."""
+    session = get_session()
+    for name, value in cookies.items():
+        session.cookies.set(name, value, domain=domain)
+
+def http_get(url: str, headers: dict | None = None, timeout: float = 20, **kwargs) -> requests.Response:
+    """GET דרך ה-Session המשותף. headers מתווספים על ה-headers המשותפים (User-Agent וכו')."""
+    return get_session().get(url, headers=headers, timeout=timeout, **kwargs)
+
+def download_file(url: str, destination: str, file_description: str, timeout: float = 120, chunk_size: int = 81920) -> bool:
+    """הורדת קובץ (בזרימה) ליעד מקומי. מחזיר True בהצלחה, False בכל שגיאה (שנרשמת ללוג)."""
+    logger.info(f"Attempting to download {file_description} from {urlparse(url).hostname} to {destination}...")
+    try:
+        with http_get(url, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            with open(destination, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+        download_size_mb = os.path.getsize(destination)/(1024*1024) if os.path.exists(destination) else 0
+        logger.info(f"{file_description} downloaded successfully to {destination} ({download_size_mb:.2f} MB).")
+        return True
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error downloading {file_description}: {e}")
+        return False
+    except Exception as e:
+        logger.error(f"An unexpected error occurred during download of {file_description}: {e}")
+        return False
+
+def download_file_from_google_drive(file_id: str, destination: str, file_description: str, timeout: float = 120) -> bool:
+    url = f"https://drive.google.com/uc?export=download&id={file_id}"
+    logger.info(f"Google Drive file ID for {file_description}: {file_id}")
+    return download_file(url, destination, file_description, timeout=timeout)
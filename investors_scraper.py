@@ -1,10 +1,12 @@
 # investors_scraper.py
 import feedparser
-import socket
 from settings import setup_logger, MIN_HEADLINE_LENGTH
+from http_cache import fetch_url
 
 logger = setup_logger(__name__) 
 
+INVESTORS_REQUEST_TIMEOUT_SECONDS = 15
+
 def get_investors_news(symbol: str, rss_url_template: str) -> list[tuple[str, str]]:
     source_name = "Investors.com"
     headlines = []
@@ -16,10 +18,9 @@ def get_investors_news(symbol: str, rss_url_template: str) -> list[tuple[str, st
     rss_url = rss_url_template.replace("{symbol}", symbol)
     logger.info(f"Fetching news for '{symbol}' from {source_name} using URL: {rss_url}")
     
-    original_timeout = socket.getdefaulttimeout()
-    socket.setdefaulttimeout(15) # הגדלתי מעט את ה-timeout
     try:
-        feed = feedparser.parse(rss_url) 
+        response = fetch_url(rss_url, timeout=INVESTORS_REQUEST_TIMEOUT_SECONDS)
+        feed = feedparser.parse(response.body, response_headers=response.headers)
 
         if feed.bozo:
             bozo_reason = feed.get("bozo_exception", "Unknown parsing error")
@@ -41,7 +42,5 @@ def get_investors_news(symbol: str, rss_url_template: str) -> list[tuple[str, st
 
     except Exception as e:
         logger.error(f"An unexpected error occurred while fetching news from {source_name} for '{symbol}': {e} (URL: {rss_url})", exc_info=True)
-    finally:
-        socket.setdefaulttimeout(original_timeout)
     
     return headlines
@@ -0,0 +1,43 @@
+# json_state.py
+# קבצי מצב JSON קטנים שנשמרים בין ריצות (צוברי סנטימנט, high-water marks וכו').
+# הכתיבה אטומית (קובץ זמני + os.replace), כך שריצה שנקטעה לא משאירה קובץ חלקי; קובץ חסר או פגום נטען כמצב ריק.
+import json
+import os
+
+from settings import setup_logger
+
+logger = setup_logger(__name__)
+
+def load_json_state(path: str, default: dict | None = None) -> dict:
+    """טוען את המצב מ-path. אם הקובץ לא קיים או פגום – מחזיר עותק של default (או {})."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return dict(default or {})
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read state file {path}: {e}. Starting from an empty state.")
+        return dict(default or {})
+    if not isinstance(state, dict):
+        logger.warning(f"State file {path} does not contain a JSON object. Starting from an empty state.")
+        return dict(default or {})
+    return state
+
+def save_json_state(path: str, state: dict) -> bool:
+    """כותב את המצב ל-path באופן אטומי. מחזיר False (ורושם ללוג) אם הכתיבה נכשלה."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp_path, path)
+        return True
+    except (OSError, TypeError, ValueError) as e:
+        logger.error(f"Could not write state file {path}: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
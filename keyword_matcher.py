@@ -0,0 +1,86 @@
+# keyword_matcher.py
+# התאמת מילות מפתח מרובות בבת אחת (Aho-Corasick) – מעבר אחד על הטקסט מחזיר את כל התוויות (סמלים) שמילות המפתח שלהן מופיעות בו.
+from collections import deque
+
+class KeywordMatcher:
+    """
+    אוטומט Aho-Corasick שנבנה פעם אחת מתוך מילון label -> רשימת מילות מפתח.
+    find_labels(text) מחזיר את כל ה-labels שלפחות אחת ממילות המפתח שלהם מופיעה בטקסט,
+    לפי סדר ההכנסה של ה-labels במילון.
+
+    case_sensitive=False – התאמה ללא תלות ברישיות (כמו keyword.lower() in title.lower()).
+    whole_words=True – מילת המפתח חייבת להופיע כמילה שלמה (לא כחלק ממילה ארוכה יותר), שימושי לטיקרים כמו "BB" או "AI".
+    """
+
+    def __init__(self, keywords_by_label: dict[str, list[str]], case_sensitive: bool = False, whole_words: bool = False):
+        self.case_sensitive = case_sensitive
+        self.whole_words = whole_words
+        self._label_order = {label: idx for idx, label in enumerate(keywords_by_label)}
+        # כל מצב באוטומט: מעברים, קישור כישלון, ורשימת (אורך מילת מפתח, labels) שמסתיימות בו
+        self._transitions = [{}]
+        self._fail = [0]
+        self._outputs = [[]]
+
+        for label, keywords in keywords_by_label.items():
+            for keyword in keywords:
+                if keyword:
+                    self._add_keyword(self._normalize(keyword), label)
+        self._build_fail_links()
+
+    def _normalize(self, text: str) -> str:
+        return text if self.case_sensitive else text.lower()
+
+    def _add_keyword(self, keyword: str, label: str):
+        state = 0
+        for char in keyword:
+            next_state = self._transitions[state].get(char)
+            if next_state is None:
+                next_state = len(self._transitions)
+                self._transitions.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+                self._transitions[state][char] = next_state
+            state = next_state
+        self._outputs[state].append((len(keyword), label))
+
+    def _build_fail_links(self):
+        queue = deque(self._transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._transitions[state].items():
+                queue.append(next_state)
+                fail_state = self._fail[state]
+                while fail_state and char not in self._transitions[fail_state]:
+                    fail_state = self._fail[fail_state]
+                self._fail[next_state] = self._transitions[fail_state].get(char, 0)
+                # מיזוג הפלטים של קישור הכישלון כדי שלא נצטרך ללכת בשרשרת בזמן החיפוש
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+
+    @staticmethod
+    def _is_word_char(char: str) -> bool:
+        return char.isalnum() or char == "_"
+
+    def find_labels(self, text: str) -> list[str]:
+        if not text:
+            return []
+        haystack = self._normalize(text)
+        found_labels = set()
+        state = 0
+        for position, char in enumerate(haystack):
+            while state and char not in self._transitions[state]:
+                state = self._fail[state]
+            state = self._transitions[state].get(char, 0)
+            for keyword_length, label in self._outputs[state]:
+                if label in found_labels:
+                    continue
+                if self.whole_words:
+                    start = position - keyword_length + 1
+                    if start > 0 and self._is_word_char(haystack[start - 1]):
+                        continue
+                    if position + 1 < len(haystack) and self._is_word_char(haystack[position + 1]):
+                        continue
+                found_labels.add(label)
+        return sorted(found_labels, key=self._label_order.__getitem__)
+
+    def matches(self, text: str) -> bool:
+        return bool(self.find_labels(text))
@@ -0,0 +1,402 @@
+# learning_log.py
+# הלוג המצטבר של ההחלטות: LearningLogStore – טבלת SQLite עם טיפוסים מפורשים ואינדקס על (symbol, datetime),
+# ו-LearningLogWriter – אוסף את שורות הריצה וכותב אותן בסוף הריצה (ל-SQLite ובשיטת append ל-learning_log_cumulative.csv).
+import csv
+import io
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from settings import setup_logger, LEARNING_LOG_CSV_PATH, LEARNING_LOG_DB_PATH
+
+logger = setup_logger(__name__)
+
+LEARNING_LOG_COLUMNS = [
+    "run_id", "symbol", "datetime", "sentiment_avg", "sentiment_std",
+    "num_total_articles", "main_source_overall",
+    "decision", "previous_decision", "trade_executed", "raw_scores_details"
+]
+LEARNING_LOG_DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+def _format_value(value) -> str:
+    # אותו ייצוג ש-DataFrame.to_csv כתב קודם: None/NaN כשדה ריק, datetime בפורמט הקבוע של הלוג
+    if value is None or (isinstance(value, float) and value != value):
+        return ""
+    if isinstance(value, datetime):
+        return value.strftime(LEARNING_LOG_DATETIME_FORMAT)
+    return str(value)
+
+def _format_datetime(value) -> str:
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    return _format_value(value)
+
+# טיפוס העמודה ב-SQLite ו-dtype ב-DataFrame שמוחזר מ-query (הסדר כמו LEARNING_LOG_COLUMNS)
+_STORE_COLUMN_TYPES = {
+    "run_id": ("TEXT", "string"),
+    "symbol": ("TEXT NOT NULL", "string"),
+    "datetime": ("TEXT NOT NULL", None), # תמיד בפורמט LEARNING_LOG_DATETIME_FORMAT, כך שמיון כטקסט = מיון כרונולוגי
+    "sentiment_avg": ("REAL", "float64"),
+    "sentiment_std": ("REAL", "float64"),
+    "num_total_articles": ("INTEGER", "Int64"),
+    "main_source_overall": ("TEXT", "string"),
+    "decision": ("TEXT", "string"),
+    "previous_decision": ("TEXT", "string"),
+    "trade_executed": ("INTEGER", "boolean"),
+    "raw_scores_details": ("TEXT", "string"),
+}
+
+# תמונת מצב אחרונה לכל סמל – מתעדכנת באותה טרנזקציה של הכתיבה ללוג, כך שהחלטה קודמת היא שליפה לפי מפתח
+_LATEST_STATE_COLUMNS = ["symbol", "datetime", "run_id", "decision", "sentiment_avg", "trade_executed"]
+
+def _to_optional(value, cast):
+    if value is None or (isinstance(value, float) and value != value) or value == "":
+        return None
+    if cast is bool and isinstance(value, str):
+        return value.strip().lower() in ("true", "1", "yes")
+    return cast(value)
+
+def _to_store_row(row: dict) -> tuple:
+    return (
+        _to_optional(row.get("run_id"), str),
+        str(row["symbol"]),
+        _format_datetime(row["datetime"]),
+        _to_optional(row.get("sentiment_avg"), float),
+        _to_optional(row.get("sentiment_std"), float),
+        _to_optional(row.get("num_total_articles"), int),
+        _to_optional(row.get("main_source_overall"), str),
+        _to_optional(row.get("decision"), str),
+        _to_optional(row.get("previous_decision"), str),
+        _to_optional(row.get("trade_executed"), bool),
+        _to_optional(row.get("raw_scores_details"), str),
+    )
+
+_MISSING_CELL_VALUES = {"", "nan", "none", "null", "n/a"}
+_TRUE_CELL_VALUES = {"true", "1", "1.0", "yes"}
+_FALSE_CELL_VALUES = {"false", "0", "0.0", "no"}
+
+def _coerce_log_column(values: pd.Series, kind: str) -> tuple[pd.Series, pd.Series]:
+    """
+    ממיר עמודת טקסט מה-CSV לערכי Python (float / int / bool, ו-None לתא ריק או לא תקין) בלי לזרוק על תא בודד.
+    kind – "float", "int" (דרך float, כך ש-'5.0' תקין) או "bool". מחזיר (הערכים, מסכה של התאים הלא תקינים).
+    """
+    stripped = values.str.strip()
+    missing = stripped.str.lower().isin(_MISSING_CELL_VALUES)
+    if kind == "bool":
+        lowered = stripped.str.lower()
+        converted = [True if value in _TRUE_CELL_VALUES else False if value in _FALSE_CELL_VALUES else None for value in lowered]
+        invalid = ~missing & ~lowered.isin(_TRUE_CELL_VALUES | _FALSE_CELL_VALUES)
+        return pd.Series(converted, index=values.index, dtype=object), invalid
+
+    numeric = pd.to_numeric(stripped.where(~missing), errors="coerce")
+    valid = np.isfinite(numeric)
+    if kind == "int":
+        valid &= numeric == numeric.round()
+    converted = [(int(value) if kind == "int" else float(value)) if is_valid else None for value, is_valid in zip(numeric, valid)]
+    return pd.Series(converted, index=values.index, dtype=object), ~missing & ~valid
+
+_LOG_COLUMN_KINDS = {"sentiment_avg": "float", "sentiment_std": "float", "num_total_articles": "int", "trade_executed": "bool"}
+
+def _parse_log_datetimes(values: pd.Series) -> pd.Series:
+    # קודם הפורמט הקבוע של הלוג, ורק למה שנכשל – ISO8601 כללי (שורות ישנות שנכתבו בפורמט אחר)
+    parsed = pd.to_datetime(values, format=LEARNING_LOG_DATETIME_FORMAT, errors="coerce")
+    failed = parsed.isna() & values.notna()
+    if failed.any():
+        parsed[failed] = pd.to_datetime(values[failed], format="ISO8601", errors="coerce")
+    return parsed
+
+class LearningLogStore:
+    """
+    הלוג המצטבר בטבלת SQLite. datetime נשמר כטקסט בפורמט קבוע, ו-query מחזיר DataFrame עם dtypes מפורשים
+    (datetime כ-datetime64, מספרים כ-float64/Int64, trade_executed כ-boolean) – בלי ניחוש פורמטים בכל טעינה.
+    לצד הלוג נשמרת הטבלה latest_state (שורה אחת לסמל), שממנה latest_states טוען את ההחלטות הקודמות בלי לקרוא את הלוג.
+    """
+
+    def __init__(self, db_path: str = LEARNING_LOG_DB_PATH):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            self._ensure_schema(conn)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _ensure_schema(self, conn: sqlite3.Connection):
+        columns_sql = ", ".join(f'"{name}" {sql_type}' for name, (sql_type, _) in _STORE_COLUMN_TYPES.items())
+        conn.execute(f"CREATE TABLE IF NOT EXISTS learning_log (id INTEGER PRIMARY KEY AUTOINCREMENT, {columns_sql})")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_learning_log_symbol_datetime ON learning_log (symbol, datetime)")
+        conn.execute("CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS latest_state (symbol TEXT PRIMARY KEY, datetime TEXT NOT NULL, run_id TEXT, "
+            "decision TEXT, sentiment_avg REAL, trade_executed INTEGER)"
+        )
+        if not conn.execute("SELECT 1 FROM store_meta WHERE key = 'latest_state_built'").fetchone():
+            # מסד שנוצר לפני שהייתה latest_state – בנייה חד-פעמית מתוך הלוג (השורה המאוחרת ביותר לכל סמל)
+            column_names = ", ".join(_LATEST_STATE_COLUMNS)
+            conn.execute("DELETE FROM latest_state")
+            conn.execute(
+                f"INSERT INTO latest_state ({column_names}) SELECT {column_names} FROM ("
+                f"SELECT {column_names}, ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY datetime DESC, id DESC) AS row_rank "
+                f"FROM learning_log) WHERE row_rank = 1"
+            )
+            conn.execute("INSERT INTO store_meta (key, value) VALUES ('latest_state_built', 'yes')")
+
+    def _insert_rows(self, conn: sqlite3.Connection, rows: list[tuple]):
+        placeholders = ", ".join("?" for _ in _STORE_COLUMN_TYPES)
+        column_names = ", ".join(f'"{name}"' for name in _STORE_COLUMN_TYPES)
+        conn.executemany(f"INSERT INTO learning_log ({column_names}) VALUES ({placeholders})", rows)
+
+        state_indexes = [list(_STORE_COLUMN_TYPES).index(name) for name in _LATEST_STATE_COLUMNS]
+        state_updates = ", ".join(f"{name} = excluded.{name}" for name in _LATEST_STATE_COLUMNS[1:])
+        conn.executemany(
+            f"INSERT INTO latest_state ({', '.join(_LATEST_STATE_COLUMNS)}) VALUES ({', '.join('?' for _ in _LATEST_STATE_COLUMNS)}) "
+            f"ON CONFLICT(symbol) DO UPDATE SET {state_updates} WHERE excluded.datetime >= latest_state.datetime",
+            [tuple(row[i] for i in state_indexes) for row in rows]
+        )
+
+    def append(self, entries: list[dict]) -> int:
+        """מוסיף את השורות בטרנזקציה אחת. מחזיר את מספר השורות שנוספו."""
+        rows = [_to_store_row(entry) for entry in entries]
+        with self._connect() as conn: # commit בסוף הבלוק, rollback אם נזרקה חריגה
+            self._insert_rows(conn, rows)
+        return len(rows)
+
+    def contains_entry(self, entry: dict) -> bool:
+        """האם השורה (לפי run_id, symbol ו-datetime) כבר נמצאת בטבלה. append כותב בטרנזקציה אחת, כך ששורה אחת מייצגת את כל ה-flush."""
+        run_id, symbol, datetime_str = _to_optional(entry.get("run_id"), str), str(entry["symbol"]), _format_datetime(entry["datetime"])
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM learning_log WHERE symbol = ? AND datetime = ? AND run_id IS ? LIMIT 1", (symbol, datetime_str, run_id)
+            ).fetchone()
+        return row is not None
+
+    def latest_states(self, symbols: list[str] | None = None) -> dict[str, dict]:
+        """
+        symbol -> {"datetime", "run_id", "decision", "sentiment_avg", "trade_executed"} של השורה האחרונה בלוג לכל סמל.
+        קורא רק את latest_state (שורה לסמל), כך שהזמן לא תלוי בגודל הלוג המצטבר.
+        """
+        column_names = ", ".join(_LATEST_STATE_COLUMNS)
+        sql, params = f"SELECT {column_names} FROM latest_state", []
+        if symbols is not None:
+            symbols = list(symbols)
+            sql += f" WHERE symbol IN ({', '.join('?' for _ in symbols)})"
+            params = symbols
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+
+        states = {}
+        for row in rows:
+            state = dict(zip(_LATEST_STATE_COLUMNS[1:], row[1:]))
+            state["trade_executed"] = bool(state["trade_executed"]) if state["trade_executed"] is not None else None
+            states[row[0]] = state
+        return states
+
+    def query(self, symbol: str | list[str] | None = None, start=None, end=None) -> pd.DataFrame:
+        """
+        שורות הלוג לפי סדר הכתיבה, מסוננות לפי סמל (או רשימת סמלים) וטווח תאריכים start <= datetime < end.
+        start/end – datetime או מחרוזת ISO. הסינון נעשה ב-SQL דרך האינדקס על (symbol, datetime).
+        """
+        conditions, params = [], []
+        if symbol is not None:
+            symbols = [symbol] if isinstance(symbol, str) else list(symbol)
+            conditions.append(f"symbol IN ({', '.join('?' for _ in symbols)})")
+            params.extend(symbols)
+        if start is not None:
+            conditions.append("datetime >= ?")
+            params.append(_format_datetime(start))
+        if end is not None:
+            conditions.append("datetime < ?")
+            params.append(_format_datetime(end))
+        where_sql = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        column_names = ", ".join(f'"{name}"' for name in _STORE_COLUMN_TYPES)
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT {column_names} FROM learning_log{where_sql} ORDER BY id", params).fetchall()
+
+        df = pd.DataFrame.from_records(rows, columns=list(_STORE_COLUMN_TYPES))
+        df["datetime"] = pd.to_datetime(df["datetime"], format=LEARNING_LOG_DATETIME_FORMAT)
+        return df.astype({name: dtype for name, (_, dtype) in _STORE_COLUMN_TYPES.items() if dtype})
+
+    def migrate_from_csv(self, csv_path: str = LEARNING_LOG_CSV_PATH) -> int:
+        """
+        העברה חד-פעמית של learning_log_cumulative.csv הקיים לטבלה. מסומנת ב-store_meta כדי שלא תרוץ שוב
+        (מהרגע הזה LearningLogWriter כותב לשניהם). מחזיר את מספר השורות שהועברו.
+        """
+        with self._connect() as conn:
+            if conn.execute("SELECT 1 FROM store_meta WHERE key = 'csv_migrated'").fetchone():
+                return 0
+            if not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0:
+                conn.execute("INSERT INTO store_meta (key, value) VALUES ('csv_migrated', ?)", (f"no CSV at {csv_path}",))
+                return 0
+
+            logger.info(f"Migrating learning log CSV {csv_path} into {self.db_path} (one-time).")
+            df = pd.read_csv(csv_path, escapechar='\\', dtype=str, keep_default_na=False, encoding='utf-8-sig')
+            if "symbol" not in df.columns or "datetime" not in df.columns:
+                raise ValueError(f"Learning log CSV {csv_path} has no 'symbol'/'datetime' columns (found: {list(df.columns)}).")
+
+            parsed_datetimes = _parse_log_datetimes(df["datetime"].replace("", None))
+            invalid_rows = parsed_datetimes.isna() | (df["symbol"] == "")
+            if invalid_rows.any():
+                logger.warning(f"Skipping {int(invalid_rows.sum())} learning log rows with an invalid datetime or empty symbol during migration. Examples: {df.loc[invalid_rows, 'datetime'].head().tolist()}")
+            df = df[~invalid_rows].copy()
+            df["datetime"] = parsed_datetimes[~invalid_rows].dt.strftime(LEARNING_LOG_DATETIME_FORMAT)
+            for column, kind in _LOG_COLUMN_KINDS.items():
+                if column not in df.columns:
+                    continue
+                converted, invalid_cells = _coerce_log_column(df[column], kind)
+                if invalid_cells.any():
+                    logger.warning(f"Storing {int(invalid_cells.sum())} invalid '{column}' values as empty during migration. Examples: {df.loc[invalid_cells, column].head().tolist()}")
+                df[column] = converted
+
+            rows = [_to_store_row(entry) for entry in df.to_dict("records")]
+            self._insert_rows(conn, rows)
+            conn.execute("INSERT INTO store_meta (key, value) VALUES ('csv_migrated', ?)", (f"{len(rows)} rows from {csv_path}",))
+        logger.info(f"Migrated {len(rows)} learning log rows from {csv_path} into {self.db_path}.")
+        return len(rows)
+
+class LearningLogWriter:
+    """
+    אוסף את שורות הריצה (add) וכותב אותן בסוף הריצה (flush): ל-store (אם הוגדר) בטרנזקציה אחת,
+    ולסוף קובץ ה-CSV בכתיבה אחת.
+
+    הגנה מקריסה באמצע הכתיבה: לפני שנוגעים ב-store או ב-CSV נכתב קובץ journal (<path>.pending, דרך קובץ זמני
+    ו-os.replace) עם גודל הקובץ המקורי, תוכן השורות ל-CSV והשורות עצמן ל-store. אם התהליך נפל באמצע, בפתיחה הבאה
+    הקובץ נחתך חזרה לגודל המקורי והשורות נכתבות מחדש, והשורות נוספות ל-store רק אם עוד אינן בו – כך ששני היעדים
+    מכילים את כל שורות הריצה או אף אחת מהן, וההשלמה בטוחה גם אם היא עצמה נקטעת ורצה שוב.
+    """
+
+    def __init__(self, path: str = LEARNING_LOG_CSV_PATH, store: LearningLogStore | None = None):
+        self.path = path
+        self.store = store
+        self.journal_path = f"{path}.pending"
+        self._pending_rows = []
+        self.recover()
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending_rows)
+
+    def add(self, entry: dict):
+        row = dict(entry)
+        if "datetime" in row:
+            row["datetime"] = _format_datetime(row["datetime"])
+        self._pending_rows.append(row)
+
+    def _read_header(self) -> list[str] | None:
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return None
+        with open(self.path, "r", encoding="utf-8-sig", newline="") as f:
+            header = next(csv.reader(f), None)
+        return header or None
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) in (b"\n", b"\r")
+
+    def _encode_rows(self, header: list[str] | None) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator=os.linesep)
+        prefix = b""
+        if header is None:
+            header = list(LEARNING_LOG_COLUMNS)
+            for row in self._pending_rows: # עמודות חדשות שאינן ברשימה הקבועה נוספות בסוף, כמו ב-pd.concat
+                header.extend(key for key in row if key not in header)
+            writer.writerow(header)
+            prefix = "\ufeff".encode("utf-8") # utf-8-sig – אותו BOM ש-to_csv כתב
+        elif not self._ends_with_newline():
+            prefix = os.linesep.encode("utf-8")
+
+        unknown_columns = {key for row in self._pending_rows for key in row if key not in header}
+        if unknown_columns:
+            logger.warning(f"Learning log {self.path} has no columns {sorted(unknown_columns)}; these fields are not written (append-only log keeps the existing header).")
+        for row in self._pending_rows:
+            writer.writerow([_format_value(row.get(column)) for column in header])
+        return prefix + buffer.getvalue().encode("utf-8")
+
+    def _write_journal(self, offset: int, data: bytes, entries: list[dict]):
+        journal = json.dumps({"offset": offset, "data": data.decode("utf-8"), "entries": entries}).encode("utf-8")
+        tmp_path = f"{self.journal_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(journal)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+
+    def _append_at(self, offset: int, data: bytes):
+        with open(self.path, "r+b" if os.path.exists(self.path) else "wb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() > offset:
+                f.truncate(offset) # שאריות של append שנקטע באמצע
+            f.seek(0, os.SEEK_END)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def recover(self) -> bool:
+        """משלים כתיבה שנקטעה בריצה קודמת (אם נשאר journal) – ל-store ול-CSV. מחזיר True אם בוצע שחזור."""
+        if not os.path.exists(self.journal_path):
+            return False
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                journal = json.load(f)
+            offset, data = int(journal["offset"]), journal["data"].encode("utf-8")
+            entries = journal.get("entries", []) # journal ישן (לפני שנשמרו בו השורות) – שחזור ה-CSV בלבד
+        except (OSError, ValueError, KeyError) as e:
+            # ה-journal נכתב דרך os.replace, כך שקובץ פגום אומר שה-append עצמו עוד לא התחיל
+            logger.error(f"Unreadable learning log journal {self.journal_path}: {e}. Discarding it.")
+            os.remove(self.journal_path)
+            return False
+
+        if entries:
+            if self.store is None:
+                logger.warning(f"Learning log journal {self.journal_path} has {len(entries)} rows for the store, but no store is available; restoring the CSV only.")
+            else:
+                try:
+                    if self.store.contains_entry(entries[0]):
+                        logger.info(f"Learning log store {self.store.db_path} already has the {len(entries)} journaled rows.")
+                    else:
+                        self.store.append(entries)
+                        logger.warning(f"Recovered an interrupted learning log write: re-inserted {len(entries)} rows into {self.store.db_path}.")
+                except sqlite3.Error as e:
+                    logger.error(f"Could not restore {len(entries)} journaled rows into learning log store {self.store.db_path}: {e}. Restoring the CSV only.")
+
+        current_size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if current_size < offset:
+            logger.warning(f"Learning log {self.path} is smaller ({current_size} bytes) than recorded in the journal ({offset} bytes); appending the pending rows at its end.")
+            offset = current_size
+        self._append_at(offset, data)
+        os.remove(self.journal_path)
+        logger.warning(f"Recovered an interrupted learning log write: re-appended {len(data)} bytes to {self.path}.")
+        return True
+
+    def flush(self) -> int:
+        """כותב את כל השורות שנאספו בכתיבה אחת לסוף הקובץ. מחזיר את מספר השורות שנכתבו."""
+        if not self._pending_rows:
+            return 0
+        rows_count = len(self._pending_rows)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        data = self._encode_rows(self._read_header())
+        offset = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        # ה-journal נכתב לפני שני היעדים, כך שקריסה בין ה-commit ל-store לבין ה-append ל-CSV ניתנת להשלמה
+        self._write_journal(offset, data, self._pending_rows if self.store is not None else [])
+        if self.store is not None:
+            self.store.append(self._pending_rows)
+        self._append_at(offset, data)
+        os.remove(self.journal_path)
+
+        self._pending_rows = []
+        logger.info(f"Appended {rows_count} entries to learning log {self.path} ({len(data)} bytes).")
+        return rows_count
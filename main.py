@@ -8,114 +8,108 @@ import json
 
 from settings import (
     setup_logger, NEWS_SOURCES_CONFIG, MAIN_MAX_TOTAL_HEADLINES,
-    REDDIT_ENABLED, REDDIT_SUBREDDITS, REDDIT_LIMIT_PER_SUBREDDIT, REDDIT_COMMENTS_PER_POST,
-    REPORTS_OUTPUT_DIR, LEARNING_LOG_CSV_PATH
+    REDDIT_ENABLED, REDDIT_LIMIT_PER_SUBREDDIT, REDDIT_COMMENTS_PER_POST, REDDIT_BATCHED_SEARCH_ENABLED,
+    REDDIT_SEARCH_SUBREDDITS, REDDIT_LISTING_SCAN_SUBREDDITS, REDDIT_INCREMENTAL_SEARCH_ENABLED,
+    REPORTS_OUTPUT_DIR, LEARNING_LOG_CSV_PATH,
+    DECAYED_SENTIMENT_STATE_PATH, DECAYED_SENTIMENT_LAMBDA, DECAYED_SENTIMENT_DEDUP_HOURS
 )
 from smart_universe import SYMBOLS 
-from news_aggregator import fetch_all_news 
-from reddit_scraper import get_reddit_posts
-from sentiment_analyzer import analyze_sentiment
+from news_aggregator import fetch_all_news_for_symbols 
+from http_cache import evict_http_cache
+from learning_log import LearningLogStore, LearningLogWriter
+from reddit_scraper import get_reddit_posts, get_reddit_posts_for_symbols, get_new_reddit_posts_for_symbols, scan_new_posts_for_symbols
+from sentiment_analyzer import analyze_sentiments, aggregate_sentiment_by_symbol
+from sentiment_cache import get_sentiment_cache
 from recommender import make_recommendation
-from alpaca_trader import trade_stock
-from email_sender import send_run_success_email
+from sentibot_weighted_sentiment import DecayedSentimentState
 
 logger = setup_logger("SentibotMain")
 
-def load_learning_log() -> pd.DataFrame:
-    empty_log_df = pd.DataFrame(columns=[
-        "run_id", "symbol", "datetime", "sentiment_avg", "sentiment_std", 
-        "num_total_articles", "main_source_overall",
-        "decision", "previous_decision", "trade_executed", "raw_scores_details"
-    ])
-
-    logger.info(f"Checking for existing learning log at: {LEARNING_LOG_CSV_PATH}")
-    if not os.path.exists(LEARNING_LOG_CSV_PATH):
-        logger.warning(f"Learning log file NOT FOUND at {LEARNING_LOG_CSV_PATH}. Will start with an empty log.")
-        return empty_log_df
-
+def trade_stock(symbol: str, decision: str) -> bool:
+    # alpaca_trader (והספרייה של Alpaca) נטען רק כשיש באמת פקודה לשלוח – ברוב הריצות אין שינוי החלטה
     try:
-        logger.info(f"Attempting to read CSV: {LEARNING_LOG_CSV_PATH}")
-        df = pd.read_csv(LEARNING_LOG_CSV_PATH, escapechar='\\') 
-        logger.info(f"Successfully read {len(df)} rows from {LEARNING_LOG_CSV_PATH}.")
-        
-        if df.empty:
-            logger.info(f"Learning log file {LEARNING_LOG_CSV_PATH} was read but is empty. Starting with an empty log.")
-            return empty_log_df
-            
-        if 'datetime' not in df.columns:
-            logger.error(f"'datetime' column MISSING in {LEARNING_LOG_CSV_PATH}. Cannot process previous decisions. Returning empty log.")
-            return empty_log_df
-
-        df['datetime_original_str'] = df['datetime'].astype(str) 
-        
-        try:
-            df['datetime_parsed'] = pd.to_datetime(df['datetime_original_str'], errors='coerce', infer_datetime_format=True)
-            logger.info("Attempted to parse 'datetime' column (inferring format).")
-        except Exception as e_parse_dt: 
-            logger.error(f"Unexpected error during pd.to_datetime conversion: {e_parse_dt}", exc_info=True)
-            df['datetime_parsed'] = pd.NaT 
-
-        num_failed_parsing = df['datetime_parsed'].isnull().sum()
-        if num_failed_parsing > 0:
-            logger.warning(f"Could not parse {num_failed_parsing} datetime strings in 'datetime' column.")
-            failed_examples = df[df['datetime_parsed'].isnull()]['datetime_original_str'].head().tolist()
-            logger.warning(f"Examples of original datetime strings that failed parsing: {failed_examples}")
-        
-        original_len = len(df)
-        df.dropna(subset=['datetime_parsed'], inplace=True) 
-        
-        if not df.empty:
-            df['datetime'] = df['datetime_parsed'] 
-        
-        df.drop(columns=['datetime_parsed', 'datetime_original_str'], inplace=True, errors='ignore')
-        
-        if len(df) < original_len:
-            logger.warning(f"Removed {original_len - len(df)} rows with invalid datetime format from learning log after parsing attempt.")
-        
-        if df.empty:
-            logger.warning(f"Learning log became empty after datetime parsing and cleanup. Starting with an empty log.")
-            return empty_log_df
-        
-        logger.info(f"Successfully loaded and processed learning log with {len(df)} valid entries after datetime conversion.")
-        return df
-    
-    except pd.errors.EmptyDataError:
-        logger.warning(f"Pandas EmptyDataError: The file {LEARNING_LOG_CSV_PATH} is empty or unreadable as CSV. Starting with an empty log.")
-        return empty_log_df
+        from alpaca_trader import trade_stock as alpaca_trade_stock
+    except ImportError as e:
+        logger.error(f"Could not load the Alpaca trader module: {e}. Cannot trade {symbol}.")
+        return False
+    return alpaca_trade_stock(symbol=symbol, decision=decision)
+
+def load_previous_states(store: LearningLogStore, symbols: list[str]) -> dict[str, dict]:
+    """המצב האחרון (החלטה, סנטימנט, מסחר) של כל סמל מתוך latest_state – בלי לטעון את הלוג המצטבר."""
+    logger.info(f"Loading latest per-symbol state from learning log store: {store.db_path}")
+    try:
+        previous_states = store.latest_states(symbols)
     except Exception as e:
-        logger.error(f"CRITICAL error loading or processing learning log from {LEARNING_LOG_CSV_PATH}: {e}. Starting with an empty log.", exc_info=True)
-        return empty_log_df
-
-
-def save_learning_log_entry(log_df: pd.DataFrame, new_entry_data: dict):
+        logger.error(f"CRITICAL error loading latest state from {store.db_path}: {e}. Starting without previous decisions.", exc_info=True)
+        return {}
+    logger.info(f"Loaded previous state for {len(previous_states)} of {len(symbols)} symbols.")
+    return previous_states
+
+
+def collect_and_score_symbol(symbol: str, news_headlines_from_aggregator: list[tuple[str, str]],
+                             run_id_str: str, current_datetime_iso: str,
+                             reddit_content_prefetched: list[tuple[str, str]] | None = None) -> dict | None:
+    """
+    איסוף התוכן מ-Reddit לסמל יחיד (הכותרות מהחדשות נשלפו מראש לכל הסמלים יחד) וניתוח הסנטימנט של הכל.
+    reddit_content_prefetched – התוכן מ-Reddit שכבר נשלף לסמל (חיפוש משותף / סריקת listing / חיפוש לסמל).
+    לא נוגע בלוג המצטבר ולא מבצע מסחר – אלה נעשים בשלב 2.
+    מחזיר None אם אין מה לנתח עבור הסמל.
+    """
+    logger.info(f"--- Processing symbol: {symbol} ---")
+    symbol_headlines_data = [] 
     try:
-        new_entry_df = pd.DataFrame([new_entry_data])
-        if 'datetime' in new_entry_df.columns: 
-            new_entry_df['datetime'] = pd.to_datetime(new_entry_df['datetime'])
-
-        if log_df.empty:
-            log_df = new_entry_df
+        if news_headlines_from_aggregator:
+            logger.info(f"Fetched {len(news_headlines_from_aggregator)} headlines from news aggregator for '{symbol}'.")
+            symbol_headlines_data.extend(news_headlines_from_aggregator)
         else:
-            if 'datetime' in log_df.columns:
-                log_df['datetime'] = pd.to_datetime(log_df['datetime'], errors='coerce') 
-                log_df.dropna(subset=['datetime'], inplace=True) 
+            logger.info(f"No headlines from news aggregator for '{symbol}'.")
 
-            log_df = pd.concat([log_df, new_entry_df], ignore_index=True)
+        if REDDIT_ENABLED:
+            reddit_content = reddit_content_prefetched or []
+            if reddit_content:
+                logger.info(f"Fetched {len(reddit_content)} items (posts/comments) from Reddit for '{symbol}'.")
+                symbol_headlines_data.extend(reddit_content)
+            else:
+                logger.info(f"No content from Reddit for '{symbol}'.")
+        else:
+            logger.info("Reddit fetching is disabled in settings.")
         
-        if 'datetime' in log_df.columns and not pd.api.types.is_datetime64_any_dtype(log_df['datetime']):
-             log_df['datetime'] = pd.to_datetime(log_df['datetime'], errors='coerce')
-             log_df.dropna(subset=['datetime'], inplace=True)
+        if not symbol_headlines_data:
+            logger.warning(f"No headlines or content found for '{symbol}' from any source after aggregation. Skipping symbol.")
+            return None
 
-        df_to_save = log_df.copy()
-        if 'datetime' in df_to_save.columns and pd.api.types.is_datetime64_any_dtype(df_to_save['datetime']):
-            df_to_save['datetime'] = df_to_save['datetime'].dt.strftime('%Y-%m-%dT%H:%M:%S.%f')
+        if len(symbol_headlines_data) > MAIN_MAX_TOTAL_HEADLINES:
+            logger.info(f"Capping total items for '{symbol}' from {len(symbol_headlines_data)} to {MAIN_MAX_TOTAL_HEADLINES}.")
+            symbol_headlines_data = symbol_headlines_data[:MAIN_MAX_TOTAL_HEADLINES]
+
+        logger.info(f"Total {len(symbol_headlines_data)} items (headlines/posts) for '{symbol}' to analyze.")
         
-        df_to_save.to_csv(LEARNING_LOG_CSV_PATH, index=False, encoding='utf-8-sig')
-        logger.info(f"Saved new entry to learning log. Total entries: {len(df_to_save)}")
-        return log_df 
-    except Exception as e:
-        logger.error(f"Error saving entry to learning log {LEARNING_LOG_CSV_PATH}: {e}", exc_info=True)
-        return log_df
+        headline_rows = []
+        current_symbol_sentiments_details = [] 
+
+        item_texts = [item_text for item_text, _ in symbol_headlines_data]
+        item_sources = [source_key for _, source_key in symbol_headlines_data]
+        sentiment_scores = analyze_sentiments(item_texts, item_sources).tolist() # NaN במקום שהניתוח נכשל
+        for item_text, source_key_from_scraper, sentiment_score in zip(item_texts, item_sources, sentiment_scores):
+            if sentiment_score == sentiment_score:
+                headline_rows.append({
+                    "run_id": run_id_str, "symbol": symbol, "source": source_key_from_scraper,
+                    "title_or_text": item_text, "sentiment_score": sentiment_score,
+                    "analysis_timestamp": current_datetime_iso
+                })
+                current_symbol_sentiments_details.append({'score': sentiment_score, 'source': source_key_from_scraper})
+            else:
+                logger.warning(f"Sentiment analysis returned no score for item from '{source_key_from_scraper}' for '{symbol}'.")
+
+        if not current_symbol_sentiments_details:
+            logger.warning(f"No sentiment scores were successfully calculated for '{symbol}'. Skipping recommendation for this symbol.")
+            return None
+
+        return {"headline_rows": headline_rows, "sentiments_details": current_symbol_sentiments_details}
+
+    except Exception as e_symbol_processing:
+        logger.error(f"A critical error occurred while collecting/scoring symbol '{symbol}': {e_symbol_processing}", exc_info=True)
+        return None
 
 def main(force_run: bool = False):
     run_id_str = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -132,7 +126,21 @@ def main(force_run: bool = False):
         # LEARNING_LOG_CSV_PATH עדיין יצביע למיקום המקורי, אך ייתכן שהכתיבה תיכשל.
     # --- סוף יצירת תיקייה ---
     
-    learning_log_df = load_learning_log()
+    try:
+        learning_log_store = LearningLogStore()
+    except Exception as e_store:
+        logger.error(f"Could not open the learning log store: {e_store}. Continuing without previous decisions (entries will be appended to the CSV only).", exc_info=True)
+        learning_log_store = None
+    # משלים כתיבה שנקטעה בריצה קודמת (ל-store ול-CSV) לפני שקוראים את הלוג
+    learning_log_writer = LearningLogWriter(store=learning_log_store)
+    previous_states = {}
+    if learning_log_store is not None:
+        try:
+            learning_log_store.migrate_from_csv(LEARNING_LOG_CSV_PATH) # חד-פעמי: ה-CSV הקיים עובר ל-SQLite
+            previous_states = load_previous_states(learning_log_store, SYMBOLS)
+        except Exception as e_store:
+            logger.error(f"Could not migrate the learning log CSV into the store: {e_store}. Continuing without previous decisions (entries will be appended to the CSV only).", exc_info=True)
+            learning_log_writer.store = None
     
     all_individual_headline_analysis = []
     aggregated_symbol_analysis = []
@@ -143,74 +151,88 @@ def main(force_run: bool = False):
 
     logger.info(f"Processing symbols: {', '.join(SYMBOLS)}")
 
-    for symbol in SYMBOLS:
-        logger.info(f"--- Processing symbol: {symbol} ---")
-        symbol_headlines_data = [] 
+    # שלב 0: שליפת כל כותרות החדשות של הריצה במקביל (כל צירופי symbol x source בבת אחת)
+    cnbc_scraper = sys.modules.get("cnbc_scraper") # נטען רק אם CNBC מאופשר; בתהליך חדש ה-snapshot ממילא ריק
+    if cnbc_scraper is not None:
+        cnbc_scraper.reset_cnbc_feed_snapshot() # הפיד הכללי של CNBC יורד מחדש פעם אחת בכל ריצה
+    evict_http_cache() # ניקוי רשומות ישנות/עודפות מה-cache של הפידים לפני השימוש בו
+    news_by_symbol = fetch_all_news_for_symbols(SYMBOLS, max_headlines_total=MAIN_MAX_TOTAL_HEADLINES)
+
+    # Reddit: סריקת "new" מאז הריצה הקודמת ב-subreddits העמוסים, וחיפוש משותף לקבוצות של סמלים בשאר;
+    # בשני המקרים כל פוסט (ותגובותיו) נשלף פעם אחת גם אם מתאים לכמה סמלים
+    reddit_by_symbol = {}
+    if REDDIT_ENABLED and REDDIT_LISTING_SCAN_SUBREDDITS:
+        reddit_by_symbol = scan_new_posts_for_symbols(
+            SYMBOLS, REDDIT_LISTING_SCAN_SUBREDDITS,
+            limit_per_sub=REDDIT_LIMIT_PER_SUBREDDIT, comments_limit=REDDIT_COMMENTS_PER_POST
+        )
+    if REDDIT_ENABLED and REDDIT_BATCHED_SEARCH_ENABLED and REDDIT_SEARCH_SUBREDDITS:
+        # במצב המצטבר רק פוסטים חדשים מהריצה הקודמת נשלפים, והשאר מגיעים מהחלון השמור של השבוע האחרון
+        fetch_reddit_posts = get_new_reddit_posts_for_symbols if REDDIT_INCREMENTAL_SEARCH_ENABLED else get_reddit_posts_for_symbols
+        searched_by_symbol = fetch_reddit_posts(
+            SYMBOLS, subreddits_list=REDDIT_SEARCH_SUBREDDITS,
+            limit_per_sub=REDDIT_LIMIT_PER_SUBREDDIT, comments_limit=REDDIT_COMMENTS_PER_POST
+        )
+        for symbol, searched_texts in searched_by_symbol.items():
+            reddit_by_symbol.setdefault(symbol, []).extend(searched_texts)
+    elif REDDIT_ENABLED and REDDIT_SEARCH_SUBREDDITS:
+        # חיפוש נפרד לכל סמל (החיפוש המשותף כבוי) – סדרתי, כי ה-client של PRAW אינו בטוח לשימוש מכמה threads
+        for symbol in SYMBOLS:
+            logger.info(f"Fetching Reddit content for '{symbol}'...")
+            reddit_by_symbol.setdefault(symbol, []).extend(get_reddit_posts(
+                symbol=symbol,
+                subreddits_list=REDDIT_SEARCH_SUBREDDITS,
+                limit_per_sub=REDDIT_LIMIT_PER_SUBREDDIT,
+                comments_limit=REDDIT_COMMENTS_PER_POST
+            ))
+
+    # שלב 1: ניתוח הסנטימנט לכל סמל. כל הבקשות לרשת כבר נעשו למעלה (החדשות במקביל ב-news_aggregator), והניקוד עצמו
+    # תלוי ב-CPU בלבד, כך ש-threads לא היו מוסיפים כאן מקביליות
+    symbol_results = [collect_and_score_symbol(sym, news_by_symbol.get(sym, []), run_id_str, current_datetime_iso, reddit_by_symbol.get(sym)) for sym in SYMBOLS]
+
+    sentiment_cache = get_sentiment_cache()
+    if sentiment_cache is not None: # שמירת הציונים החדשים לריצות הבאות וניקוי רשומות ישנות
+        new_cache_entries = sentiment_cache.flush()
+        sentiment_cache.evict()
+        cache_stats = sentiment_cache.stats()
+        logger.info(f"Sentiment cache: {cache_stats['memory_hits']} memory hits, {cache_stats['disk_hits']} disk hits, {cache_stats['misses']} misses (hit rate {cache_stats['hit_rate']:.1%}); stored {new_cache_entries} new scores.")
+
+    # ממוצע, סטיית תקן, מספר פריטים ומקור עיקרי לכל הסמלים של הריצה בחישוב אחד
+    all_details = [(symbol, detail) for symbol, symbol_result in zip(SYMBOLS, symbol_results)
+                   if symbol_result is not None for detail in symbol_result["sentiments_details"]]
+    symbol_stats = aggregate_sentiment_by_symbol(
+        [symbol for symbol, _ in all_details], [detail['score'] for _, detail in all_details], [detail['source'] for _, detail in all_details]
+    )
+
+    # סנטימנט דועך מצטבר בין ריצות (לתיעוד בלבד – ההחלטה עדיין לפי הממוצע של הריצה). הציונים כבר משוקללים לפי מקור,
+    # ולכן כל מקור מקבל כאן משקל 1; טקסט הפריט מונע ספירה כפולה של כותרת שחוזרת בפיד בכמה ריצות
+    decayed_state = DecayedSentimentState.load(
+        DECAYED_SENTIMENT_STATE_PATH, lambda_decay=DECAYED_SENTIMENT_LAMBDA, source_weights={},
+        default_source_weight=1.0, dedup_window_hours=DECAYED_SENTIMENT_DEDUP_HOURS
+    )
+    run_datetime = datetime.fromisoformat(current_datetime_iso)
+
+    # שלב 2: החלטה, מסחר ותיעוד – סדרתי ולפי סדר SYMBOLS, בדיוק כמו בהרצה הסדרתית
+    for symbol, symbol_result in zip(SYMBOLS, symbol_results):
+        if symbol_result is None:
+            continue
         try:
-            news_headlines_from_aggregator = fetch_all_news(symbol, max_headlines_total=MAIN_MAX_TOTAL_HEADLINES)
-            if news_headlines_from_aggregator:
-                logger.info(f"Fetched {len(news_headlines_from_aggregator)} headlines from news aggregator for '{symbol}'.")
-                symbol_headlines_data.extend(news_headlines_from_aggregator)
-            else:
-                logger.info(f"No headlines from news aggregator for '{symbol}'.")
-
-            if REDDIT_ENABLED:
-                logger.info(f"Fetching Reddit content for '{symbol}'...")
-                reddit_content = get_reddit_posts(
-                    symbol=symbol,
-                    subreddits_list=REDDIT_SUBREDDITS,
-                    limit_per_sub=REDDIT_LIMIT_PER_SUBREDDIT,
-                    comments_limit=REDDIT_COMMENTS_PER_POST
-                ) 
-                if reddit_content:
-                    logger.info(f"Fetched {len(reddit_content)} items (posts/comments) from Reddit for '{symbol}'.")
-                    symbol_headlines_data.extend(reddit_content)
-                else:
-                    logger.info(f"No content from Reddit for '{symbol}'.")
-            else:
-                logger.info("Reddit fetching is disabled in settings.")
-            
-            if not symbol_headlines_data:
-                logger.warning(f"No headlines or content found for '{symbol}' from any source after aggregation. Skipping symbol.")
-                continue
+            all_individual_headline_analysis.extend(symbol_result["headline_rows"])
+            current_symbol_sentiments_details = symbol_result["sentiments_details"]
 
-            if len(symbol_headlines_data) > MAIN_MAX_TOTAL_HEADLINES:
-                logger.info(f"Capping total items for '{symbol}' from {len(symbol_headlines_data)} to {MAIN_MAX_TOTAL_HEADLINES}.")
-                symbol_headlines_data = symbol_headlines_data[:MAIN_MAX_TOTAL_HEADLINES]
+            stats = symbol_stats.get(symbol, {"avg_sentiment": 0.0, "sentiment_std": 0.0, "num_items": 0, "main_source": "N/A"})
+            avg_sentiment_for_symbol = stats["avg_sentiment"]
+            sentiment_std_for_symbol = stats["sentiment_std"]
+            num_items_for_symbol = stats["num_items"]
+            main_source_overall_str = stats["main_source"]
 
-            logger.info(f"Total {len(symbol_headlines_data)} items (headlines/posts) for '{symbol}' to analyze.")
-            
-            current_symbol_sentiments_details = [] 
-
-            for item_text, source_key_from_scraper in symbol_headlines_data:
-                logger.debug(f"  Analyzing: [{source_key_from_scraper}] '{item_text[:80]}...'")
-                try:
-                    sentiment_score = analyze_sentiment(text=item_text, source_name=source_key_from_scraper) 
-                    if sentiment_score is not None:
-                        all_individual_headline_analysis.append({
-                            "run_id": run_id_str, "symbol": symbol, "source": source_key_from_scraper,
-                            "title_or_text": item_text, "sentiment_score": sentiment_score,
-                            "analysis_timestamp": current_datetime_iso
-                        })
-                        current_symbol_sentiments_details.append({'score': sentiment_score, 'source': source_key_from_scraper})
-                    else:
-                        logger.warning(f"Sentiment analysis returned None for item from '{source_key_from_scraper}' for '{symbol}'.")
-                except Exception as e_sentiment:
-                    logger.error(f"Error during sentiment analysis for item from '{source_key_from_scraper}' for '{symbol}': '{item_text[:50]}...'. Error: {e_sentiment}", exc_info=False)
-
-            if not current_symbol_sentiments_details:
-                logger.warning(f"No sentiment scores were successfully calculated for '{symbol}'. Skipping recommendation for this symbol.")
-                continue
-            
-            sentiment_scores_list = [s['score'] for s in current_symbol_sentiments_details]
-            avg_sentiment_for_symbol = sum(sentiment_scores_list) / len(sentiment_scores_list) if sentiment_scores_list else 0.0
-            sentiment_std_for_symbol = pd.Series(sentiment_scores_list).std() if len(sentiment_scores_list) > 1 else 0.0
-            
-            source_names_for_symbol = [s['source'] for s in current_symbol_sentiments_details]
-            source_counts = pd.Series(source_names_for_symbol).value_counts()
-            main_source_overall_str = source_counts.index[0] if not source_counts.empty else "N/A"
+            logger.info(f"Average sentiment for '{symbol}': {avg_sentiment_for_symbol:.4f} (Std: {sentiment_std_for_symbol:.4f}, Based on {num_items_for_symbol} items, Main source by count: {main_source_overall_str})")
 
-            logger.info(f"Average sentiment for '{symbol}': {avg_sentiment_for_symbol:.4f} (Std: {sentiment_std_for_symbol:.4f}, Based on {len(sentiment_scores_list)} items, Main source by count: {main_source_overall_str})")
+            new_decayed_items = sum(
+                decayed_state.add(symbol, row["sentiment_score"], row["source"], run_datetime, item_key=row["title_or_text"])
+                for row in symbol_result["headline_rows"]
+            )
+            logger.info(f"Decayed sentiment for '{symbol}': {decayed_state.score(symbol):.4f} (Effective weight: {decayed_state.weight(symbol, run_datetime):.2f}, {new_decayed_items} new items)")
 
             recommendation_output = make_recommendation(avg_sentiment_for_symbol)
             current_trade_decision = recommendation_output.get("decision", "ERROR_NO_DECISION").upper() 
@@ -218,15 +240,9 @@ def main(force_run: bool = False):
             logger.info(f"Recommendation for '{symbol}': {current_trade_decision} (Based on raw average score: {avg_sentiment_for_symbol:.4f})")
             
             previous_decision_for_symbol = "N/A" 
-            if not learning_log_df.empty: 
-                symbol_specific_entries = learning_log_df[learning_log_df['symbol'] == symbol]
-                if not symbol_specific_entries.empty:
-                    if pd.api.types.is_datetime64_any_dtype(symbol_specific_entries['datetime']):
-                        symbol_specific_log = symbol_specific_entries.sort_values(by='datetime', ascending=False)
-                        if not symbol_specific_log.empty:
-                            previous_decision_for_symbol = str(symbol_specific_log.iloc[0]['decision']).upper()
-                    else:
-                        logger.warning(f"Cannot determine previous decision for {symbol} as 'datetime' column in loaded log is not a datetime type (it's {symbol_specific_entries['datetime'].dtype}).")
+            previous_state = previous_states.get(symbol)
+            if previous_state and previous_state.get("decision"):
+                previous_decision_for_symbol = str(previous_state["decision"]).upper()
             
             logger.info(f"Previous decision for '{symbol}' from cumulative log: {previous_decision_for_symbol}, Current decision: {current_trade_decision}")
 
@@ -246,18 +262,18 @@ def main(force_run: bool = False):
                 "run_id": run_id_str, "symbol": symbol, "datetime": current_datetime_iso,
                 "sentiment_avg": round(avg_sentiment_for_symbol, 4),
                 "sentiment_std": round(sentiment_std_for_symbol, 4),
-                "num_total_articles": len(sentiment_scores_list),
+                "num_total_articles": num_items_for_symbol,
                 "main_source_overall": main_source_overall_str,
                 "decision": current_trade_decision,
                 "previous_decision": previous_decision_for_symbol,
                 "trade_executed": trade_action_taken,
                 "raw_scores_details": json.dumps(current_symbol_sentiments_details) 
             }
-            learning_log_df = save_learning_log_entry(learning_log_df, learning_log_entry)
+            learning_log_writer.add(learning_log_entry) # נכתב לקובץ בפעם אחת בסוף הריצה
             
             aggregated_symbol_analysis.append({
                 "run_id": run_id_str, "symbol": symbol, "avg_sentiment_score": round(avg_sentiment_for_symbol, 4),
-                "num_analyzed_headlines": len(sentiment_scores_list), "trade_decision": current_trade_decision,
+                "num_analyzed_headlines": num_items_for_symbol, "trade_decision": current_trade_decision,
                 "previous_decision_logged": previous_decision_for_symbol, 
                 "trade_attempted": trade_action_taken, 
                 "processing_datetime": current_datetime_iso
@@ -266,6 +282,15 @@ def main(force_run: bool = False):
         except Exception as e_symbol_processing:
             logger.error(f"A critical error occurred while processing symbol '{symbol}': {e_symbol_processing}", exc_info=True)
 
+    # --- כתיבת שורות הריצה ללוג המצטבר (append אחד) ---
+    try:
+        learning_log_writer.flush()
+    except Exception as e_log_flush:
+        logger.error(f"Error appending {learning_log_writer.pending_count} entries to learning log {LEARNING_LOG_CSV_PATH}: {e_log_flush}", exc_info=True)
+
+    if decayed_state.save(DECAYED_SENTIMENT_STATE_PATH):
+        logger.info(f"Saved decayed sentiment state for {len(decayed_state.symbols)} symbols to {DECAYED_SENTIMENT_STATE_PATH}")
+
     # --- שמירת דוחות יומיים ---
     daily_summary_report_filepath = None
     daily_detailed_report_filepath = None 
@@ -305,7 +330,13 @@ def main(force_run: bool = False):
     else:
         logger.warning(f"Cumulative log file not found at {LEARNING_LOG_CSV_PATH} for email attachment (it might have failed to save or was not created).")
 
-    if 'send_run_success_email' in globals() and callable(send_run_success_email):
+    try:
+        from email_sender import send_run_success_email # smtplib/MIME נטענים רק כשמגיעים לשליחת המייל
+    except ImportError as e_email_import:
+        logger.error(f"Could not load the email sender module: {e_email_import}. Skipping email for run ID: {run_id_str}.")
+        send_run_success_email = None
+
+    if send_run_success_email is not None:
         if attachments_to_send: 
             logger.info(f"Attempting to send summary email for run ID: {run_id_str} with attachments: {attachments_to_send}")
             email_sent_successfully = send_run_success_email(
@@ -2,6 +2,7 @@
 import requests
 from bs4 import BeautifulSoup
 from settings import setup_logger, MIN_HEADLINE_LENGTH
+from http_client import http_get
 
 logger = setup_logger(__name__)
 
@@ -21,14 +22,10 @@ def fetch_marketwatch_titles(symbol: str, base_url_template: str) -> list[tuple[
 
     target_url = base_url_template.replace("{symbol_lower}", symbol.lower())
     
-    headers = { # נסה עם User-Agent זה, אם עדיין נחסם, נסה אחר או נטרל זמנית
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36"
-    }
-
     logger.info(f"Fetching news for '{symbol}' from {source_name} via scraping URL: {target_url}")
 
     try:
-        response = requests.get(target_url, headers=headers, timeout=20) 
+        response = http_get(target_url, timeout=20) # User-Agent משותף מ-http_client (HTTP_USER_AGENT)
         response.raise_for_status()
 
         soup = BeautifulSoup(response.text, "html.parser")
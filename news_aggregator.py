@@ -1,27 +1,46 @@
 # news_aggregator.py
+import asyncio
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlparse
 
-from yahoo_scraper import get_yahoo_news
-from investors_scraper import get_investors_news
-from marketwatch_scraper import fetch_marketwatch_titles
-from cnbc_scraper import get_cnbc_titles
-
-from settings import setup_logger, NEWS_SOURCES_CONFIG, DEFAULT_MAX_HEADLINES_PER_SOURCE, MIN_HEADLINE_LENGTH
+from settings import (
+    setup_logger, NEWS_SOURCES_CONFIG, DEFAULT_MAX_HEADLINES_PER_SOURCE, MIN_HEADLINE_LENGTH,
+    NEWS_FETCH_MAX_CONCURRENCY, NEWS_FETCH_MAX_PER_HOST, NEWS_FETCH_TIMEOUT_SECONDS
+)
 
 logger = setup_logger(__name__)
 
+# שם פונקציה -> (מודול, פונקציה). המודול של ה-scraper (ו-bs4/feedparser שלו) נטען רק כשהמקור מאופשר ונשלף בפועל
 AVAILABLE_SCRAPER_FUNCTIONS = {
-    "get_yahoo_news": get_yahoo_news,
-    "get_investors_news": get_investors_news,
-    "fetch_marketwatch_titles": fetch_marketwatch_titles,
-    "get_cnbc_titles": get_cnbc_titles,
+    "get_yahoo_news": ("yahoo_scraper", "get_yahoo_news"),
+    "get_investors_news": ("investors_scraper", "get_investors_news"),
+    "fetch_marketwatch_titles": ("marketwatch_scraper", "fetch_marketwatch_titles"),
+    "get_cnbc_titles": ("cnbc_scraper", "get_cnbc_titles"),
 }
 
-def fetch_all_news(symbol: str, max_headlines_total: int = 50) -> list[tuple[str, str]]:
-    all_collected_headlines = []
-    seen_titles_lower = set() 
+# מקורות שיכולים לשרת כמה סמלים בבקשה אחת: (symbols, url_template) -> {symbol: [(title, source_name), ...]}
+# גודל הקבוצה נקבע לפי "symbols_per_request" בהגדרות המקור (אם לא מוגדר – כל הסמלים של הריצה בבקשה אחת).
+AVAILABLE_BATCH_SCRAPER_FUNCTIONS = {
+    "get_cnbc_titles": ("cnbc_scraper", "get_cnbc_titles_for_symbols"),
+    "get_yahoo_news": ("yahoo_scraper", "get_yahoo_news_for_symbols"),
+}
 
-    logger.info(f"Starting news aggregation for symbol: '{symbol}'")
+def _load_scraper_function(registry: dict, scraper_function_name: str):
+    """
+    טוען (בשימוש הראשון) את מודול ה-scraper ומחזיר את הפונקציה, או None אם היא לא רשומה. זורק ImportError אם הטעינה נכשלה.
+    אפשר לרשום ב-registry גם פונקציה עצמה במקום (מודול, פונקציה).
+    """
+    entry = registry.get(scraper_function_name)
+    if entry is None or callable(entry):
+        return entry
+    module_name, function_name = entry
+    return getattr(importlib.import_module(module_name), function_name)
 
+def _get_enabled_sources() -> list[tuple[str, dict, callable]]:
+    """מחזיר את המקורות המאופשרים (לפי הסדר ב-NEWS_SOURCES_CONFIG) יחד עם פונקציית ה-scraper שלהם."""
+    enabled_sources = []
     for source_key, source_config in NEWS_SOURCES_CONFIG.items():
         if not source_config.get("enabled", False):
             logger.info(f"Source '{source_key}' is disabled. Skipping.")
@@ -32,51 +51,103 @@ def fetch_all_news(symbol: str, max_headlines_total: int = 50) -> list[tuple[str
             logger.warning(f"No 'scraper_function_name' defined for source: '{source_key}'. Skipping.")
             continue
 
-        scraper_function = AVAILABLE_SCRAPER_FUNCTIONS.get(scraper_function_name)
+        try:
+            scraper_function = _load_scraper_function(AVAILABLE_SCRAPER_FUNCTIONS, scraper_function_name)
+        except (ImportError, AttributeError) as e:
+            logger.error(f"Could not load scraper function '{scraper_function_name}' for source '{source_key}': {e}. Skipping.")
+            continue
         if not scraper_function:
             logger.error(f"Scraper function '{scraper_function_name}' for source '{source_key}' not found in AVAILABLE_SCRAPER_FUNCTIONS. Skipping.")
             continue
 
-        logger.debug(f"Attempting to fetch news from '{source_key}' for '{symbol}' using function '{scraper_function_name}'...")
-        
-        scraper_args = [symbol]
-        if "rss_url_template" in source_config and source_config["rss_url_template"] is not None:
-            scraper_args.append(source_config["rss_url_template"])
-        elif "base_url_template" in source_config and source_config["base_url_template"] is not None:
-            scraper_args.append(source_config["base_url_template"])
-        else: # מקרה שבו הפונקציה לא צריכה URL מההגדרות (למשל, אם ה-URL מקודד בה)
-             logger.debug(f"No specific URL template found in config for '{source_key}', assuming function '{scraper_function_name}' handles its own URL or does not need one.")
-        
-        try:
-            source_specific_headlines = scraper_function(*scraper_args) 
+        enabled_sources.append((source_key, source_config, scraper_function))
+    return enabled_sources
+
+def _get_source_url_template(source_config: dict) -> str | None:
+    if "rss_url_template" in source_config and source_config["rss_url_template"] is not None:
+        return source_config["rss_url_template"]
+    if "base_url_template" in source_config and source_config["base_url_template"] is not None:
+        return source_config["base_url_template"]
+    return None
+
+def _build_scraper_args(symbol: str, source_key: str, source_config: dict) -> list:
+    scraper_args = [symbol]
+    url_template = _get_source_url_template(source_config)
+    if url_template is not None:
+        scraper_args.append(url_template)
+    else: # מקרה שבו הפונקציה לא צריכה URL מההגדרות (למשל, אם ה-URL מקודד בה)
+        logger.debug(f"No specific URL template found in config for '{source_key}', assuming function '{source_config.get('scraper_function_name')}' handles its own URL or does not need one.")
+    return scraper_args
 
-            if not source_specific_headlines:
+def _get_source_host(source_config: dict) -> str:
+    url_template = _get_source_url_template(source_config)
+    if not url_template:
+        return "unknown"
+    return urlparse(url_template).hostname or "unknown"
+
+def _call_scraper(symbol: str, source_key: str, source_config: dict, scraper_function) -> list[tuple[str, str]] | None:
+    scraper_function_name = source_config.get("scraper_function_name")
+    logger.debug("Attempting to fetch news from '%s' for '%s' using function '%s'...", source_key, symbol, scraper_function_name)
+    scraper_args = _build_scraper_args(symbol, source_key, source_config)
+    try:
+        return scraper_function(*scraper_args)
+    except TypeError as te:
+        logger.error(f"TypeError calling scraper function '{scraper_function_name}' for '{source_key}': {te}. Args: {scraper_args}. Check arguments and function signature.", exc_info=True)
+    except Exception as e:
+        logger.error(f"Error processing source '{source_key}' for '{symbol}': {e}", exc_info=True)
+    return None
+
+def _get_batch_scraper_function(source_config: dict):
+    if source_config.get("symbols_per_request") == 1:
+        return None # בקשה נפרדת לכל סמל דרך הפונקציה הרגילה
+    # המודול כבר נטען ב-_get_enabled_sources (אותו מודול כמו הפונקציה הרגילה)
+    return _load_scraper_function(AVAILABLE_BATCH_SCRAPER_FUNCTIONS, source_config.get("scraper_function_name"))
+
+def _get_symbol_groups(symbols: list[str], source_config: dict) -> list[list[str]]:
+    group_size = source_config.get("symbols_per_request") or len(symbols) or 1
+    return [symbols[group_start:group_start + group_size] for group_start in range(0, len(symbols), group_size)]
+
+def _call_batch_scraper(symbols: list[str], source_key: str, source_config: dict, batch_scraper_function) -> dict[str, list[tuple[str, str]]] | None:
+    scraper_function_name = source_config.get("scraper_function_name")
+    logger.debug("Attempting to fetch news from '%s' for %d symbols in one batch using '%s'...", source_key, len(symbols), scraper_function_name)
+    try:
+        return batch_scraper_function(symbols, _get_source_url_template(source_config))
+    except Exception as e:
+        logger.error(f"Error processing batched source '{source_key}' for {len(symbols)} symbols: {e}", exc_info=True)
+    return None
+
+def _merge_source_headlines(symbol: str, source_results: list[tuple[str, list | None]], max_headlines_total: int) -> list[tuple[str, str]]:
+    """
+    מאחד את תוצאות המקורות (לפי סדר NEWS_SOURCES_CONFIG) לרשימה אחת של (title, source_key),
+    עם סינון כפילויות (ללא תלות ברישיות) וכותרות קצרות מ-MIN_HEADLINE_LENGTH.
+    """
+    all_collected_headlines = []
+    seen_titles_lower = set()
+
+    for source_key, source_specific_headlines in source_results:
+        if not source_specific_headlines:
+            if source_specific_headlines is not None:
                 logger.info(f"No headlines returned from '{source_key}' for '{symbol}'.")
-                continue
+            continue
 
-            headlines_added_from_this_source = 0
-            for title, reported_source_name in source_specific_headlines[:DEFAULT_MAX_HEADLINES_PER_SOURCE]:
-                cleaned_title = title.strip()
-                title_lower = cleaned_title.lower()
-
-                if cleaned_title and len(cleaned_title) >= MIN_HEADLINE_LENGTH and title_lower not in seen_titles_lower:
-                    all_collected_headlines.append((cleaned_title, source_key))
-                    seen_titles_lower.add(title_lower)
-                    headlines_added_from_this_source += 1
-                elif title_lower in seen_titles_lower:
-                    logger.debug(f"Duplicate title (case-insensitive) skipped from '{source_key}': '{cleaned_title}'")
-                elif cleaned_title:
-                     logger.debug(f"Short title skipped from '{source_key}': '{cleaned_title}' (Length: {len(cleaned_title)})")
-
-            if headlines_added_from_this_source > 0:
-                logger.info(f"Added {headlines_added_from_this_source} unique headlines from '{source_key}' for '{symbol}'.")
-            else:
-                logger.info(f"No new unique headlines added from '{source_key}' for '{symbol}'.")
-        
-        except TypeError as te:
-            logger.error(f"TypeError calling scraper function '{scraper_function_name}' for '{source_key}': {te}. Args: {scraper_args}. Check arguments and function signature.", exc_info=True)
-        except Exception as e:
-            logger.error(f"Error processing source '{source_key}' for '{symbol}': {e}", exc_info=True)
+        headlines_added_from_this_source = 0
+        for title, reported_source_name in source_specific_headlines[:DEFAULT_MAX_HEADLINES_PER_SOURCE]:
+            cleaned_title = title.strip()
+            title_lower = cleaned_title.lower()
+
+            if cleaned_title and len(cleaned_title) >= MIN_HEADLINE_LENGTH and title_lower not in seen_titles_lower:
+                all_collected_headlines.append((cleaned_title, source_key))
+                seen_titles_lower.add(title_lower)
+                headlines_added_from_this_source += 1
+            elif title_lower in seen_titles_lower:
+                logger.debug("Duplicate title (case-insensitive) skipped from '%s': '%s'", source_key, cleaned_title)
+            elif cleaned_title:
+                 logger.debug("Short title skipped from '%s': '%s' (Length: %d)", source_key, cleaned_title, len(cleaned_title))
+
+        if headlines_added_from_this_source > 0:
+            logger.info(f"Added {headlines_added_from_this_source} unique headlines from '{source_key}' for '{symbol}'.")
+        else:
+            logger.info(f"No new unique headlines added from '{source_key}' for '{symbol}'.")
 
         if len(all_collected_headlines) >= max_headlines_total:
             logger.info(f"Reached total headline limit of {max_headlines_total} for '{symbol}'. Stopping further fetching.")
@@ -88,3 +159,101 @@ def fetch_all_news(symbol: str, max_headlines_total: int = 50) -> list[tuple[str
         logger.info(f"No headlines aggregated for '{symbol}' across all sources.")
 
     return all_collected_headlines[:max_headlines_total]
+
+async def _run_limited(call, host_semaphore: asyncio.Semaphore, executor_slots: asyncio.Semaphore, executor: ThreadPoolExecutor,
+                       timeout_seconds: float, description: str):
+    # ה-scrapers עצמם חוסמים (urllib/feedparser/requests), לכן כל בקשה רצה ב-thread נפרד
+    # וה-event loop רק מתזמן אותן, מגביל מקביליות לכל שרת ואוכף timeout לכל בקשה.
+    # ה-timeout של הבקשה עצמה מוגדר ב-scraper (timeout של requests); כאן הוא רק גיבוי. הבקשה נשלחת ל-executor רק כשיש
+    # thread פנוי (executor_slots), כך שזמן ההמתנה בתור לא נספר ב-timeout, והמקום מתפנה רק כשה-thread באמת סיים –
+    # גם אם הבקשה כבר חרגה מה-timeout וממשיכה לחסום אותו.
+    async with host_semaphore:
+        await executor_slots.acquire()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(executor, call)
+        future.add_done_callback(lambda _: executor_slots.release())
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=timeout_seconds)
+        except asyncio.TimeoutError:
+            logger.error(f"Timed out after {timeout_seconds}s fetching {description}. Skipping this source.")
+            return None
+
+async def _fetch_all_news_async(symbols: list[str], max_headlines_total: int,
+                                max_concurrency: int, max_per_host: int, timeout_seconds: float) -> dict[str, list[tuple[str, str]]]:
+    enabled_sources = _get_enabled_sources()
+    host_semaphores = {}
+    for _, source_config, _ in enabled_sources:
+        host_semaphores.setdefault(_get_source_host(source_config), asyncio.Semaphore(max_per_host))
+
+    symbol_groups_by_source = {
+        source_key: _get_symbol_groups(symbols, source_config) for source_key, source_config, _ in enabled_sources
+        if _get_batch_scraper_function(source_config) is not None
+    }
+    num_requests = sum(
+        len(symbol_groups_by_source[source_key]) if source_key in symbol_groups_by_source else len(symbols)
+        for source_key, _, _ in enabled_sources
+    )
+    if num_requests == 0:
+        return {symbol: _merge_source_headlines(symbol, [], max_headlines_total) for symbol in symbols}
+
+    logger.info(f"Fetching {num_requests} requests concurrently for {len(symbols)} symbols from {len(enabled_sources)} sources (max concurrency: {max_concurrency}, per host: {max_per_host}, timeout: {timeout_seconds}s).")
+    num_workers = min(max_concurrency, num_requests)
+    executor = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="news_fetch")
+    executor_slots = asyncio.Semaphore(num_workers)
+    try:
+        symbol_tasks = {}
+        batch_tasks = {}
+        for source_key, source_config, scraper_function in enabled_sources:
+            host_semaphore = host_semaphores[_get_source_host(source_config)]
+            if source_key in symbol_groups_by_source:
+                batch_function = _get_batch_scraper_function(source_config)
+                batch_tasks[source_key] = [
+                    asyncio.ensure_future(_run_limited(
+                        partial(_call_batch_scraper, group_symbols, source_key, source_config, batch_function),
+                        host_semaphore, executor_slots, executor, timeout_seconds, f"'{source_key}' for {len(group_symbols)} symbols"
+                    ))
+                    for group_symbols in symbol_groups_by_source[source_key]
+                ]
+                continue
+            for symbol in symbols:
+                symbol_tasks[(symbol, source_key)] = asyncio.ensure_future(_run_limited(
+                    partial(_call_scraper, symbol, source_key, source_config, scraper_function),
+                    host_semaphore, executor_slots, executor, timeout_seconds, f"'{source_key}' for '{symbol}'"
+                ))
+        await asyncio.gather(*symbol_tasks.values(), *(task for group_tasks in batch_tasks.values() for task in group_tasks))
+    finally:
+        # לא ממתינים ל-threads שחרגו מה-timeout; הם ייסגרו כשה-socket timeout של ה-scraper יפקע
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    # פירוק תוצאות הבקשות המקובצות חזרה לכל סמל (None = הבקשה של הקבוצה נכשלה)
+    batch_results = {}
+    for source_key, group_tasks in batch_tasks.items():
+        for group_symbols, group_task in zip(symbol_groups_by_source[source_key], group_tasks):
+            group_result = group_task.result()
+            for symbol in group_symbols:
+                batch_results[(symbol, source_key)] = group_result.get(symbol, []) if group_result is not None else None
+
+    news_by_symbol = {}
+    for symbol in symbols:
+        logger.info(f"Starting news aggregation for symbol: '{symbol}'")
+        source_results = []
+        for source_key, _, _ in enabled_sources:
+            if source_key in symbol_groups_by_source:
+                source_results.append((source_key, batch_results[(symbol, source_key)]))
+            else:
+                source_results.append((source_key, symbol_tasks[(symbol, source_key)].result()))
+        news_by_symbol[symbol] = _merge_source_headlines(symbol, source_results, max_headlines_total)
+    return news_by_symbol
+
+def fetch_all_news_for_symbols(symbols: list[str], max_headlines_total: int = 50,
+                               max_concurrency: int = NEWS_FETCH_MAX_CONCURRENCY,
+                               max_per_host: int = NEWS_FETCH_MAX_PER_HOST,
+                               timeout_seconds: float = NEWS_FETCH_TIMEOUT_SECONDS) -> dict[str, list[tuple[str, str]]]:
+    """
+    שולף במקביל את כל בקשות ה-(symbol, source) של הריצה ומחזיר מילון symbol -> רשימת (title, source_key),
+    בדיוק באותו פורמט ועם אותם כללי סינון כמו fetch_all_news.
+    """
+    return asyncio.run(_fetch_all_news_async(symbols, max_headlines_total, max_concurrency, max_per_host, timeout_seconds))
+
+def fetch_all_news(symbol: str, max_headlines_total: int = 50) -> list[tuple[str, str]]:
+    return fetch_all_news_for_symbols([symbol], max_headlines_total=max_headlines_total)[symbol]
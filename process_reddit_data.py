@@ -1,5 +1,6 @@
 import pandas as pd
-import requests
+import numpy as np
+import http_client
 import os
 import logging
 import re # עבור ניקוי טקסט עם ביטויים רגולריים
@@ -7,9 +8,12 @@ import json # אם נרצה לשמור משהו מורכב יותר, כרגע פ
 from datetime import datetime 
 
 # --- הגדרות ---
+REDDIT_DAILY_KEEP_COMBINED_TEXT = False
+REDDIT_RAW_CSV_CHUNK_ROWS = 50000
 try:
     from email_sender import send_email
     from settings import setup_logger, MIN_HEADLINE_LENGTH # נייבא MIN_HEADLINE_LENGTH לסינון גוף הפוסט
+    from settings import REDDIT_DAILY_KEEP_COMBINED_TEXT, REDDIT_RAW_CSV_CHUNK_ROWS
     EMAIL_SENDER_AVAILABLE = True
     logger = setup_logger("ProcessRedditData", level=logging.INFO)
 except ImportError:
@@ -19,6 +23,14 @@ except ImportError:
     logger.warning("Could not import from email_sender or settings. Email/advanced logging functionality may be limited.")
     MIN_HEADLINE_LENGTH = 10 # ברירת מחדל אם לא מיובא
 
+try:
+    from sentiment_analyzer import analyze_sentiments
+    SENTIMENT_ANALYZER_AVAILABLE = True
+except ImportError:
+    SENTIMENT_ANALYZER_AVAILABLE = False
+    logger.error("Could not import 'analyze_sentiments' from sentiment_analyzer.py. Daily sentiment aggregates will be empty.")
+    def analyze_sentiments(texts, sources=None): return np.full(len(texts), np.nan)
+
 # הקישור הישיר לקובץ ה-CSV שלך ב-Google Drive
 GOOGLE_DRIVE_DOWNLOAD_URL = "https://drive.google.com/uc?export=download&id=1wxqWXzURwINQB9HZ-OyocvB6wJRvgEso"
 DOWNLOADED_RAW_CSV_PATH = "downloaded_reddit_historical_raw.csv" # שם הקובץ כפי שיישמר זמנית בענן
@@ -35,22 +47,13 @@ VALID_FLAIRS_TO_KEEP_LOWER = {
 MIN_POST_SCORE_FOR_BODY_ONLY_RELEVANCE = 20 # אם הסמל רק בגוף, דרוש ניקוד כזה
 MIN_BODY_LENGTH_FOR_BODY_ONLY_RELEVANCE = 50 # ואורך גוף כזה
 
+# ציוני הפוסטים בסקאלה 0-1 של analyze_sentiment ((compound + 1) / 2). הספים המקובלים של VADER (compound >= 0.05 חיובי,
+# compound <= -0.05 שלילי) בסקאלה הזו:
+POSITIVE_SENTIMENT_THRESHOLD = 0.525
+NEGATIVE_SENTIMENT_THRESHOLD = 0.475
+
 def download_file_from_google_drive(url, destination):
-    logger.info(f"Attempting to download file from Google Drive URL to {destination}...")
-    try:
-        response = requests.get(url, stream=True, timeout=60) # timeout מוגדל ל-60 שניות
-        response.raise_for_status()
-        with open(destination, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192): 
-                f.write(chunk)
-        logger.info(f"File downloaded successfully to {destination}")
-        return True
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error downloading file: {e}")
-        return False
-    except Exception as e:
-        logger.error(f"An unexpected error occurred during download: {e}")
-        return False
+    return http_client.download_file(url, destination, "Reddit historical raw CSV", timeout=60) # timeout מוגדל ל-60 שניות
 
 def clean_text(text: str) -> str:
     if not isinstance(text, str):
@@ -62,27 +65,12 @@ def clean_text(text: str) -> str:
     text = re.sub(r'\s+', ' ', text).strip() # הסר רווחים כפולים
     return text
 
-if __name__ == "__main__":
-    logger.info("--- Starting Reddit Data Processing Script ---")
-
-    if not download_file_from_google_drive(GOOGLE_DRIVE_DOWNLOAD_URL, DOWNLOADED_RAW_CSV_PATH):
-        logger.error("Failed to download Reddit data file. Aborting.")
-        exit()
-
-    if not os.path.exists(DOWNLOADED_RAW_CSV_PATH):
-        logger.error(f"Downloaded file {DOWNLOADED_RAW_CSV_PATH} not found after download attempt. Aborting.")
-        exit()
-    
-    logger.info(f"Loading raw Reddit data from {DOWNLOADED_RAW_CSV_PATH}...")
-    try:
-        df_raw = pd.read_csv(DOWNLOADED_RAW_CSV_PATH)
-        logger.info(f"Successfully loaded {len(df_raw)} raw Reddit posts.")
-    except Exception as e:
-        logger.error(f"Failed to load raw Reddit CSV: {e}", exc_info=True)
-        exit()
-
-    # 1. טיפול ראשוני בנתונים
-    df = df_raw.copy()
+def prepare_relevant_posts(df_raw_chunk: pd.DataFrame, counters: dict) -> pd.DataFrame:
+    """
+    שלבי הסינון והניקוי על chunk של פוסטים גולמיים: תאריך תקין, פלייר, רלוונטיות לסמל, וטקסט נקי באורך מספיק
+    (עמודת text_for_sentiment). מעדכן ב-counters את מספר הפוסטים אחרי כל שלב, לדוח.
+    """
+    df = df_raw_chunk.copy()
     df['created_utc_iso'] = pd.to_datetime(df['created_utc_iso'], errors='coerce')
     df.dropna(subset=['created_utc_iso'], inplace=True) # הסר שורות ללא תאריך תקין
     df['date_only'] = df['created_utc_iso'].dt.date # עמודת תאריך בלבד
@@ -90,62 +78,154 @@ if __name__ == "__main__":
     df['title'] = df['title'].fillna('').astype(str)
     df['body'] = df['body'].fillna('').astype(str)
     df['flair'] = df['flair'].fillna('None').astype(str).str.lower() # נרמל פליירים לאותיות קטנות וטפל ב-NaN
+    counters['initial_posts'] += len(df)
 
-    logger.info(f"Initial number of posts: {len(df)}")
-
-    # 2. סינון לפי פלייר
-    df = df[df['flair'].isin(VALID_FLAIRS_TO_KEEP_LOWER)]
-    logger.info(f"Posts after flair filtering: {len(df)}")
+    # סינון לפי פלייר
+    df = df[df['flair'].isin(VALID_FLAIRS_TO_KEEP_LOWER)].copy()
+    counters['after_flair_filter'] += len(df)
+    if df.empty:
+        return df
 
-    # 3. סינון לפי רלוונטיות לסמל
+    # סינון לפי רלוונטיות לסמל
     df['symbol_in_title'] = df.apply(lambda row: str(row['symbol_searched']).lower() in row['title'].lower(), axis=1)
     df['symbol_in_body'] = df.apply(lambda row: str(row['symbol_searched']).lower() in row['body'].lower(), axis=1)
-    
+
     condition_title = df['symbol_in_title']
     condition_body_strong = (
-        df['symbol_in_body'] & 
-        (df['score'] >= MIN_POST_SCORE_FOR_BODY_ONLY_RELEVANCE) & 
+        df['symbol_in_body'] &
+        (df['score'] >= MIN_POST_SCORE_FOR_BODY_ONLY_RELEVANCE) &
         (df['body'].str.len() >= MIN_BODY_LENGTH_FOR_BODY_ONLY_RELEVANCE)
     )
-    
     df_relevant = df[condition_title | condition_body_strong].copy() # OR לוגי
-    logger.info(f"Posts after symbol relevance filtering: {len(df_relevant)}")
-
+    counters['after_relevance_filter'] += len(df_relevant)
     if df_relevant.empty:
-        logger.warning("No relevant posts found after filtering. Exiting.")
-        exit()
+        return df_relevant
 
-    # 4. ניקוי טקסט (על הכותרת והגוף בנפרד)
-    logger.info("Cleaning text for titles and bodies...")
+    # ניקוי טקסט (על הכותרת והגוף בנפרד) ויצירת טקסט מאוחד לכל פוסט
     df_relevant['title_cleaned'] = df_relevant['title'].apply(clean_text)
     df_relevant['body_cleaned'] = df_relevant['body'].apply(clean_text)
-
-    # 5. יצירת טקסט מאוחד לניתוח סנטימנט
-    # נשאיר רק פוסטים שבהם יש טקסט כלשהו אחרי ניקוי
-    df_relevant['text_for_sentiment'] = df_relevant.apply(
-        lambda row: (row['title_cleaned'] + ". " + row['body_cleaned']).strip('. '), 
-        axis=1
-    )
+    df_relevant['text_for_sentiment'] = (df_relevant['title_cleaned'] + ". " + df_relevant['body_cleaned']).str.strip('. ')
     df_relevant = df_relevant[df_relevant['text_for_sentiment'].str.len() >= MIN_HEADLINE_LENGTH].copy()
-    logger.info(f"Posts after ensuring text_for_sentiment is not too short: {len(df_relevant)}")
+    counters['with_sufficient_text'] += len(df_relevant)
+    return df_relevant
+
+class DailySentimentAggregator:
+    """
+    צבירה יומית לכל (תאריך, מניה) תוך כדי זרימה: כל chunk של פוסטים מנוקד (כל פוסט פעם אחת) ומצטמצם לסכומים חלקיים
+    (מספר פוסטים, סכום ציונים וריבועיהם, סכום משוקלל, ספירת חיוביים/שליליים), כך שבזיכרון נשמרת רק שורה לכל יום ומניה.
+    המשקל בממוצע המשוקלל הוא ה-score של הפוסט ב-Reddit, max(score, 0) + 1 – פוסט עם 0 או שלילי עדיין נספר פעם אחת.
+    הטקסט המאוחד היומי נשמר רק אם keep_combined_text=True.
+    """
+
+    _SUM_COLUMNS = [
+        'num_relevant_posts_today', 'score_sum', 'score_count', 'num_comments_sum', 'num_comments_count', 'num_scored_posts_today',
+        'sentiment_sum', 'sentiment_sq_sum', 'weighted_sentiment_sum', 'weight_sum', 'positive_posts', 'negative_posts'
+    ]
+
+    def __init__(self, keep_combined_text: bool = False):
+        self.keep_combined_text = keep_combined_text
+        self._partial_sums = []
+        self._texts_by_day = {} # (date, ticker) -> רשימת טקסטים, רק עם keep_combined_text
+
+    def add(self, df_relevant: pd.DataFrame):
+        if df_relevant.empty:
+            return
+        scores = analyze_sentiments(df_relevant['text_for_sentiment'].tolist())
+        scored = ~np.isnan(scores)
+        scores_or_zero = np.where(scored, scores, 0.0)
+        weights = np.where(scored, np.maximum(df_relevant['score'].fillna(0).to_numpy(dtype=float), 0.0) + 1.0, 0.0)
+        post_scores = df_relevant['score'].to_numpy(dtype=float)
+        num_comments = df_relevant['num_comments'].to_numpy(dtype=float)
+
+        partial = pd.DataFrame({
+            'date_only': df_relevant['date_only'].to_numpy(),
+            'symbol_searched': df_relevant['symbol_searched'].to_numpy(),
+            'num_relevant_posts_today': 1,
+            # כמו mean: ערכים חסרים לא נספרים, ולכן לצד כל סכום נשמר מספר הערכים הקיימים
+            'score_sum': np.nan_to_num(post_scores),
+            'score_count': (~np.isnan(post_scores)).astype(int),
+            'num_comments_sum': np.nan_to_num(num_comments),
+            'num_comments_count': (~np.isnan(num_comments)).astype(int),
+            'num_scored_posts_today': scored.astype(int),
+            'sentiment_sum': scores_or_zero,
+            'sentiment_sq_sum': scores_or_zero ** 2,
+            'weighted_sentiment_sum': scores_or_zero * weights,
+            'weight_sum': weights,
+            'positive_posts': (scored & (scores_or_zero >= POSITIVE_SENTIMENT_THRESHOLD)).astype(int),
+            'negative_posts': (scored & (scores_or_zero <= NEGATIVE_SENTIMENT_THRESHOLD)).astype(int),
+        })
+        self._partial_sums.append(partial.groupby(['date_only', 'symbol_searched'], sort=False).sum())
+
+        if self.keep_combined_text:
+            for key, texts in df_relevant.groupby(['date_only', 'symbol_searched'], sort=False)['text_for_sentiment']:
+                self._texts_by_day.setdefault(key, []).extend(texts)
+
+    def result(self) -> pd.DataFrame:
+        """שורה לכל (Date, Ticker) עם הצבירות הסופיות (באותו שם עמודות ש-create_backtest_dataset.py מצפה להן)."""
+        if not self._partial_sums:
+            return pd.DataFrame()
+        sums = pd.concat(self._partial_sums).groupby(level=[0, 1]).sum()
+
+        daily = pd.DataFrame(index=sums.index)
+        daily['num_relevant_posts_today'] = sums['num_relevant_posts_today']
+        daily['avg_score_today'] = sums['score_sum'] / sums['score_count'].where(sums['score_count'] > 0)
+        daily['avg_num_comments_today'] = sums['num_comments_sum'] / sums['num_comments_count'].where(sums['num_comments_count'] > 0)
+
+        count = sums['num_scored_posts_today']
+        scored_count = count.where(count > 0)
+        daily['num_scored_posts_today'] = count
+        daily['avg_daily_reddit_sentiment'] = (sums['sentiment_sum'] / scored_count).round(4)
+        daily['score_weighted_daily_reddit_sentiment'] = (sums['weighted_sentiment_sum'] / sums['weight_sum'].where(count > 0)).round(4)
+        # סטיית תקן מדגמית (ddof=1) מהסכומים; 0.0 ליום עם פוסט אחד, כמו ב-aggregate_sentiment_by_symbol
+        variance = (sums['sentiment_sq_sum'] - sums['sentiment_sum'] ** 2 / scored_count) / (scored_count - 1).where(count > 1)
+        daily['std_daily_reddit_sentiment'] = np.sqrt(variance.clip(lower=0)).where(count > 1, 0.0).where(count > 0).round(4)
+        daily['positive_posts_ratio_today'] = (sums['positive_posts'] / scored_count).round(4)
+        daily['negative_posts_ratio_today'] = (sums['negative_posts'] / scored_count).round(4)
+
+        if self.keep_combined_text:
+            daily['combined_reddit_text_for_day'] = [' \n '.join(self._texts_by_day[key]) for key in daily.index] # חבר טקסטים עם שורה חדשה
+
+        daily = daily.reset_index().rename(columns={'date_only': 'Date', 'symbol_searched': 'Ticker'})
+        daily['Date'] = pd.to_datetime(daily['Date']) # המר חזרה ל-datetime מלא
+        return daily
+
+if __name__ == "__main__":
+    logger.info("--- Starting Reddit Data Processing Script ---")
+
+    if not download_file_from_google_drive(GOOGLE_DRIVE_DOWNLOAD_URL, DOWNLOADED_RAW_CSV_PATH):
+        logger.error("Failed to download Reddit data file. Aborting.")
+        exit()
+
+    if not os.path.exists(DOWNLOADED_RAW_CSV_PATH):
+        logger.error(f"Downloaded file {DOWNLOADED_RAW_CSV_PATH} not found after download attempt. Aborting.")
+        exit()
     
-    if df_relevant.empty:
-        logger.warning("No posts with sufficient text for sentiment analysis after cleaning. Exiting.")
+    # 1-5. קריאה ב-chunks: סינון, ניקוי וניקוד של כל פוסט, וצבירה יומית מצטברת – בלי להחזיק את כל הקובץ בזיכרון
+    logger.info(f"Processing raw Reddit data from {DOWNLOADED_RAW_CSV_PATH} in chunks of {REDDIT_RAW_CSV_CHUNK_ROWS} rows...")
+    counters = {'raw_posts': 0, 'initial_posts': 0, 'after_flair_filter': 0, 'after_relevance_filter': 0, 'with_sufficient_text': 0}
+    aggregator = DailySentimentAggregator(keep_combined_text=REDDIT_DAILY_KEEP_COMBINED_TEXT)
+    try:
+        for df_raw_chunk in pd.read_csv(DOWNLOADED_RAW_CSV_PATH, chunksize=REDDIT_RAW_CSV_CHUNK_ROWS):
+            counters['raw_posts'] += len(df_raw_chunk)
+            aggregator.add(prepare_relevant_posts(df_raw_chunk, counters))
+            logger.info(f"Processed {counters['raw_posts']} raw posts so far ({counters['with_sufficient_text']} relevant posts scored).")
+    except Exception as e:
+        logger.error(f"Failed to process raw Reddit CSV: {e}", exc_info=True)
+        exit()
+
+    logger.info(f"Initial number of posts: {counters['initial_posts']}")
+    logger.info(f"Posts after flair filtering: {counters['after_flair_filter']}")
+    logger.info(f"Posts after symbol relevance filtering: {counters['after_relevance_filter']}")
+    logger.info(f"Posts after ensuring text_for_sentiment is not too short: {counters['with_sufficient_text']}")
+
+    if counters['with_sufficient_text'] == 0:
+        logger.warning("No relevant posts with sufficient text for sentiment analysis after filtering. Exiting.")
         exit()
 
     # 6. צבירה יומית לכל מניה
-    logger.info("Aggregating relevant Reddit text per symbol per day...")
-    daily_aggregated_text = df_relevant.groupby(['date_only', 'symbol_searched']).agg(
-        combined_reddit_text_for_day=('text_for_sentiment', lambda x: ' \n '.join(x)), # חבר טקסטים עם שורה חדשה
-        num_relevant_posts_today=('post_id', 'count'),
-        avg_score_today = ('score', 'mean'),
-        avg_num_comments_today = ('num_comments', 'mean')
-    ).reset_index()
-
-    daily_aggregated_text.rename(columns={'date_only': 'Date', 'symbol_searched': 'Ticker'}, inplace=True)
-    daily_aggregated_text['Date'] = pd.to_datetime(daily_aggregated_text['Date']) # המר חזרה ל-datetime מלא
+    daily_aggregated_text = aggregator.result()
     logger.info(f"Generated {len(daily_aggregated_text)} daily aggregated records for Reddit sentiment input.")
-    logger.debug(f"Sample of daily aggregated data:\n{daily_aggregated_text.head().to_string()}")
+    logger.debug(f"Sample of daily aggregated data:\n{daily_aggregated_text.drop(columns=['combined_reddit_text_for_day'], errors='ignore').head().to_string()}")
 
     # 7. שמירת ה-DataFrame המעובד
     if not daily_aggregated_text.empty:
@@ -157,10 +237,10 @@ if __name__ == "__main__":
                 email_subject = f"Sentibot - Processed Daily Reddit Data ({datetime.now().strftime('%Y-%m-%d')})"
                 email_body = (
                     f"Reddit historical data has been processed.\n"
-                    f"Input raw posts: {len(df_raw)}\n"
-                    f"Posts after flair filtering: {len(df[df['flair'].isin(VALID_FLAIRS_TO_KEEP_LOWER)])}\n" # חישוב מחדש לצורך הדוח
-                    f"Posts after symbol relevance filtering: {len(df_relevant[condition_title | condition_body_strong])}\n"
-                    f"Posts with sufficient text for sentiment: {len(df_relevant)}\n"
+                    f"Input raw posts: {counters['raw_posts']}\n"
+                    f"Posts after flair filtering: {counters['after_flair_filter']}\n"
+                    f"Posts after symbol relevance filtering: {counters['after_relevance_filter']}\n"
+                    f"Posts with sufficient text for sentiment: {counters['with_sufficient_text']}\n"
                     f"Total daily aggregated records: {len(daily_aggregated_text)}\n\n"
                     f"The processed data is attached as '{PROCESSED_DAILY_CSV_PATH}'.\n\n"
                     f"Sentibot"
@@ -0,0 +1,187 @@
+# rate_limiter.py
+# מגביל קצב מרכזי לכל השירותים החיצוניים (Reddit, Yahoo, CNBC, Alpaca, Google Drive...): token bucket אחד לכל שירות,
+# משותף לכל ה-threads, ה-sessions וה-clients בתהליך. הקצב מתעדכן לפי headers של המכסה שהשירות מחזיר
+# (X-Ratelimit-Remaining / X-Ratelimit-Reset של Reddit, RateLimit-* ו-X-RateLimit-* אצל אחרים), ועל 429 כל הבקשות לאותו
+# שירות ממתינות (Retry-After או backoff) והבקשה נשלחת שוב. כל מי שיוצא לרשת דרך requests מחובר דרך RateLimitedAdapter.
+import email.utils
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from settings import (
+    setup_logger, RATE_LIMITS, RATE_LIMIT_SERVICE_BY_HOST_SUFFIX, RATE_LIMIT_MAX_429_RETRIES, RATE_LIMIT_429_BACKOFF_SECONDS
+)
+
+logger = setup_logger(__name__)
+
+_EPOCH_THRESHOLD = 1e9 # ערך reset גדול מזה הוא זמן epoch (Alpaca) ולא מספר שניות (Reddit)
+
+def _header_float(headers, *names: str) -> float | None:
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return float(value)
+            except ValueError:
+                continue
+    return None
+
+def parse_rate_limit_headers(headers) -> tuple[float | None, float | None]:
+    """(בקשות שנותרו במכסה, שניות עד איפוס המכסה) מתוך headers של תשובה, או None למה שלא נמצא."""
+    remaining = _header_float(headers, "X-Ratelimit-Remaining", "RateLimit-Remaining")
+    reset = _header_float(headers, "X-Ratelimit-Reset", "RateLimit-Reset")
+    if reset is not None and reset > _EPOCH_THRESHOLD:
+        reset = reset - time.time()
+    if reset is not None:
+        reset = max(reset, 0.0)
+    return remaining, reset
+
+def parse_retry_after(headers) -> float | None:
+    """Retry-After בשניות (מספר או תאריך HTTP), או None."""
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+class TokenBucket:
+    """
+    token bucket לשירות אחד: עד burst בקשות ברצף, ואחר כך rate בקשות לשנייה. acquire חוסם עד שיש token.
+    update_from_headers מחליף את הקצב בקצב שמחלק את יתרת המכסה עד האיפוס (מהר יותר כשיש מכסה, לאט יותר לקראת סופה),
+    ועוצר לגמרי עד האיפוס כשהמכסה נגמרה; block_for עוצר את כל הבקשות לשירות (למשל אחרי 429).
+    """
+
+    def __init__(self, service: str, rate_per_second: float, burst: float):
+        self.service = service
+        self.default_rate = rate_per_second
+        self.rate = rate_per_second
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.acquired = 0
+        self.waited_seconds = 0.0
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> float:
+        """ממתין ל-token אחד. מחזיר כמה שניות הבקשה המתינה."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    self.acquired += 1
+                    self.waited_seconds += waited
+                    return waited
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def block_for(self, seconds: float):
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def update_from_headers(self, headers):
+        remaining, reset_seconds = parse_rate_limit_headers(headers)
+        if remaining is None or reset_seconds is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if remaining < 1:
+                self.tokens = 0.0
+                self._blocked_until = max(self._blocked_until, now + reset_seconds)
+                logger.warning(f"Rate limit quota for '{self.service}' exhausted; pausing requests for {reset_seconds:.1f}s until it resets.")
+            else:
+                self.rate = remaining / max(reset_seconds, 1.0)
+                self.tokens = min(self.tokens, remaining)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"service": self.service, "rate": self.rate, "acquired": self.acquired, "waited_seconds": self.waited_seconds}
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(service: str | None) -> TokenBucket | None:
+    """ה-bucket המשותף של service (נוצר בשימוש הראשון), או None אם לשירות אין מגבלה מוגדרת."""
+    if service not in RATE_LIMITS:
+        return None
+    limiter = _limiters.get(service)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(service)
+            if limiter is None:
+                limiter = _limiters[service] = TokenBucket(service, *RATE_LIMITS[service])
+    return limiter
+
+def service_for_host(hostname: str | None) -> str | None:
+    if not hostname:
+        return None
+    hostname = hostname.lower()
+    for suffix, service in RATE_LIMIT_SERVICE_BY_HOST_SUFFIX.items():
+        if hostname == suffix or hostname.endswith(f".{suffix}"):
+            return service
+    return None
+
+class RateLimitedAdapter(HTTPAdapter):
+    """
+    HTTPAdapter שכל בקשה דרכו לוקחת token מה-bucket של השירות (service קבוע, או לפי שם השרת), מעדכן את ה-bucket מה-headers
+    של התשובה, ועל 429 עוצר את השירות ל-Retry-After (או backoff מעריכי) ושולח שוב, עד max_429_retries פעמים.
+    """
+
+    def __init__(self, service: str | None = None, max_429_retries: int = RATE_LIMIT_MAX_429_RETRIES,
+                 backoff_seconds: float = RATE_LIMIT_429_BACKOFF_SECONDS, **kwargs):
+        self.service = service
+        self.max_429_retries = max_429_retries
+        self.backoff_seconds = backoff_seconds
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        service = self.service or service_for_host(urlparse(request.url).hostname)
+        limiter = get_rate_limiter(service)
+        if limiter is None:
+            return super().send(request, **kwargs)
+
+        attempt = 0
+        while True:
+            limiter.acquire()
+            response = super().send(request, **kwargs)
+            limiter.update_from_headers(response.headers)
+            if response.status_code != 429 or attempt >= self.max_429_retries:
+                return response
+            retry_after = parse_retry_after(response.headers)
+            wait = retry_after if retry_after is not None else self.backoff_seconds * 2 ** attempt
+            logger.warning(f"HTTP 429 from '{service}' ({urlparse(request.url).hostname}); retrying in {wait:.1f}s (attempt {attempt + 1}/{self.max_429_retries}).")
+            limiter.block_for(wait)
+            response.close()
+            attempt += 1
+
+def mount_rate_limiter(session: requests.Session, service: str | None = None) -> requests.Session:
+    """מחבר את המגביל ל-session קיים (למשל ה-session הפנימי של ספריית Alpaca). בלי service – לפי שם השרת."""
+    adapter = RateLimitedAdapter(service=service)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def rate_limited_session(service: str | None = None) -> requests.Session:
+    """requests.Session חדש שכל הבקשות שלו עוברות דרך המגביל (למשל בשביל PRAW, דרך requestor_kwargs)."""
+    return mount_rate_limiter(requests.Session(), service)
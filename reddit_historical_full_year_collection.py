@@ -3,6 +3,7 @@ import os
 import pandas as pd
 from datetime import datetime, timezone
 import logging
+import sys
 import time
 
 # --- הגדרות איסוף ---
@@ -21,13 +22,21 @@ SEARCH_LIMIT_PER_SUBREDDIT_PER_TICKER = 100 # ננסה לאסוף עד 100 פו
 SEARCH_TIME_FILTER = "year"                 
 OUTPUT_CSV_FILENAME = f"reddit_historical_data_1year_limit{SEARCH_LIMIT_PER_SUBREDDIT_PER_TICKER}_{datetime.now().strftime('%Y%m%d')}.csv"
 MIN_POST_RELEVANCE_SCORE_FOR_BODY = 10 
-REQUEST_DELAY_SECONDS = 2 # השהיה של 2 שניות בין כל קריאת API ל-Reddit (חשוב!)
+REQUEST_DELAY_SECONDS = 2 # השהיה קבועה בין קריאות API ל-Reddit – רק אם מגביל הקצב (rate_limiter) לא זמין
+
+# מצב listing: מעבר אחד על "new" בכל subreddit מאז הריצה הקודמת והתאמת הטיקרים מקומית – מחיר זהה לכל מספר טיקרים.
+# ה-listing מגיע רק ל-~1000 הפוסטים האחרונים, ולכן המצב הזה מיועד לאיסוף שוטף (הרצה קבועה) שמצטבר לאותו CSV
+LISTING_STATE_PATH = "reddit_historical_listing_state.json"
+LISTING_OUTPUT_CSV_FILENAME = "reddit_historical_data_listing.csv"
+LISTING_MAX_POSTS_PER_SUBREDDIT = 1000
 
 # --- ניסיון לייבא פונקציות עזר ---
 EMAIL_SENDER_AVAILABLE = False
+rate_limited_session = None
 try:
     from email_sender import send_email 
     from settings import setup_logger 
+    from rate_limiter import rate_limited_session # הקצב לפי המכסה שמדווחת Reddit ב-headers, במקום השהיה קבועה
     EMAIL_SENDER_AVAILABLE = True
     logger = setup_logger("RedditHistoricalFull", level=logging.INFO)
 except ImportError:
@@ -52,13 +61,46 @@ else:
             client_id=REDDIT_CLIENT_ID,
             client_secret=REDDIT_CLIENT_SECRET,
             user_agent=REDDIT_USER_AGENT,
-            read_only=True
+            read_only=True,
+            requestor_kwargs={"session": rate_limited_session("reddit")} if rate_limited_session else None
         )
         logger.info("PRAW client initialized (read-only status: {}).".format(reddit_client_instance.read_only))
     except Exception as e:
         logger.critical(f"Failed to initialize PRAW Reddit client: {e}", exc_info=True)
         reddit_client_instance = None
 
+def submission_to_row(submission, symbol: str, subreddit_name: str, min_body_len: int = 10) -> dict | None:
+    """שורת CSV אחת לפוסט (עבור הטיקר symbol), או None אם הפוסט מסונן."""
+    if submission.stickied or submission.over_18:
+        logger.debug(f"    Skipping stickied/over_18 post ID {submission.id}")
+        return None
+
+    post_title = submission.title.strip()
+    post_body = ""
+    # נשלוף גוף רק אם הכותרת רלוונטית או הניקוד גבוה, כדי לחסוך גישות אם לא צריך
+    # הפעם נשלוף תמיד כי אנחנו רוצים את המידע לניתוח
+    if submission.selftext:
+         post_body = submission.selftext.strip()
+
+    if not post_title and (not post_body or len(post_body) < min_body_len) :
+        logger.debug(f"    Skipping post ID {submission.id} due to empty title and short/empty body.")
+        return None
+
+    created_iso = datetime.fromtimestamp(submission.created_utc, tz=timezone.utc).isoformat()
+
+    return {
+        "symbol_searched": symbol,
+        "subreddit": subreddit_name,
+        "post_id": submission.id,
+        "created_utc_iso": created_iso,
+        "title": post_title,
+        "body": post_body,
+        "url": submission.url,
+        "score": submission.score,
+        "num_comments": submission.num_comments,
+        "flair": str(submission.link_flair_text) if submission.link_flair_text else None # טיפול במקרה שאין פלייר
+    }
+
 def fetch_posts_for_ticker_and_subreddit(symbol: str, 
                                  subreddit_name: str, 
                                  limit: int, 
@@ -80,38 +122,13 @@ def fetch_posts_for_ticker_and_subreddit(symbol: str,
         processed_submissions = 0
         for submission in submissions:
             processed_submissions += 1
-            if submission.stickied or submission.over_18:
-                logger.debug(f"    Skipping stickied/over_18 post ID {submission.id}")
+            post_row = submission_to_row(submission, symbol, subreddit_name, min_body_len)
+            if post_row is None:
                 continue
-
-            post_title = submission.title.strip()
-            post_body = ""
-            # נשלוף גוף רק אם הכותרת רלוונטית או הניקוד גבוה, כדי לחסוך גישות אם לא צריך
-            # הפעם נשלוף תמיד כי אנחנו רוצים את המידע לניתוח
-            if submission.selftext:
-                 post_body = submission.selftext.strip()
-            
-            if not post_title and (not post_body or len(post_body) < min_body_len) :
-                logger.debug(f"    Skipping post ID {submission.id} due to empty title and short/empty body.")
-                continue
-
-            created_iso = datetime.fromtimestamp(submission.created_utc, tz=timezone.utc).isoformat()
-
-            collected_data.append({
-                "symbol_searched": symbol,
-                "subreddit": subreddit_name,
-                "post_id": submission.id,
-                "created_utc_iso": created_iso,
-                "title": post_title,
-                "body": post_body,
-                "url": submission.url,
-                "score": submission.score,
-                "num_comments": submission.num_comments,
-                "flair": str(submission.link_flair_text) if submission.link_flair_text else None # טיפול במקרה שאין פלייר
-            })
+            collected_data.append(post_row)
             # נרשום ללוג רק חלק מהפוסטים כדי לא להעמיס, או ברמת DEBUG
             if len(collected_data) % 10 == 0 or processed_submissions <= 5: # כל 10 פוסטים או 5 הראשונים
-                 logger.debug(f"    Collected post ({len(collected_data)} of {processed_submissions} processed): '{post_title[:70]}...' (Date: {created_iso})")
+                 logger.debug(f"    Collected post ({len(collected_data)} of {processed_submissions} processed): '{post_row['title'][:70]}...' (Date: {post_row['created_utc_iso']})")
         
         logger.info(f"    r/{subreddit_name}: Processed {processed_submissions} PRAW submissions, collected {len(collected_data)} valid posts for '{symbol}'.")
     except Exception as e:
@@ -119,15 +136,71 @@ def fetch_posts_for_ticker_and_subreddit(symbol: str,
     
     return collected_data
 
+def collect_new_posts_by_listing(tickers: list[str], subreddit_names: list[str], state_path: str = LISTING_STATE_PATH,
+                                 max_posts_per_subreddit: int = LISTING_MAX_POSTS_PER_SUBREDDIT) -> list[dict]:
+    """
+    מצב listing: לכל subreddit עובר על "new" עד סימן המים של הריצה הקודמת (state_path) ומחזיר שורה לכל צירוף
+    (פוסט, טיקר שמופיע בו) – באותו מבנה כמו fetch_posts_for_ticker_and_subreddit. בקשה אחת לכל 100 פוסטים, בלי קשר למספר הטיקרים.
+    """
+    from json_state import load_json_state, save_json_state
+    from reddit_scraper import SubredditListingScan
+
+    if reddit_client_instance is None:
+        return []
+    high_water_marks = load_json_state(state_path)
+    collected_data = []
+    for subreddit_name in subreddit_names:
+        logger.info(f"  Scanning new posts in r/{subreddit_name} since {high_water_marks.get(subreddit_name, {}).get('created_utc', 'the start of the listing')}")
+        try:
+            scan = SubredditListingScan(
+                reddit_client_instance.subreddit(subreddit_name), tickers,
+                high_water_mark=high_water_marks.get(subreddit_name), max_posts=max_posts_per_subreddit
+            )
+            rows_before = len(collected_data)
+            for submission, matched_tickers in scan:
+                for ticker in matched_tickers:
+                    post_row = submission_to_row(submission, ticker, subreddit_name)
+                    if post_row is not None:
+                        collected_data.append(post_row)
+            if scan.next_high_water_mark is not None:
+                high_water_marks[subreddit_name] = scan.next_high_water_mark
+            if scan.may_have_gap:
+                logger.warning(f"    r/{subreddit_name}: listing ended after {scan.scanned_posts} posts before the previous high-water mark; there may be a gap.")
+            logger.info(f"    r/{subreddit_name}: Scanned {scan.scanned_posts} new posts, {scan.matched_posts} matched a ticker, collected {len(collected_data) - rows_before} rows.")
+        except Exception as e:
+            logger.error(f"  Error scanning r/{subreddit_name}: {e}", exc_info=False)
+    save_json_state(state_path, high_water_marks)
+    return collected_data
+
+def run_listing_collection():
+    logger.info(f"--- Starting Reddit listing scan for {len(TICKERS_TO_SCRAPE)} tickers in {', '.join(SUBREDDITS_TO_SEARCH)} ---")
+    new_rows = collect_new_posts_by_listing(TICKERS_TO_SCRAPE, SUBREDDITS_TO_SEARCH)
+    if not new_rows:
+        logger.info("No new posts matched any ticker since the last scan.")
+        return
+    new_df = pd.DataFrame(new_rows)
+    write_header = not os.path.exists(LISTING_OUTPUT_CSV_FILENAME)
+    new_df.to_csv(LISTING_OUTPUT_CSV_FILENAME, mode="a", header=write_header, index=False, encoding='utf-8-sig' if write_header else 'utf-8')
+    logger.info(f"Appended {len(new_df)} rows ({new_df['post_id'].nunique()} posts) to {LISTING_OUTPUT_CSV_FILENAME}")
+
 if __name__ == "__main__":
     if not reddit_client_instance:
         logger.critical("Reddit client not initialized. Aborting script.")
         exit()
 
+    # שימוש: python reddit_historical_full_year_collection.py [search|listing]
+    collection_mode = sys.argv[1] if len(sys.argv) > 1 else "search"
+    if collection_mode == "listing":
+        run_listing_collection()
+        sys.exit()
+
     logger.info(f"--- Starting Reddit Historical Data Collection for {len(TICKERS_TO_SCRAPE)} tickers ---")
     logger.info(f"Subreddits to search: {', '.join(SUBREDDITS_TO_SEARCH)}")
     logger.info(f"Time filter: '{SEARCH_TIME_FILTER}', Limit per ticker per subreddit: {SEARCH_LIMIT_PER_SUBREDDIT_PER_TICKER}")
-    logger.info(f"Delay between API calls: {REQUEST_DELAY_SECONDS} seconds.")
+    if rate_limited_session:
+        logger.info("API calls are paced by the shared Reddit rate limiter.")
+    else:
+        logger.info(f"Delay between API calls: {REQUEST_DELAY_SECONDS} seconds.")
 
     all_collected_posts_list = []
     total_posts_collected_overall = 0
@@ -136,9 +209,9 @@ if __name__ == "__main__":
         logger.info(f"\nProcessing Ticker {i+1}/{len(TICKERS_TO_SCRAPE)}: {ticker}")
         posts_for_this_ticker_session = 0
         for subreddit_name in SUBREDDITS_TO_SEARCH:
-            # השהיה *לפני* כל קריאה ל-API
-            logger.debug(f"    Waiting {REQUEST_DELAY_SECONDS}s before querying r/{subreddit_name} for {ticker}...")
-            time.sleep(REQUEST_DELAY_SECONDS) 
+            if not rate_limited_session: # בלי מגביל הקצב – השהיה *לפני* כל קריאה ל-API
+                logger.debug(f"    Waiting {REQUEST_DELAY_SECONDS}s before querying r/{subreddit_name} for {ticker}...")
+                time.sleep(REQUEST_DELAY_SECONDS) 
             
             posts = fetch_posts_for_ticker_and_subreddit(
                 symbol=ticker,
@@ -1,7 +1,15 @@
 # reddit_scraper.py
-import praw
 import os
-from settings import setup_logger, MIN_HEADLINE_LENGTH 
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from rate_limiter import rate_limited_session
+from settings import (
+    setup_logger, MIN_HEADLINE_LENGTH, REDDIT_SEARCH_SYMBOLS_PER_QUERY, REDDIT_SEARCH_RESULTS_FACTOR, REDDIT_CASHTAG_ONLY_TICKERS,
+    REDDIT_LISTING_STATE_PATH, REDDIT_LISTING_SCAN_MAX_POSTS, REDDIT_LISTING_INITIAL_LOOKBACK_HOURS,
+    REDDIT_COMMENT_FETCH_WORKERS, REDDIT_SEARCH_WINDOW_STATE_PATH, REDDIT_SEARCH_WINDOW_HOURS
+)
 
 logger = setup_logger(__name__)
 
@@ -11,6 +19,8 @@ REDDIT_USER_AGENT = os.getenv("REDDIT_USER_AGENT", "Sentibot/0.3 by YourRedditUs
 
 DEFAULT_SUBREDDITS = ["stocks", "wallstreetbets", "StockMarket", "investing", "SecurityAnalysis"]
 SUBREDDITS_TO_SCRAPE = DEFAULT_SUBREDDITS
+SOURCE_TYPE_POST = "Reddit_Post"
+SOURCE_TYPE_COMMENT = "Reddit_Comment"
 
 try:
     LIMIT_PER_SUBREDDIT = int(os.getenv("REDDIT_LIMIT_PER_SUBREDDIT", "15"))
@@ -21,84 +31,167 @@ except ValueError:
     COMMENTS_PER_POST = 3
 
 reddit_client_instance = None 
-if not REDDIT_CLIENT_ID or not REDDIT_CLIENT_SECRET:
-    logger.critical("Reddit API credentials (REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET) are not set in environment variables. Reddit scraper will not function.")
-else:
-    if not REDDIT_USER_AGENT or "YourRedditUsername" in REDDIT_USER_AGENT or "your_username" in REDDIT_USER_AGENT.lower():
-        logger.warning(f"Reddit User-Agent is generic ('{REDDIT_USER_AGENT}'). Please set a unique and descriptive REDDIT_USER_AGENT environment variable (e.g., 'Sentibot/0.3 by MyRedditBotUsername').")
+_reddit_client_initialized = False
+_reddit_client_lock = threading.Lock()
+
+def get_reddit_client():
+    """
+    ה-client של PRAW, שנוצר (יחד עם ה-import של praw) בקריאה הראשונה ולא בטעינת המודול.
+    מחזיר None אם אין credentials או שהאתחול נכשל – וזה נרשם ללוג פעם אחת בלבד.
+    """
+    global reddit_client_instance, _reddit_client_initialized
+    if _reddit_client_initialized:
+        return reddit_client_instance
+    with _reddit_client_lock:
+        if _reddit_client_initialized:
+            return reddit_client_instance
+        if not REDDIT_CLIENT_ID or not REDDIT_CLIENT_SECRET:
+            logger.critical("Reddit API credentials (REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET) are not set in environment variables. Reddit scraper will not function.")
+        else:
+            if not REDDIT_USER_AGENT or "YourRedditUsername" in REDDIT_USER_AGENT or "your_username" in REDDIT_USER_AGENT.lower():
+                logger.warning(f"Reddit User-Agent is generic ('{REDDIT_USER_AGENT}'). Please set a unique and descriptive REDDIT_USER_AGENT environment variable (e.g., 'Sentibot/0.3 by MyRedditBotUsername').")
+            try:
+                import praw
+                logger.info(f"Initializing PRAW client with User-Agent: {REDDIT_USER_AGENT}")
+                reddit_client_instance = praw.Reddit(
+                    client_id=REDDIT_CLIENT_ID,
+                    client_secret=REDDIT_CLIENT_SECRET,
+                    user_agent=REDDIT_USER_AGENT,
+                    requestor_kwargs={"session": rate_limited_session("reddit")}, # המכסה של Reddit משותפת לכל ה-clients
+                )
+                logger.info("PRAW client initialized (read-only status: {}).".format(reddit_client_instance.read_only))
+            except Exception as e:
+                logger.critical(f"Failed to initialize PRAW Reddit client: {e}", exc_info=True)
+                reddit_client_instance = None
+        _reddit_client_initialized = True
+    return reddit_client_instance
+
+def _post_text(submission) -> str | None:
+    """הטקסט של הפוסט (כותרת + גוף), או None אם הפוסט מסונן (נעוץ/NSFW) או קצר מדי."""
+    if submission.stickied or submission.over_18:
+        return None
+
+    post_title = submission.title.strip()
+    post_body = ""
+    if submission.selftext:
+        post_body = submission.selftext.strip()
+
+    full_post_content = post_title
+    if post_body:
+        full_post_content = f"{post_title}. {post_body}"
+
+    if not full_post_content or len(full_post_content) < MIN_HEADLINE_LENGTH:
+        return None
+    return full_post_content
+
+_thread_clients = threading.local()
+_comment_executor = None
+_comment_executor_lock = threading.Lock()
+
+def _thread_reddit_client():
+    # אובייקט praw.Reddit אינו בטוח לשימוש מכמה threads, ולכן לכל thread של שליפת התגובות יש client משלו. ה-threads
+    # שייכים ל-pool משותף שחי לאורך כל התהליך, כך שכל client (ובקשת ה-OAuth token שלו) נוצר פעם אחת לכל worker
+    client = getattr(_thread_clients, "client", None)
+    if client is None:
+        import praw
+        client = praw.Reddit(client_id=REDDIT_CLIENT_ID, client_secret=REDDIT_CLIENT_SECRET, user_agent=REDDIT_USER_AGENT,
+                             requestor_kwargs={"session": rate_limited_session("reddit")})
+        _thread_clients.client = client
+    return client
+
+def _fetch_top_comments(submission_id: str, comments_limit: int, sub_name: str) -> list[tuple[str, str]]:
     try:
-        logger.info(f"Initializing PRAW client with User-Agent: {REDDIT_USER_AGENT}")
-        reddit_client_instance = praw.Reddit(
-            client_id=REDDIT_CLIENT_ID,
-            client_secret=REDDIT_CLIENT_SECRET,
-            user_agent=REDDIT_USER_AGENT,
-        )
-        logger.info("PRAW client initialized (read-only status: {}).".format(reddit_client_instance.read_only))
-    except Exception as e:
-        logger.critical(f"Failed to initialize PRAW Reddit client: {e}", exc_info=True)
-        reddit_client_instance = None
+        submission = _thread_reddit_client().submission(id=submission_id)
+        # ה-API מחזיר רק את התגובות המובילות (sort=top, limit) במקום כל העץ; ה-limit סופר גם תגובות-משנה, ולכן יש מרווח
+        submission.comment_sort = "top"
+        submission.comment_limit = comments_limit * 2
+        submission.comments.replace_more(limit=0) # רק מסיר את ה-"load more" – בלי בקשות נוספות
+        valid_comments = []
+        for c in submission.comments:
+            if hasattr(c, 'body') and c.body and hasattr(c, 'score'):
+                valid_comments.append(c)
+
+        top_comments = sorted(valid_comments, key=lambda c: c.score, reverse=True)[:comments_limit]
+
+        comment_texts = []
+        for comment in top_comments:
+            comment_body_text = comment.body.strip()
+            if comment_body_text and len(comment_body_text) >= MIN_HEADLINE_LENGTH:
+                comment_texts.append((comment_body_text, SOURCE_TYPE_COMMENT))
+        return comment_texts
+
+    except Exception as comment_fetch_error:
+        logger.warning(f"Could not fetch/process comments for post ID {submission_id} in r/{sub_name}: {comment_fetch_error}")
+        return []
+
+def _comment_fetch_executor() -> ThreadPoolExecutor:
+    """ה-pool המשותף של שליפת התגובות (REDDIT_COMMENT_FETCH_WORKERS threads), שנוצר בשימוש הראשון ומשמש את כל הקריאות בתהליך."""
+    global _comment_executor
+    if _comment_executor is None:
+        with _comment_executor_lock:
+            if _comment_executor is None:
+                _comment_executor = ThreadPoolExecutor(max_workers=REDDIT_COMMENT_FETCH_WORKERS, thread_name_prefix="reddit-comments")
+    return _comment_executor
+
+def fetch_top_comments(submission_refs: list[tuple[str, str]], comments_limit: int) -> dict[str, list[tuple[str, str]]]:
+    """
+    שולף במקביל, דרך ה-pool המשותף (עד REDDIT_COMMENT_FETCH_WORKERS בקשות בו-זמנית), את comments_limit התגובות המובילות
+    של כל פוסט. נקרא אחרי איסוף הפוסטים ולא מתוך ה-pool של הסמלים ב-main.
+    submission_refs – רשימת (submission_id, subreddit); כל פוסט נשלף פעם אחת. מחזיר submission_id -> רשימת (text, source).
+    """
+    unique_refs = list(dict.fromkeys(submission_refs))
+    if comments_limit <= 0 or not unique_refs:
+        return {}
+    start = time.perf_counter()
+    results = list(_comment_fetch_executor().map(lambda ref: _fetch_top_comments(ref[0], comments_limit, ref[1]), unique_refs))
+    logger.info(f"Fetched top {comments_limit} comments for {len(unique_refs)} posts in {time.perf_counter() - start:.1f}s ({REDDIT_COMMENT_FETCH_WORKERS} workers).")
+    return {submission_id: comment_texts for (submission_id, _), comment_texts in zip(unique_refs, results)}
+
+def _texts_with_comments(post_ids: list[str], post_texts: dict[str, str], comments_by_id: dict[str, list[tuple[str, str]]]) -> list[tuple[str, str]]:
+    # לכל פוסט: הטקסט שלו ואחריו התגובות שלו, לפי סדר הפוסטים
+    texts = []
+    for post_id in post_ids:
+        texts.append((post_texts[post_id], SOURCE_TYPE_POST))
+        texts.extend(comments_by_id.get(post_id, []))
+    return texts
 
 def get_reddit_posts(symbol: str, 
                      subreddits_list: list[str] = None, 
                      limit_per_sub: int = None, 
                      comments_limit: int = None
                      ) -> list[tuple[str, str]]:
-    if reddit_client_instance is None:
+    reddit_client = get_reddit_client()
+    if reddit_client is None:
         logger.error("Reddit client (PRAW) is not initialized. Cannot fetch posts.")
         return []
+    import praw # כבר נטען ב-get_reddit_client
 
     subreddits_to_use = subreddits_list if subreddits_list is not None else SUBREDDITS_TO_SCRAPE
     actual_limit_per_sub = limit_per_sub if limit_per_sub is not None else LIMIT_PER_SUBREDDIT
     actual_comments_limit = comments_limit if comments_limit is not None else COMMENTS_PER_POST
     
-    source_type_post = "Reddit_Post"
-    source_type_comment = "Reddit_Comment"
-    collected_texts_with_source = []
+    post_ids = []
+    post_texts = {}
+    post_refs = []
     
     search_query = f'"{symbol}"'
 
     logger.info(f"Fetching Reddit content for '{symbol}' from subreddits: {subreddits_to_use} (Query: {search_query}, Limit/sub: {actual_limit_per_sub}, Comments/post: {actual_comments_limit})")
 
     for sub_name in subreddits_to_use:
-        logger.debug(f"Searching r/{sub_name} for query: '{search_query}'...")
+        logger.debug("Searching r/%s for query: '%s'...", sub_name, search_query)
         try:
-            subreddit_instance = reddit_client_instance.subreddit(sub_name)
+            subreddit_instance = reddit_client.subreddit(sub_name)
             submissions = subreddit_instance.search(query=search_query, sort='top', time_filter='week', limit=actual_limit_per_sub)
             
             processed_posts_in_sub = 0
             for submission in submissions:
-                if submission.stickied or submission.over_18:
-                    continue
-
-                post_title = submission.title.strip()
-                post_body = ""
-                if submission.selftext:
-                    post_body = submission.selftext.strip()
-                
-                full_post_content = post_title
-                if post_body:
-                    full_post_content = f"{post_title}. {post_body}"
-
-                if full_post_content and len(full_post_content) >= MIN_HEADLINE_LENGTH:
-                    collected_texts_with_source.append((full_post_content, source_type_post))
+                post_text = _post_text(submission)
+                if post_text:
+                    post_ids.append(submission.id)
+                    post_texts[submission.id] = post_text
+                    post_refs.append((submission.id, sub_name))
                     processed_posts_in_sub += 1
-
-                    try:
-                        submission.comments.replace_more(limit=0) 
-                        valid_comments = []
-                        for c in submission.comments:
-                            if hasattr(c, 'body') and c.body and hasattr(c, 'score'):
-                                valid_comments.append(c)
-                        
-                        top_comments = sorted(valid_comments, key=lambda c: c.score, reverse=True)[:actual_comments_limit]
-
-                        for comment in top_comments:
-                            comment_body_text = comment.body.strip()
-                            if comment_body_text and len(comment_body_text) >= MIN_HEADLINE_LENGTH:
-                                collected_texts_with_source.append((comment_body_text, source_type_comment))
-                                
-                    except Exception as comment_fetch_error:
-                        logger.warning(f"Could not fetch/process comments for post ID {submission.id} in r/{sub_name}: {comment_fetch_error}")
             
             logger.info(f"Processed {processed_posts_in_sub} posts from r/{sub_name} for '{symbol}'.")
 
@@ -106,6 +199,462 @@ def get_reddit_posts(symbol: str,
              logger.error(f"A PRAW-specific error occurred while fetching from r/{sub_name} for '{symbol}': {praw_error}")
         except Exception as general_error:
             logger.error(f"An unexpected error occurred while fetching from r/{sub_name} for '{symbol}': {general_error}", exc_info=True)
-    
+
+    # התגובות של כל הפוסטים נשלפות אחרי החיפושים, במקביל
+    collected_texts_with_source = _texts_with_comments(post_ids, post_texts, fetch_top_comments(post_refs, actual_comments_limit))
     logger.info(f"Total Reddit texts collected for '{symbol}': {len(collected_texts_with_source)} (Posts and Comments)")
     return collected_texts_with_source
+
+def _requires_cashtag(symbol: str) -> bool:
+    return len(symbol) == 1 or symbol.upper() in REDDIT_CASHTAG_ONLY_TICKERS
+
+def _ticker_pattern(symbols: list[str]) -> re.Pattern:
+    # התאמה של מילה שלמה: עם $ לפניה בכל רישיות ($tsla), ובלי $ רק באותיות גדולות (TSLA) ורק לסמל שאינו מילה נפוצה –
+    # החיפוש של Reddit לא מבחין ברישיות, וההתאמה המקומית היא שמסננת ממנו את הפוסטים שלא באמת על הסמל
+    def alternatives(group: list[str]) -> str:
+        return "|".join(re.escape(symbol.upper()) for symbol in sorted(group, key=len, reverse=True))
+    plain_symbols = [symbol for symbol in symbols if not _requires_cashtag(symbol)]
+    plain_branch = f"|({alternatives(plain_symbols)})" if plain_symbols else "|(?!)()"
+    return re.compile(rf"(?<![\w.])(?:\$((?i:{alternatives(symbols)})){plain_branch})(?![\w]|\.\w)")
+
+def match_symbols_in_text(text: str, symbols: list[str], pattern: re.Pattern | None = None) -> set[str]:
+    """הסמלים מתוך symbols שמופיעים ב-text כמילה שלמה (ראו _ticker_pattern)."""
+    pattern = pattern or _ticker_pattern(symbols)
+    by_upper = {symbol.upper(): symbol for symbol in symbols}
+    matches = (cashtag_match or plain_match for cashtag_match, plain_match in pattern.findall(text))
+    return {by_upper[match.upper()] for match in matches if match.upper() in by_upper}
+
+def get_reddit_posts_for_symbols(symbols: list[str],
+                                 subreddits_list: list[str] = None,
+                                 limit_per_sub: int = None,
+                                 comments_limit: int = None,
+                                 symbols_per_query: int = REDDIT_SEARCH_SYMBOLS_PER_QUERY,
+                                 results_factor: int = REDDIT_SEARCH_RESULTS_FACTOR
+                                 ) -> dict[str, list[tuple[str, str]]]:
+    """
+    כמו get_reddit_posts לכל הסמלים, אבל עם חיפוש אחד לכל subreddit וקבוצה של symbols_per_query סמלים
+    ('"AAPL" OR "MSFT" OR ...') במקום חיפוש לכל צירוף symbol x subreddit. כל פוסט שחוזר משויך לכל הסמלים
+    שמופיעים בכותרת/בגוף שלו (התאמה מקומית של מילה שלמה), והטקסט והתגובות שלו נשלפים פעם אחת בלבד ומשותפים לכולם.
+    לכל סמל נלקחים עד limit_per_sub פוסטים לכל subreddit, לפי סדר התוצאות. כל חיפוש עובר על עד
+    len(group) * limit_per_sub * results_factor תוצאות, כך שסמל שקט לא גורר מעבר על כל ה-listing; סמל שסמל "חם"
+    בקבוצה דחק את הפוסטים שלו מעבר למגבלה מקבל פחות פוסטים מבחיפוש נפרד (ונרשם ללוג). מחזיר symbol -> רשימת (text, source).
+    """
+    collected_by_symbol = {symbol: [] for symbol in symbols}
+    reddit_client = get_reddit_client()
+    if reddit_client is None:
+        logger.error("Reddit client (PRAW) is not initialized. Cannot fetch posts.")
+        return collected_by_symbol
+    import praw # כבר נטען ב-get_reddit_client
+
+    subreddits_to_use = subreddits_list if subreddits_list is not None else SUBREDDITS_TO_SCRAPE
+    actual_limit_per_sub = limit_per_sub if limit_per_sub is not None else LIMIT_PER_SUBREDDIT
+    actual_comments_limit = comments_limit if comments_limit is not None else COMMENTS_PER_POST
+    symbols_per_query = max(1, symbols_per_query)
+    symbol_groups = [symbols[start:start + symbols_per_query] for start in range(0, len(symbols), symbols_per_query)]
+    results_factor = max(1, results_factor)
+
+    logger.info(f"Fetching Reddit content for {len(symbols)} symbols from subreddits: {subreddits_to_use} with {len(symbol_groups) * len(subreddits_to_use)} batched searches (Symbols/query: {symbols_per_query}, Limit/sub/symbol: {actual_limit_per_sub}, Results factor: {results_factor}, Comments/post: {actual_comments_limit})")
+
+    post_texts = {} # submission id -> הטקסט של הפוסט (None אם סונן); התגובות נשלפות בסוף, פעם אחת לפוסט
+    post_refs = []
+    post_ids_by_symbol = {symbol: [] for symbol in symbols}
+    searches = 0
+    for sub_name in subreddits_to_use:
+        for symbol_group in symbol_groups:
+            search_query = " OR ".join(f'"{symbol}"' for symbol in symbol_group)
+            pattern = _ticker_pattern(symbol_group)
+            posts_per_symbol = dict.fromkeys(symbol_group, 0)
+            logger.debug("Searching r/%s for query: '%s'...", sub_name, search_query)
+            try:
+                subreddit_instance = reddit_client.subreddit(sub_name)
+                # סמל "חם" יכול למלא לבדו את התוצאות המובילות של הקבוצה, ולכן המגבלה גדולה פי results_factor מהנדרש;
+                # PRAW מביא עמודים של 100 רק כשממשיכים לעבור על התוצאות, ועוצרים מוקדם כשלכל סמל בקבוצה יש limit_per_sub פוסטים
+                results_limit = len(symbol_group) * actual_limit_per_sub * results_factor
+                submissions = subreddit_instance.search(query=search_query, sort='top', time_filter='week', limit=results_limit)
+                searches += 1
+                unmatched_posts = 0
+                results_seen = 0
+                for submission in submissions:
+                    results_seen += 1
+                    matched_symbols = match_symbols_in_text(f"{submission.title}\n{submission.selftext or ''}", symbol_group, pattern)
+                    matched_symbols = [symbol for symbol in symbol_group if symbol in matched_symbols and posts_per_symbol[symbol] < actual_limit_per_sub]
+                    if not matched_symbols:
+                        unmatched_posts += 1
+                        continue
+                    if submission.id not in post_texts:
+                        post_texts[submission.id] = _post_text(submission)
+                        if post_texts[submission.id]:
+                            post_refs.append((submission.id, sub_name))
+                    for symbol in matched_symbols:
+                        # כמו ב-limit של החיפוש לסמל יחיד, גם פוסט שסונן (נעוץ/NSFW/קצר) נספר במגבלה
+                        if post_texts[submission.id]:
+                            post_ids_by_symbol[symbol].append(submission.id)
+                        posts_per_symbol[symbol] += 1
+                    if all(count >= actual_limit_per_sub for count in posts_per_symbol.values()):
+                        break
+                if unmatched_posts:
+                    logger.debug("%d posts from r/%s matched no symbol of the group locally.", unmatched_posts, sub_name)
+                logger.info(f"Matched posts from r/{sub_name} for {len(symbol_group)} symbols: {', '.join(f'{symbol}={count}' for symbol, count in posts_per_symbol.items())}.")
+                short_symbols = [symbol for symbol, count in posts_per_symbol.items() if count < actual_limit_per_sub]
+                if short_symbols and results_seen >= results_limit:
+                    logger.info(f"Search of r/{sub_name} stopped at {results_limit} results; fewer than {actual_limit_per_sub} posts for: {', '.join(short_symbols)}.")
+
+            except praw.exceptions.PRAWException as praw_error:
+                 logger.error(f"A PRAW-specific error occurred while fetching from r/{sub_name} for {symbol_group}: {praw_error}")
+            except Exception as general_error:
+                logger.error(f"An unexpected error occurred while fetching from r/{sub_name} for {symbol_group}: {general_error}", exc_info=True)
+
+    comments_by_id = fetch_top_comments(post_refs, actual_comments_limit)
+    for symbol, post_ids in post_ids_by_symbol.items():
+        collected_by_symbol[symbol] = _texts_with_comments(post_ids, post_texts, comments_by_id)
+    logger.info(f"Total Reddit texts collected for {len(symbols)} symbols: {sum(len(texts) for texts in collected_by_symbol.values())} from {len(post_refs)} distinct posts ({searches} searches).")
+    return collected_by_symbol
+
+def is_after_high_water_mark(created_utc: float, fullname: str, high_water_mark: dict | None) -> bool:
+    """האם הפוסט חדש יותר מסימן המים ({"created_utc", "fullnames"}) – כלומר עוד לא נראה בסריקה קודמת."""
+    if high_water_mark is None or created_utc > high_water_mark["created_utc"]:
+        return True
+    return created_utc == high_water_mark["created_utc"] and fullname not in high_water_mark.get("fullnames", [])
+
+def advance_high_water_mark(high_water_mark: dict | None, created_utc: float, fullname: str) -> dict:
+    """סימן המים אחרי שהפוסט נראה: זמן הפוסט החדש ביותר ו-fullnames של כל הפוסטים באותו זמן בדיוק."""
+    if high_water_mark is None or created_utc > high_water_mark["created_utc"]:
+        return {"created_utc": created_utc, "fullnames": [fullname]}
+    if created_utc == high_water_mark["created_utc"] and fullname not in high_water_mark["fullnames"]:
+        return {"created_utc": created_utc, "fullnames": sorted(high_water_mark["fullnames"] + [fullname])}
+    return high_water_mark
+
+# ה-time_filter של החיפוש: הקטן ביותר שמכסה את החלון (שעות -> שם הפילטר ב-Reddit)
+_SEARCH_TIME_FILTERS = [(24, "day"), (7 * 24, "week"), (30 * 24, "month"), (365 * 24, "year")]
+# Reddit לא מחזיר יותר מ-~250 תוצאות לחיפוש; חיפוש שהחזיר כך כמעט בוודאות נקטע לפני סוף ה-time_filter
+_SEARCH_RESULTS_CAP = 250
+
+def _search_time_filter(window_hours: float) -> str:
+    for max_hours, time_filter in _SEARCH_TIME_FILTERS:
+        if window_hours <= max_hours:
+            return time_filter
+    return "all"
+
+class RedditSearchWindow:
+    """
+    המצב המתמשך של החיפוש המצטבר (get_new_reddit_posts_for_symbols): לכל (subreddit, symbol) סימן מים – עד איזה פוסט
+    כבר חיפשנו – ורשימת הפוסטים שלו מהחלון האחרון (window_hours). הפוסטים עצמם נשמרים פעם אחת לפי id, גם אם מתאימים
+    לכמה סמלים: טקסט, זמן יצירה, ניקוד (מתעדכן בכל ריצה), מספר תגובות והתגובות המובילות (None עד שנשלפו).
+    """
+
+    def __init__(self, state: dict | None = None, window_hours: float = REDDIT_SEARCH_WINDOW_HOURS):
+        state = state or {}
+        self.posts = state.get("posts", {})
+        self.searches = state.get("searches", {}) # "subreddit|symbol" -> {"high_water_mark", "post_ids"}
+        self.window_hours = window_hours
+
+    def _search_state(self, sub_name: str, symbol: str) -> dict:
+        return self.searches.setdefault(f"{sub_name}|{symbol}", {"high_water_mark": None, "post_ids": []})
+
+    def high_water_mark(self, sub_name: str, symbol: str) -> dict | None:
+        return self._search_state(sub_name, symbol)["high_water_mark"]
+
+    def set_high_water_mark(self, sub_name: str, symbol: str, high_water_mark: dict | None):
+        self._search_state(sub_name, symbol)["high_water_mark"] = high_water_mark
+
+    def add_post(self, sub_name: str, symbol: str, submission, post_text: str):
+        if submission.id not in self.posts:
+            self.posts[submission.id] = {
+                "fullname": submission.fullname, "subreddit": sub_name, "created_utc": submission.created_utc, "text": post_text,
+                "score": submission.score, "num_comments": submission.num_comments, "comments": None, "comments_at_num": None,
+            }
+        post_ids = self._search_state(sub_name, symbol)["post_ids"]
+        if submission.id not in post_ids:
+            post_ids.append(submission.id)
+
+    def top_post_ids(self, sub_name: str, symbol: str, limit: int) -> list[str]:
+        """limit הפוסטים עם הניקוד הגבוה בחלון – כמו sort='top' של החיפוש השבועי."""
+        post_ids = self._search_state(sub_name, symbol)["post_ids"]
+        return sorted(post_ids, key=lambda post_id: (self.posts[post_id]["score"], self.posts[post_id]["created_utc"]), reverse=True)[:limit]
+
+    def needs_comments(self, post_id: str, comments_limit: int) -> bool:
+        # נשלף שוב רק אם עוד אין comments_limit תגובות ונוספו תגובות מאז השליפה הקודמת
+        post = self.posts[post_id]
+        if post["comments"] is None:
+            return True
+        return len(post["comments"]) < comments_limit and post["num_comments"] > post["comments_at_num"]
+
+    def set_comments(self, post_id: str, comments: list[tuple[str, str]]):
+        post = self.posts[post_id]
+        post["comments"] = [list(comment) for comment in comments]
+        post["comments_at_num"] = post["num_comments"]
+
+    def post_texts(self, post_id: str) -> list[tuple[str, str]]:
+        post = self.posts[post_id]
+        return [(post["text"], SOURCE_TYPE_POST)] + [tuple(comment) for comment in post["comments"] or []]
+
+    def prune(self, now: float | None = None) -> int:
+        """מוחק פוסטים שיצאו מהחלון. מחזיר את מספר הפוסטים שנמחקו."""
+        window_start = (now if now is not None else time.time()) - self.window_hours * 3600
+        expired = {post_id for post_id, post in self.posts.items() if post["created_utc"] < window_start}
+        for post_id in expired:
+            del self.posts[post_id]
+        for search_state in self.searches.values():
+            search_state["post_ids"] = [post_id for post_id in search_state["post_ids"] if post_id not in expired]
+        return len(expired)
+
+    def to_dict(self) -> dict:
+        return {"posts": self.posts, "searches": self.searches}
+
+class SubredditListingScan:
+    """
+    מעבר אחד על ה-listing של "new" ב-subreddit, מהחדש לישן, עד סימן המים העליון (high-water mark) של הסריקה הקודמת –
+    במקום חיפוש לכל סמל. מחיר ה-API (עמוד של 100 פוסטים לבקשה) לא תלוי במספר הסמלים: כל פוסט עובר התאמה מקומית
+    של הסמלים בכותרת ובגוף. האיטרציה מחזירה (submission, matched_symbols) לפוסטים שמתאימים לסמל כלשהו.
+    high_water_mark הוא {"created_utc", "fullnames"} – זמן הפוסט החדש ביותר שנסרק ו-fullnames של הפוסטים באותו זמן בדיוק.
+    הסימן החדש (next_high_water_mark) נקבע רק כשהמעבר הסתיים (completed), כך שסריקה שנקטעה באמצע תחזור על אותו טווח.
+    oldest_created_utc – גבול אחורה לסריקה הראשונה בלבד (אין עדיין סימן מים); עצירה עליו נרשמת ב-reached_lookback ולא ב-reached_mark.
+    """
+
+    def __init__(self, subreddit_instance, symbols: list[str], high_water_mark: dict | None = None,
+                 max_posts: int = REDDIT_LISTING_SCAN_MAX_POSTS, oldest_created_utc: float | None = None):
+        self.subreddit_instance = subreddit_instance
+        self.symbols = symbols
+        self.pattern = _ticker_pattern(symbols)
+        self.high_water_mark = high_water_mark
+        self.max_posts = max_posts
+        self.oldest_created_utc = oldest_created_utc
+        self.next_high_water_mark = high_water_mark
+        self.scanned_posts = 0
+        self.matched_posts = 0
+        self.completed = False
+        self.reached_mark = False
+        self.reached_lookback = False
+
+    @property
+    def may_have_gap(self) -> bool:
+        """האם ה-listing נגמר לפני סימן המים הקודם (או לפני גבול ה-lookback), כך שפוסטים שביניהם לא נסרקו."""
+        if self.reached_mark or self.reached_lookback:
+            return False
+        return self.high_water_mark is not None or self.scanned_posts >= self.max_posts
+
+    def __iter__(self):
+        next_high_water_mark = self.high_water_mark
+        for submission in self.subreddit_instance.new(limit=self.max_posts):
+            created_utc = submission.created_utc
+            if self.high_water_mark is not None and created_utc < self.high_water_mark["created_utc"]:
+                self.reached_mark = True
+                break
+            if not is_after_high_water_mark(created_utc, submission.fullname, self.high_water_mark):
+                continue
+            if self.oldest_created_utc is not None and created_utc < self.oldest_created_utc:
+                self.reached_lookback = True
+                break
+            self.scanned_posts += 1
+            next_high_water_mark = advance_high_water_mark(next_high_water_mark, created_utc, submission.fullname)
+
+            matched_symbols = match_symbols_in_text(f"{submission.title}\n{submission.selftext or ''}", self.symbols, self.pattern)
+            if matched_symbols:
+                self.matched_posts += 1
+                yield submission, [symbol for symbol in self.symbols if symbol in matched_symbols]
+
+        self.next_high_water_mark = next_high_water_mark
+        self.completed = True
+
+def scan_new_posts_for_symbols(symbols: list[str],
+                               subreddits_list: list[str],
+                               limit_per_sub: int = None,
+                               comments_limit: int = None,
+                               state_path: str = REDDIT_LISTING_STATE_PATH,
+                               max_posts_per_sub: int = REDDIT_LISTING_SCAN_MAX_POSTS,
+                               initial_lookback_hours: float = REDDIT_LISTING_INITIAL_LOOKBACK_HOURS
+                               ) -> dict[str, list[tuple[str, str]]]:
+    """
+    מצב listing-scan: לכל subreddit עובר על הפוסטים החדשים מאז הריצה הקודמת (בריצה הראשונה – initial_lookback_hours אחורה)
+    ומשייך אותם לסמלים בהתאמה מקומית. לכל סמל נלקחים עד limit_per_sub הפוסטים החדשים ביותר בכל subreddit, ורק עבורם
+    נשלפות התגובות (פעם אחת לפוסט). סימני המים נשמרים ב-state_path. מחזיר symbol -> רשימת (text, source) כמו get_reddit_posts_for_symbols.
+    """
+    from json_state import load_json_state, save_json_state
+
+    collected_by_symbol = {symbol: [] for symbol in symbols}
+    reddit_client = get_reddit_client()
+    if reddit_client is None:
+        logger.error("Reddit client (PRAW) is not initialized. Cannot scan subreddit listings.")
+        return collected_by_symbol
+    import praw # כבר נטען ב-get_reddit_client
+
+    actual_limit_per_sub = limit_per_sub if limit_per_sub is not None else LIMIT_PER_SUBREDDIT
+    actual_comments_limit = comments_limit if comments_limit is not None else COMMENTS_PER_POST
+    high_water_marks = load_json_state(state_path)
+    # גבול ה-lookback רק ל-subreddit בלי סימן מים; אחרת הסריקה ממשיכה עד הסימן גם אם הריצה הקודמת הייתה מזמן
+    initial_oldest_created_utc = time.time() - initial_lookback_hours * 3600
+    post_texts = {}
+    post_refs = []
+    post_ids_by_symbol = {symbol: [] for symbol in symbols}
+
+    for sub_name in subreddits_list:
+        posts_per_symbol = dict.fromkeys(symbols, 0)
+        try:
+            scan = SubredditListingScan(
+                reddit_client.subreddit(sub_name), symbols, high_water_mark=high_water_marks.get(sub_name),
+                max_posts=max_posts_per_sub,
+                oldest_created_utc=initial_oldest_created_utc if high_water_marks.get(sub_name) is None else None
+            )
+            for submission, matched_symbols in scan:
+                matched_symbols = [symbol for symbol in matched_symbols if posts_per_symbol[symbol] < actual_limit_per_sub]
+                if not matched_symbols:
+                    continue
+                post_text = _post_text(submission)
+                if post_text:
+                    post_texts[submission.id] = post_text
+                    post_refs.append((submission.id, sub_name))
+                for symbol in matched_symbols:
+                    if post_text:
+                        post_ids_by_symbol[symbol].append(submission.id)
+                    posts_per_symbol[symbol] += 1
+            if scan.next_high_water_mark is not None:
+                high_water_marks[sub_name] = scan.next_high_water_mark
+            if scan.may_have_gap:
+                logger.warning(f"Listing scan of r/{sub_name} ended after {scan.scanned_posts} posts before reaching the previous high-water mark; older new posts were skipped.")
+            logger.info(f"Scanned {scan.scanned_posts} new posts in r/{sub_name} ({scan.matched_posts} matched a symbol): {', '.join(f'{symbol}={count}' for symbol, count in posts_per_symbol.items() if count)}.")
+
+        except praw.exceptions.PRAWException as praw_error:
+             logger.error(f"A PRAW-specific error occurred while scanning r/{sub_name}: {praw_error}")
+        except Exception as general_error:
+            logger.error(f"An unexpected error occurred while scanning r/{sub_name}: {general_error}", exc_info=True)
+
+    save_json_state(state_path, high_water_marks)
+    comments_by_id = fetch_top_comments(post_refs, actual_comments_limit)
+    for symbol, post_ids in post_ids_by_symbol.items():
+        collected_by_symbol[symbol] = _texts_with_comments(post_ids, post_texts, comments_by_id)
+    logger.info(f"Total Reddit texts collected by listing scan for {len(symbols)} symbols: {sum(len(texts) for texts in collected_by_symbol.values())}.")
+    return collected_by_symbol
+
+def _refresh_post_scores(reddit_client, window: RedditSearchWindow):
+    # הניקוד ומספר התגובות של הפוסטים בחלון מתעדכנים בבקשה אחת לכל 100 פוסטים (info), בלי לחפש מחדש
+    fullnames = {post["fullname"]: post_id for post_id, post in window.posts.items()}
+    if not fullnames:
+        return
+    for submission in reddit_client.info(fullnames=list(fullnames)):
+        post = window.posts[fullnames[submission.fullname]]
+        post["score"] = submission.score
+        post["num_comments"] = submission.num_comments
+
+def get_new_reddit_posts_for_symbols(symbols: list[str],
+                                     subreddits_list: list[str] = None,
+                                     limit_per_sub: int = None,
+                                     comments_limit: int = None,
+                                     symbols_per_query: int = REDDIT_SEARCH_SYMBOLS_PER_QUERY,
+                                     state_path: str = REDDIT_SEARCH_WINDOW_STATE_PATH,
+                                     window_hours: float = REDDIT_SEARCH_WINDOW_HOURS
+                                     ) -> dict[str, list[tuple[str, str]]]:
+    """
+    גרסה מצטברת של get_reddit_posts_for_symbols לריצות תכופות: החיפוש המשותף (sort='new') נעצר בסימן המים של כל
+    (subreddit, symbol) מהריצה הקודמת, הפוסטים החדשים מתווספים לחלון השמור של השבוע האחרון, והניקוד של כל החלון
+    מתעדכן בבקשות info (100 פוסטים לבקשה). לכל סמל נבחרים limit_per_sub הפוסטים עם הניקוד הגבוה בחלון, כמו בחיפוש
+    sort='top' השבועי, ותגובות נשלפות רק לפוסטים שנבחרו ועוד לא נשלפו. מחיר ה-API ועבודת הניקוד (טקסטים שכבר נוקדו
+    נמצאים ב-cache של הסנטימנט) תלויים בכמות הפעילות החדשה ולא בגודל החלון. מחזיר symbol -> רשימת (text, source).
+    """
+    from json_state import load_json_state, save_json_state
+
+    collected_by_symbol = {symbol: [] for symbol in symbols}
+    reddit_client = get_reddit_client()
+    if reddit_client is None:
+        logger.error("Reddit client (PRAW) is not initialized. Cannot fetch posts.")
+        return collected_by_symbol
+    import praw # כבר נטען ב-get_reddit_client
+
+    subreddits_to_use = subreddits_list if subreddits_list is not None else SUBREDDITS_TO_SCRAPE
+    actual_limit_per_sub = limit_per_sub if limit_per_sub is not None else LIMIT_PER_SUBREDDIT
+    actual_comments_limit = comments_limit if comments_limit is not None else COMMENTS_PER_POST
+    symbols_per_query = max(1, symbols_per_query)
+    symbol_groups = [symbols[start:start + symbols_per_query] for start in range(0, len(symbols), symbols_per_query)]
+
+    window = RedditSearchWindow(load_json_state(state_path), window_hours)
+    now = time.time()
+    window.prune(now)
+    window_start = now - window_hours * 3600
+    time_filter = _search_time_filter(window_hours)
+
+    searches = 0
+    new_posts = 0
+    for sub_name in subreddits_to_use:
+        for symbol_group in symbol_groups:
+            search_query = " OR ".join(f'"{symbol}"' for symbol in symbol_group)
+            pattern = _ticker_pattern(symbol_group)
+            marks = {symbol: window.high_water_mark(sub_name, symbol) for symbol in symbol_group}
+            # לסמל בלי סימן מים (ריצה ראשונה / סמל חדש ביקום) – מתחילת החלון
+            lower_bounds = {symbol: max(mark["created_utc"], window_start) if mark else window_start for symbol, mark in marks.items()}
+            newest_seen = None
+            oldest_seen = None
+            results = 0
+            reached_lower_bound = False
+            logger.debug("Searching r/%s for new posts matching: '%s'...", sub_name, search_query)
+            try:
+                subreddit_instance = reddit_client.subreddit(sub_name)
+                submissions = subreddit_instance.search(query=search_query, sort='new', time_filter=time_filter, limit=None)
+                searches += 1
+                for submission in submissions:
+                    created_utc = submission.created_utc
+                    if created_utc < min(lower_bounds.values()):
+                        reached_lower_bound = True
+                        break
+                    results += 1
+                    oldest_seen = created_utc
+                    newest_seen = advance_high_water_mark(newest_seen, created_utc, submission.fullname)
+                    matched_symbols = match_symbols_in_text(f"{submission.title}\n{submission.selftext or ''}", symbol_group, pattern)
+                    matched_symbols = [
+                        symbol for symbol in symbol_group
+                        if symbol in matched_symbols and created_utc >= lower_bounds[symbol]
+                        and is_after_high_water_mark(created_utc, submission.fullname, marks[symbol])
+                    ]
+                    post_text = _post_text(submission) if matched_symbols else None
+                    if not post_text:
+                        continue
+                    for symbol in matched_symbols:
+                        window.add_post(sub_name, symbol, submission, post_text)
+                    new_posts += 1
+
+            except praw.exceptions.PRAWException as praw_error:
+                 logger.error(f"A PRAW-specific error occurred while fetching from r/{sub_name} for {symbol_group}: {praw_error}")
+                 continue
+            except Exception as general_error:
+                logger.error(f"An unexpected error occurred while fetching from r/{sub_name} for {symbol_group}: {general_error}", exc_info=True)
+                continue
+
+            # חיפוש שנגמר לפני הגבול התחתון בלי להגיע לתקרת התוצאות כיסה את כל ה-time_filter (שמכסה את החלון).
+            # חיפוש שנקטע בתקרה השאיר פער בין הפוסט הישן ביותר שחזר לסימן המים – לא מקדמים את הסימן, כדי שהריצה הבאה
+            # תחפש שוב מאותה נקודה (פוסטים שכבר נשמרו בחלון לא נוספים פעמיים)
+            if not reached_lower_bound and results >= _SEARCH_RESULTS_CAP:
+                logger.warning(f"Search of r/{sub_name} for {symbol_group} stopped after {results} results at "
+                               f"{time.strftime('%Y-%m-%d %H:%M', time.gmtime(oldest_seen))} UTC, before the previous "
+                               f"high-water mark; keeping the marks so the next run searches the gap again.")
+                continue
+            # החיפוש הגיע עד סימן המים של כל הסמלים בקבוצה, ולכן כולם "נסרקו" עד הפוסט החדש ביותר שחזר – גם סמל שקט
+            # שאין לו פוסטים חדשים לא יגרום לחיפוש עד תחילת החלון בריצה הבאה
+            if newest_seen is not None:
+                for symbol in symbol_group:
+                    mark = marks[symbol]
+                    for fullname in newest_seen["fullnames"]:
+                        mark = advance_high_water_mark(mark, newest_seen["created_utc"], fullname)
+                    window.set_high_water_mark(sub_name, symbol, mark)
+
+    try:
+        _refresh_post_scores(reddit_client, window)
+    except Exception as refresh_error:
+        logger.warning(f"Could not refresh scores of {len(window.posts)} cached Reddit posts: {refresh_error}. Ranking by the stored scores.")
+
+    selected_by_symbol = {
+        symbol: [(sub_name, window.top_post_ids(sub_name, symbol, actual_limit_per_sub)) for sub_name in subreddits_to_use]
+        for symbol in symbols
+    }
+    comment_refs = [
+        (post_id, sub_name) for sub_posts in selected_by_symbol.values() for sub_name, post_ids in sub_posts
+        for post_id in post_ids if window.needs_comments(post_id, actual_comments_limit)
+    ]
+    for post_id, comment_texts in fetch_top_comments(comment_refs, actual_comments_limit).items():
+        window.set_comments(post_id, comment_texts)
+
+    for symbol, sub_posts in selected_by_symbol.items():
+        for _, post_ids in sub_posts:
+            for post_id in post_ids:
+                collected_by_symbol[symbol].extend(window.post_texts(post_id))
+
+    save_json_state(state_path, window.to_dict())
+    logger.info(f"Total Reddit texts collected for {len(symbols)} symbols: {sum(len(texts) for texts in collected_by_symbol.values())} ({new_posts} new posts from {searches} searches, {len(window.posts)} posts in the {window_hours:g}h window).")
+    return collected_by_symbol
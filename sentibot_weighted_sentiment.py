@@ -1,10 +1,24 @@
 # Sentibot – Weighted Sentiment Engine
 # Calculates a time-decayed, source-weighted sentiment score per stock symbol
 
+import hashlib
 import math
-from datetime import datetime
+import random
+import time
+from datetime import datetime, timedelta
 from typing import List, Dict
 
+import numpy as np
+import pandas as pd
+
+DEFAULT_SOURCE_WEIGHTS = {
+    'Bloomberg': 1.3,
+    'CNBC': 1.2,
+    'Yahoo Finance': 1.0,
+    'Unknown': 0.8
+}
+DEFAULT_UNKNOWN_SOURCE_WEIGHT = 0.8
+
 # הגדרת מחלקה לאובייקט כותרת
 class Headline:
     def __init__(self, symbol: str, sentiment_score: float, source: str, published_at: datetime):
@@ -14,22 +28,20 @@ class Headline:
         self.published_at = published_at
 
 # פונקציה לחישוב סנטימנט משוקלל לכל מניה
-def calculate_weighted_sentiment(headlines: List[Headline], source_weights: Dict[str, float] = None, lambda_decay: float = 0.1) -> Dict[str, float]:
+def calculate_weighted_sentiment(headlines: List[Headline], source_weights: Dict[str, float] = None, lambda_decay: float = 0.1,
+                                 now: datetime = None) -> Dict[str, float]:
     if source_weights is None:
-        source_weights = {
-            'Bloomberg': 1.3,
-            'CNBC': 1.2,
-            'Yahoo Finance': 1.0,
-            'Unknown': 0.8
-        }
+        source_weights = DEFAULT_SOURCE_WEIGHTS
+    if now is None:
+        now = datetime.now() # זמן ייחוס אחד לכל הכותרות
 
     symbol_scores = {}
     symbol_weights = {}
 
     for headline in headlines:
-        age_hours = (datetime.now() - headline.published_at).total_seconds() / 3600.0
+        age_hours = (now - headline.published_at).total_seconds() / 3600.0
         decay = math.exp(-lambda_decay * age_hours)
-        source_weight = source_weights.get(headline.source, 0.8)
+        source_weight = source_weights.get(headline.source, DEFAULT_UNKNOWN_SOURCE_WEIGHT)
 
         weighted_score = headline.sentiment_score * source_weight * decay
         weighted_weight = source_weight * decay
@@ -47,3 +59,216 @@ def calculate_weighted_sentiment(headlines: List[Headline], source_weights: Dict
     }
 
     return weighted_sentiments
+
+def calculate_weighted_sentiment_arrays(symbols, sentiment_scores, sources, published_at, source_weights: Dict[str, float] = None,
+                                        lambda_decay: float = 0.1, bucket: str = None):
+    """
+    אותו חישוב כמו calculate_weighted_sentiment, על מערכים (סמלים, ציונים, מקורות, זמני פרסום) במקום אובייקטי Headline –
+    לשחזור שנה של כותרות בבת אחת. סמלים ומקורות מקודדים פעם אחת (factorize), משקל המקור נמפה רק לערכים הייחודיים,
+    והסכומים לכל קבוצה מחושבים ב-np.bincount אחד.
+    הדעיכה exp(-lambda * (now - t)) מצטמצמת במנה (אותו גורם במונה ובמכנה של הקבוצה), ולכן התוצאה לא תלויה ב-now;
+    הזמנים נמדדים יחסית לכותרת האחרונה בכל קבוצה כדי ש-exp לא יגלוש בטווח של חודשים.
+    בלי bucket – מחזיר dict של symbol -> ציון, כמו calculate_weighted_sentiment.
+    עם bucket (תדירות period של pandas, למשל "h", "D" או "W") – DataFrame עם symbol, bucket, weighted_sentiment, num_headlines לכל סמל ותקופה.
+    """
+    if source_weights is None:
+        source_weights = DEFAULT_SOURCE_WEIGHTS
+
+    symbol_codes, symbol_names = pd.factorize(np.asarray(symbols, dtype=object))
+    source_codes, source_names = pd.factorize(np.asarray(sources, dtype=object))
+    source_weight_values = np.array([source_weights.get(name, DEFAULT_UNKNOWN_SOURCE_WEIGHT) for name in source_names], dtype=float)
+    weights = source_weight_values[source_codes] if len(source_names) else np.zeros(len(source_codes))
+    scores = np.asarray(sentiment_scores, dtype=float)
+    timestamps = pd.DatetimeIndex(pd.to_datetime(published_at)).as_unit("ns") # pandas בוחר רזולוציה לפי הקלט
+    hours = timestamps.asi8 / 3.6e12 # ננו-שניות -> שעות
+
+    if bucket is None:
+        group_codes = symbol_codes
+        num_groups = len(symbol_names)
+    else:
+        local_timestamps = timestamps.tz_localize(None) if timestamps.tz is not None else timestamps # to_period לא שומר אזור זמן
+        bucket_codes, bucket_labels = pd.factorize(local_timestamps.to_period(bucket).start_time)
+        group_codes, group_index = pd.factorize(symbol_codes.astype(np.int64) * max(len(bucket_labels), 1) + bucket_codes)
+        num_groups = len(group_index)
+
+    latest_hours = np.full(num_groups, -np.inf)
+    np.maximum.at(latest_hours, group_codes, hours)
+    decayed_weights = weights * np.exp(-lambda_decay * (latest_hours[group_codes] - hours))
+    weighted_sums = np.bincount(group_codes, weights=scores * decayed_weights, minlength=num_groups)
+    weight_sums = np.bincount(group_codes, weights=decayed_weights, minlength=num_groups)
+    weighted_means = np.divide(weighted_sums, weight_sums, out=np.zeros(num_groups), where=weight_sums != 0)
+
+    if bucket is None:
+        return dict(zip(symbol_names.tolist(), weighted_means.tolist()))
+    num_buckets = max(len(bucket_labels), 1)
+    return pd.DataFrame({
+        "symbol": symbol_names[group_index // num_buckets],
+        "bucket": bucket_labels[group_index % num_buckets],
+        "weighted_sentiment": weighted_means,
+        "num_headlines": np.bincount(group_codes, minlength=num_groups),
+    }).sort_values(["symbol", "bucket"], ignore_index=True)
+
+class DecayedSentimentState:
+    """
+    צובר מתמשך לכל סמל: סכום משוקלל (score * source_weight * decay) וסכום משקלות, יחסית לזמן ייחוס (reference_time).
+    כותרת חדשה מעדכנת את הצובר ב-O(1) בלי לעבור שוב על כל הכותרות; כותרת חדשה מזמן הייחוס מזיזה אותו קדימה
+    (שני הסכומים מוכפלים ב-exp(-lambda * Δt)). הדעיכה חלה על שני הסכומים באותו יחס, ולכן score() לא תלוי בזמן השאילתה
+    ושווה ל-calculate_weighted_sentiment על אותן כותרות; weight(now) מחיל את הדעיכה רק בשאילתה.
+    item_key (למשל טקסט הכותרת) מונע ספירה כפולה של אותה כותרת שחוזרת בפיד בריצות הבאות, בחלון dedup_window_hours.
+    """
+
+    def __init__(self, lambda_decay: float = 0.1, source_weights: Dict[str, float] = None,
+                 default_source_weight: float = DEFAULT_UNKNOWN_SOURCE_WEIGHT, dedup_window_hours: float = 72.0):
+        self.lambda_decay = lambda_decay
+        self.source_weights = DEFAULT_SOURCE_WEIGHTS if source_weights is None else source_weights
+        self.default_source_weight = default_source_weight
+        self.dedup_window_hours = dedup_window_hours
+        # symbol -> {"weighted_sum", "weight", "reference_time", "seen": {item_hash: published_at}}
+        self.symbols = {}
+
+    @staticmethod
+    def _item_hash(item_key: str) -> str:
+        return hashlib.sha1(" ".join(item_key.split()).encode("utf-8")).hexdigest()
+
+    def add(self, symbol: str, sentiment_score: float, source: str, published_at: datetime, item_key: str = None) -> bool:
+        """מוסיף כותרת אחת לצובר של symbol. מחזיר False אם item_key כבר נספר (ואז הצובר לא משתנה)."""
+        state = self.symbols.get(symbol)
+        if state is None:
+            state = {"weighted_sum": 0.0, "weight": 0.0, "reference_time": published_at, "seen": {}}
+            self.symbols[symbol] = state
+
+        if item_key is not None:
+            item_hash = self._item_hash(item_key)
+            if item_hash in state["seen"]:
+                return False
+            state["seen"][item_hash] = published_at
+
+        delta_hours = (published_at - state["reference_time"]).total_seconds() / 3600.0
+        if delta_hours > 0:
+            shift = math.exp(-self.lambda_decay * delta_hours)
+            state["weighted_sum"] *= shift
+            state["weight"] *= shift
+            state["reference_time"] = published_at
+            decay = 1.0
+        else:
+            decay = math.exp(self.lambda_decay * delta_hours)
+
+        source_weight = self.source_weights.get(source, self.default_source_weight)
+        state["weighted_sum"] += sentiment_score * source_weight * decay
+        state["weight"] += source_weight * decay
+        return True
+
+    def add_headline(self, headline: Headline, item_key: str = None) -> bool:
+        return self.add(headline.symbol, headline.sentiment_score, headline.source, headline.published_at, item_key)
+
+    def score(self, symbol: str) -> float | None:
+        """הסנטימנט המשוקלל-דעוך של symbol, או None אם אין לו כותרות."""
+        state = self.symbols.get(symbol)
+        if state is None:
+            return None
+        return state["weighted_sum"] / state["weight"] if state["weight"] != 0 else 0.0
+
+    def scores(self) -> Dict[str, float]:
+        return {symbol: self.score(symbol) for symbol in self.symbols}
+
+    def weight(self, symbol: str, now: datetime = None) -> float:
+        """המשקל האפקטיבי (אחרי דעיכה עד now) – כמה "ראיות" טריות עומדות מאחורי הציון."""
+        state = self.symbols.get(symbol)
+        if state is None:
+            return 0.0
+        if now is None:
+            now = datetime.now()
+        age_hours = max(0.0, (now - state["reference_time"]).total_seconds() / 3600.0)
+        return state["weight"] * math.exp(-self.lambda_decay * age_hours)
+
+    def prune(self, now: datetime = None, min_weight: float = 1e-6) -> int:
+        """מוחק מפתחות dedup ישנים מחלון ה-dedup, וסמלים שהמשקל הדעוך שלהם ירד מתחת ל-min_weight. מחזיר את מספר הסמלים שנמחקו."""
+        if now is None:
+            now = datetime.now()
+        cutoff = now - timedelta(hours=self.dedup_window_hours)
+        removed_symbols = [symbol for symbol in self.symbols if self.weight(symbol, now) < min_weight]
+        for symbol in removed_symbols:
+            del self.symbols[symbol]
+        for state in self.symbols.values():
+            state["seen"] = {item_hash: seen_at for item_hash, seen_at in state["seen"].items() if seen_at >= cutoff}
+        return len(removed_symbols)
+
+    def to_dict(self) -> dict:
+        return {
+            "lambda_decay": self.lambda_decay,
+            "symbols": {
+                symbol: {
+                    "weighted_sum": state["weighted_sum"], "weight": state["weight"],
+                    "reference_time": state["reference_time"].isoformat(),
+                    "seen": {item_hash: seen_at.isoformat() for item_hash, seen_at in state["seen"].items()},
+                }
+                for symbol, state in self.symbols.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, **kwargs) -> "DecayedSentimentState":
+        """בונה צובר ממצב שמור. צובר שנשמר עם lambda אחר לא תואם (הסכומים נדעכו בקצב אחר) – ואז מתחילים מצובר ריק."""
+        state = cls(**kwargs)
+        if data.get("lambda_decay") != state.lambda_decay:
+            return state
+        for symbol, saved in data.get("symbols", {}).items():
+            state.symbols[symbol] = {
+                "weighted_sum": float(saved["weighted_sum"]), "weight": float(saved["weight"]),
+                "reference_time": datetime.fromisoformat(saved["reference_time"]),
+                "seen": {item_hash: datetime.fromisoformat(seen_at) for item_hash, seen_at in saved.get("seen", {}).items()},
+            }
+        return state
+
+    def save(self, path: str) -> bool:
+        from json_state import save_json_state
+        self.prune()
+        return save_json_state(path, self.to_dict())
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "DecayedSentimentState":
+        from json_state import load_json_state
+        return cls.from_dict(load_json_state(path), **kwargs)
+
+if __name__ == "__main__":
+    # דוגמה: הצובר המצטבר והגרסה הווקטורית נותנים את אותו ציון כמו החישוב המלא על כל הכותרות
+    reference_now = datetime.now()
+    sample_headlines = [
+        Headline("AAPL", 0.8, "Bloomberg", reference_now - timedelta(hours=30)),
+        Headline("AAPL", 0.3, "CNBC", reference_now - timedelta(hours=2)),
+        Headline("AAPL", 0.6, "Yahoo Finance", reference_now - timedelta(hours=10)),
+        Headline("MSFT", 0.4, "Reuters", reference_now - timedelta(hours=5)),
+    ]
+    decayed_state = DecayedSentimentState()
+    for sample_headline in sample_headlines:
+        decayed_state.add_headline(sample_headline)
+    full_scores = calculate_weighted_sentiment(sample_headlines, now=reference_now)
+    for sample_symbol, incremental_score in decayed_state.scores().items():
+        print(f"{sample_symbol}: incremental {incremental_score:.6f}, full recompute {full_scores[sample_symbol]:.6f}, "
+              f"effective weight {decayed_state.weight(sample_symbol, reference_now):.3f}")
+
+    # השוואת זמנים ודיוק על קורפוס סינתטי של שבוע כותרות
+    rng = random.Random(0)
+    corpus_symbols = [f"SYM{index}" for index in range(50)]
+    corpus_sources = list(DEFAULT_SOURCE_WEIGHTS) + ["Reuters"]
+    corpus = [
+        Headline(rng.choice(corpus_symbols), rng.random(), rng.choice(corpus_sources), reference_now - timedelta(hours=rng.uniform(0, 24 * 7)))
+        for _ in range(200000)
+    ]
+    start = time.perf_counter()
+    loop_scores = calculate_weighted_sentiment(corpus, now=reference_now)
+    loop_seconds = time.perf_counter() - start
+    # בשחזור היסטורי העמודות מגיעות כבר כמערכים (למשל מ-CSV/DataFrame), ולכן ההמרה מחוץ למדידה
+    corpus_arrays = (
+        np.array([h.symbol for h in corpus], dtype=object), np.array([h.sentiment_score for h in corpus]),
+        np.array([h.source for h in corpus], dtype=object), np.array([h.published_at for h in corpus], dtype="datetime64[ns]"),
+    )
+    start = time.perf_counter()
+    vectorized_scores = calculate_weighted_sentiment_arrays(*corpus_arrays)
+    vectorized_seconds = time.perf_counter() - start
+    max_difference = max(abs(loop_scores[symbol] - vectorized_scores[symbol]) for symbol in loop_scores)
+    print(f"\n{len(corpus)} headlines: loop {loop_seconds:.3f}s, vectorized {vectorized_seconds:.3f}s "
+          f"({loop_seconds / vectorized_seconds:.1f}x), max difference {max_difference:.2e}")
+    daily_scores = calculate_weighted_sentiment_arrays(*corpus_arrays, bucket="D")
+    print(f"Daily buckets: {len(daily_scores)} (symbol, day) rows")
+    print(daily_scores.head())
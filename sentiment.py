@@ -1,11 +1,8 @@
 import re
-import nltk
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
+from sentiment_backends import get_backend
 
-# ודא שה-lexicon זמין
-nltk.download('vader_lexicon')
-
-analyzer = SentimentIntensityAnalyzer()
+# ה-lexicon נטען בשימוש הראשון (מ-nltk_data המקומי או מה-cache) – לא ב-import
+analyzer = get_backend("nltk_vader")
 
 def clean_text(text):
     """
@@ -23,8 +20,7 @@ def get_sentiment_score(text):
     מחשב ציון סנטימנט בין -1 ל־1.
     """
     cleaned = clean_text(text)
-    score = analyzer.polarity_scores(cleaned)
-    return score['compound']
+    return analyzer.compound(cleaned)
 
 # Alias for backward compatibility
 analyze_sentiment = get_sentiment_score
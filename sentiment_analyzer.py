@@ -1,18 +1,87 @@
 # sentiment_analyzer.py
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+import numpy as np
 # שיניתי את שם המשתנה ב-settings.py ל-NEWS_SOURCES_CONFIG
-from settings import setup_logger, NEWS_SOURCES_CONFIG 
+from settings import setup_logger, NEWS_SOURCES_CONFIG, SENTIMENT_ENGINE
+from sentiment_cache import get_sentiment_cache, make_cache_key
+from sentiment_backends import get_backend, available_backends
 
 # אתחול לוגר ספציפי למודול זה
 logger = setup_logger(__name__) # השם יהיה "sentiment_analyzer"
 
-# אתחול ה-analyzer פעם אחת כשהמודול נטען
-try:
-    analyzer = SentimentIntensityAnalyzer()
-    logger.info("VADER SentimentIntensityAnalyzer initialized successfully.")
-except Exception as e:
-    logger.critical(f"Failed to initialize SentimentIntensityAnalyzer: {e}", exc_info=True)
-    analyzer = None # הגדר כ-None אם האתחול נכשל
+# המנוע נבחר כאן אבל נטען (ספרייה + לקסיקון) רק בניתוח הראשון – ראו load_sentiment_backend
+if SENTIMENT_ENGINE not in available_backends():
+    logger.warning(f"Unknown SENTIMENT_ENGINE '{SENTIMENT_ENGINE}'. Using the reference VADER implementation.")
+    SENTIMENT_BACKEND_NAME = "vader"
+else:
+    SENTIMENT_BACKEND_NAME = SENTIMENT_ENGINE
+backend_load_failed = False
+
+# ציונים של מנועים שונים לא מתערבבים ב-cache
+ANALYZER_VERSION = get_backend(SENTIMENT_BACKEND_NAME).version
+
+def load_sentiment_backend():
+    """
+    טוען את מנוע הסנטימנט (אם עוד לא נטען) ומחזיר אותו, או None אם הטעינה נכשלה (נרשם ללוג פעם אחת).
+    שימושי גם לטעינה מראש – למשל לפני fork של תהליכי worker, כדי שיירשו את הלקסיקון הטעון.
+    """
+    global backend_load_failed
+    if backend_load_failed:
+        return None
+    backend = get_backend(SENTIMENT_BACKEND_NAME)
+    try:
+        backend.load()
+    except Exception as e:
+        logger.critical(f"Failed to initialize sentiment backend '{SENTIMENT_BACKEND_NAME}': {e}", exc_info=True)
+        backend_load_failed = True
+        return None
+    return backend
+
+def _score_uncached(texts: list[str]) -> list[float | None]:
+    backend = load_sentiment_backend()
+    if backend is None:
+        return [None] * len(texts)
+    if backend.batched and texts:
+        try:
+            return backend.compound_scores(texts)
+        except Exception as e:
+            logger.error(f"Sentiment backend '{backend.name}' failed on a batch of {len(texts)} texts: {e}. Falling back to reference VADER.", exc_info=True)
+            backend = get_backend("vader")
+
+    scores = []
+    for text in texts:
+        try:
+            scores.append(backend.compound(text))
+        except Exception as e:
+            logger.error(f"Error during sentiment analysis for text '{text[:70]}...': {e}", exc_info=True)
+            scores.append(None)
+    return scores
+
+def _compound_scores(texts: list[str]) -> list[float | None]:
+    """
+    ציוני ה-compound של VADER לטקסטים (תקינים ולא ריקים), דרך ה-cache: רק טקסטים שלא נמצאו ב-cache מנותחים בפועל.
+    None לטקסט שהניתוח שלו נכשל.
+    """
+    cache = get_sentiment_cache()
+    keys = [make_cache_key(text, ANALYZER_VERSION) for text in texts] if cache is not None else None
+    cached_scores = cache.get_many(keys) if cache is not None else {}
+
+    compound_scores = [cached_scores.get(key) for key in keys] if keys is not None else [None] * len(texts)
+    # טקסטים שלא נמצאו ב-cache מנוקדים יחד (כפילויות בתוך הבאץ' – פעם אחת)
+    uncached_indexes = {}
+    for i, score in enumerate(compound_scores):
+        if score is None:
+            uncached_indexes.setdefault(keys[i] if keys is not None else i, []).append(i)
+    first_indexes = [indexes[0] for indexes in uncached_indexes.values()]
+    new_scores = {}
+    for (key, indexes), score in zip(uncached_indexes.items(), _score_uncached([texts[i] for i in first_indexes])):
+        for i in indexes:
+            compound_scores[i] = score
+        if score is not None and keys is not None:
+            new_scores[key] = score
+
+    if cache is not None and new_scores:
+        cache.put_many(new_scores)
+    return compound_scores
 
 def analyze_sentiment(text: str, source_name: str = None) -> float | None:
     """
@@ -24,7 +93,7 @@ def analyze_sentiment(text: str, source_name: str = None) -> float | None:
     הטווח יהיה בין 0 (שלילי לחלוטין) ל-1 (חיובי לחלוטין).
     אם יש משקלים גדולים מ-1, הציון יכול לחרוג מ-1.
     """
-    if analyzer is None:
+    if load_sentiment_backend() is None:
         logger.error("Sentiment analyzer is not initialized. Cannot analyze sentiment.")
         return None
     
@@ -33,14 +102,16 @@ def analyze_sentiment(text: str, source_name: str = None) -> float | None:
         return None
 
     try:
-        # קבלת ציון ה-compound מ-VADER (טווח: -1 עד +1)
-        base_score = analyzer.polarity_scores(text)["compound"]
-        logger.debug(f"Text: '{text[:70]}...', VADER compound score: {base_score:.4f}")
+        # קבלת ציון ה-compound מ-VADER (טווח: -1 עד +1), דרך ה-cache של הציונים
+        base_score = _compound_scores([text])[0]
+        if base_score is None:
+            return None
+        logger.debug("Text: '%.70s...', VADER compound score: %.4f", text, base_score)
 
         # נרמול הציון לטווח 0 עד 1 (0 = הכי שלילי, 0.5 = ניטרלי, 1 = הכי חיובי)
         # זה שימושי אם רוצים שכל הציונים יהיו באותו סקאלה לפני שקלול.
         normalized_score = (base_score + 1) / 2
-        logger.debug(f"Normalized score (0-1): {normalized_score:.4f}")
+        logger.debug("Normalized score (0-1): %.4f", normalized_score)
 
         # ברירת מחדל למשקל אם המקור לא ידוע או לא מוגדר לו משקל
         source_weight = 1.0 
@@ -49,7 +120,7 @@ def analyze_sentiment(text: str, source_name: str = None) -> float | None:
             source_config = NEWS_SOURCES_CONFIG.get(source_name)
             if source_config:
                 source_weight = source_config.get("weight", 1.0)
-                logger.debug(f"Source '{source_name}' found with weight: {source_weight}")
+                logger.debug("Source '%s' found with weight: %s", source_name, source_weight)
             else:
                 logger.warning(f"Source '{source_name}' not found in NEWS_SOURCES_CONFIG. Using default weight 1.0.")
         else:
@@ -59,7 +130,7 @@ def analyze_sentiment(text: str, source_name: str = None) -> float | None:
         # אם המשקל הוא 1.0, זה פשוט הציון המנורמל.
         # אם המשקל שונה, הוא יכול להגביר או להחליש את השפעת הסנטימנט מהמקור.
         adjusted_score = normalized_score * source_weight
-        logger.debug(f"Adjusted score (after weight {source_weight}): {adjusted_score:.4f}")
+        logger.debug("Adjusted score (after weight %s): %.4f", source_weight, adjusted_score)
 
         return round(adjusted_score, 4) # החזרת הציון עם 4 מקומות אחרי הנקודה לדיוק
 
@@ -67,6 +138,97 @@ def analyze_sentiment(text: str, source_name: str = None) -> float | None:
         logger.error(f"Error during sentiment analysis for text '{text[:70]}...': {e}", exc_info=True)
         return None # החזר None במקרה של שגיאה לא צפויה
 
+def _resolve_source_weights(sources) -> dict:
+    # משקל לכל מקור ייחודי בבאץ' – חיפוש אחד ב-NEWS_SOURCES_CONFIG ואזהרה אחת למקור לא מוכר
+    weights = {}
+    for source_name in sources:
+        if source_name in weights:
+            continue
+        source_config = NEWS_SOURCES_CONFIG.get(source_name) if source_name else None
+        if source_config:
+            weights[source_name] = source_config.get("weight", 1.0)
+        else:
+            if source_name:
+                logger.warning(f"Source '{source_name}' not found in NEWS_SOURCES_CONFIG. Using default weight 1.0.")
+            weights[source_name] = 1.0
+    return weights
+
+def analyze_sentiments(texts: list[str], sources: list[str] | str | None = None) -> np.ndarray:
+    """
+    גרסת הבאץ' של analyze_sentiment: מחזיר מערך NumPy של ציונים משוקללים (אותו חישוב ואותו עיגול ל-4 ספרות),
+    עם NaN במקום None עבור טקסט ריק/לא תקין או שגיאה בניתוח.
+    sources – רשימה מקבילה ל-texts, או שם מקור אחד לכל הטקסטים. המשקלים נקבעים פעם אחת לכל מקור ייחודי.
+    """
+    texts = list(texts)
+    if sources is None or isinstance(sources, str):
+        sources = [sources] * len(texts)
+    else:
+        sources = list(sources)
+        if len(sources) != len(texts):
+            raise ValueError(f"Got {len(texts)} texts but {len(sources)} sources.")
+
+    scores = np.full(len(texts), np.nan)
+    if load_sentiment_backend() is None:
+        logger.error("Sentiment analyzer is not initialized. Cannot analyze sentiment.")
+        return scores
+
+    source_weights = _resolve_source_weights(sources)
+    weights = np.array([source_weights[source_name] for source_name in sources], dtype=float)
+    compound_scores = np.full(len(texts), np.nan)
+    valid_indexes = [i for i, text in enumerate(texts) if text and isinstance(text, str)]
+    invalid_count = len(texts) - len(valid_indexes)
+    valid_scores = _compound_scores([texts[i] for i in valid_indexes])
+    error_count = sum(score is None for score in valid_scores)
+    compound_scores[valid_indexes] = [np.nan if score is None else score for score in valid_scores]
+
+    adjusted_scores = (compound_scores + 1) / 2 * weights
+    # round() של Python ולא np.round, כדי שהציונים יהיו זהים בדיוק לאלה של analyze_sentiment
+    scores = np.array([round(score, 4) if score == score else np.nan for score in adjusted_scores.tolist()])
+    if invalid_count:
+        logger.warning(f"Skipped {invalid_count} empty or invalid texts in sentiment batch of {len(texts)}.")
+    logger.debug("Analyzed sentiment batch: %d/%d texts scored, %d distinct sources.", len(texts) - invalid_count - error_count, len(texts), len(source_weights))
+    return scores
+
+def aggregate_sentiment_by_symbol(symbols: list[str], scores, sources: list[str]) -> dict[str, dict]:
+    """
+    סטטיסטיקה לכל סמל מתוך מערכים שטוחים ומקבילים (סמל, ציון, מקור) של כל פריטי הריצה, במעבר אחד:
+    symbol -> {"avg_sentiment", "sentiment_std", "num_items", "main_source"}.
+    sentiment_std – סטיית תקן מדגמית (ddof=1) או 0.0 אם יש פריט אחד; main_source – המקור עם הכי הרבה פריטים
+    (בשוויון – זה שהופיע ראשון). ציוני NaN לא נספרים. הסמלים מוחזרים לפי סדר ההופעה הראשונה.
+    """
+    scores = np.asarray(scores, dtype=float)
+    valid = ~np.isnan(scores)
+    symbols = np.asarray(symbols, dtype=object)[valid]
+    sources = np.asarray(sources, dtype=object)[valid]
+    scores = scores[valid]
+    if scores.size == 0:
+        return {}
+
+    unique_symbols, first_index, symbol_idx = np.unique(symbols, return_index=True, return_inverse=True)
+    counts = np.bincount(symbol_idx)
+    means = np.bincount(symbol_idx, weights=scores) / counts
+    squared_deviations = np.bincount(symbol_idx, weights=(scores - means[symbol_idx]) ** 2)
+    stds = np.where(counts > 1, np.sqrt(squared_deviations / np.maximum(counts - 1, 1)), 0.0)
+
+    # ספירת פריטים לכל זוג (סמל, מקור), ובחירת המקור הנפוץ לכל סמל (שוויון – ההופעה הראשונה)
+    unique_sources, source_idx = np.unique(sources.astype(str), return_inverse=True)
+    pair_keys = symbol_idx * len(unique_sources) + source_idx
+    unique_pairs, pair_first_index, pair_counts = np.unique(pair_keys, return_index=True, return_counts=True)
+    pair_symbols = unique_pairs // len(unique_sources)
+    order = np.lexsort((pair_first_index, -pair_counts, pair_symbols))
+    best_pairs = order[np.r_[True, pair_symbols[order][1:] != pair_symbols[order][:-1]]]
+    main_sources = {int(pair_symbols[i]): sources[pair_first_index[i]] for i in best_pairs}
+
+    return {
+        unique_symbols[i]: {
+            "avg_sentiment": float(means[i]),
+            "sentiment_std": float(stds[i]),
+            "num_items": int(counts[i]),
+            "main_source": main_sources[i],
+        }
+        for i in np.argsort(first_index, kind="stable")
+    }
+
 if __name__ == "__main__":
     # --- בלוק לבדיקה מקומית ---
     import logging
@@ -88,7 +250,7 @@ if __name__ == "__main__":
         ("This is bad.", "UnknownSource") # מקור שלא מוגדר ב-NEWS_SOURCES_CONFIG
     ]
 
-    if analyzer: # בדוק שה-analyzer אותחל
+    if load_sentiment_backend(): # בדוק שה-analyzer אותחל
         for text_to_analyze, src_name in sample_texts:
             test_logger.info(f"--- Analyzing text for source: {src_name or 'N/A'} ---")
             test_logger.info(f"Original text: \"{text_to_analyze}\"")
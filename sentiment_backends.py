@@ -0,0 +1,220 @@
+# sentiment_backends.py
+# רישום (registry) אחד לכל מנועי ניתוח הסנטימנט, מאחורי ממשק אחד: compound(text) / compound_scores(texts) – ציון compound של VADER (-1 עד 1).
+#   "vader"      – vaderSentiment (הלקסיקון מגיע עם החבילה)
+#   "vectorized" – vader_engine.VectorizedVader, באצ'ים עם NumPy על הלקסיקון של "vader" (אותם ציונים)
+#   "nltk_vader" – nltk.sentiment.vader (הלקסיקון מ-nltk_data / מה-cache המקומי)
+# שום דבר לא נטען ב-import: הספרייה והלקסיקון נטענים בשימוש הראשון בכל מנוע, וזמן הטעינה (cold start) נמדד ונרשם ללוג.
+import importlib.metadata
+import io
+import os
+import shutil
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from settings import setup_logger, SENTIMENT_LEXICON_CACHE_DIR, SENTIMENT_LEXICON_DOWNLOAD_ENABLED
+
+logger = setup_logger(__name__)
+
+def _package_version(package_name: str) -> str:
+    try:
+        return importlib.metadata.version(package_name)
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+class SentimentBackend(ABC):
+    """
+    בסיס לכל מנוע. מחלקות-בת מממשות version, _load (מחזיר את האובייקט שמנקד) ו-_score (ציון compound לטקסט אחד) –
+    מנוע חסר נכשל כבר ביצירה; מנוע שמנקד באץ' שלם בבת אחת (batched=True) מממש גם את _score_batch.
+    load_seconds – זמן הטעינה בשימוש הראשון, first_call_seconds – זמן הקריאה הראשונה לניקוד (כולל חימום).
+    """
+    name = ""
+    batched = False
+
+    def __init__(self):
+        self._model = None
+        self._lock = threading.Lock()
+        self.load_seconds = None
+        self.first_call_seconds = None
+
+    @property
+    @abstractmethod
+    def version(self) -> str:
+        ...
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    @abstractmethod
+    def _load(self):
+        ...
+
+    @abstractmethod
+    def _score(self, model, text: str) -> float:
+        ...
+
+    def _score_batch(self, model, texts: list[str]) -> list[float]:
+        return [self._score(model, text) for text in texts]
+
+    def load(self):
+        """טוען את המנוע אם עוד לא נטען (פעם אחת לתהליך, בטוח לכמה threads). זורק את החריגה אם הטעינה נכשלה."""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    start = time.perf_counter()
+                    model = self._load()
+                    self.load_seconds = time.perf_counter() - start
+                    self._model = model
+                    logger.info(f"Loaded sentiment backend '{self.name}' ({self.version}) in {self.load_seconds:.3f}s.")
+        return self._model
+
+    def compound(self, text: str) -> float:
+        return self.compound_scores([text])[0]
+
+    def compound_scores(self, texts: list[str]) -> list[float]:
+        model = self.load()
+        if self.first_call_seconds is not None:
+            return self._score_batch(model, texts)
+        start = time.perf_counter()
+        scores = self._score_batch(model, texts)
+        self.first_call_seconds = time.perf_counter() - start
+        return scores
+
+class VaderSentimentBackend(SentimentBackend):
+    name = "vader"
+
+    @property
+    def version(self) -> str:
+        return f"vaderSentiment-{_package_version('vaderSentiment')}"
+
+    def _load(self):
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+        return SentimentIntensityAnalyzer()
+
+    def _score(self, model, text: str) -> float:
+        return model.polarity_scores(text)["compound"]
+
+class VectorizedVaderBackend(SentimentBackend):
+    name = "vectorized"
+    batched = True
+
+    @property
+    def version(self) -> str:
+        return f"{get_backend('vader').version}-vectorized"
+
+    def _load(self):
+        from vader_engine import VectorizedVader
+        return VectorizedVader(get_backend("vader").load())
+
+    def _score(self, model, text: str) -> float:
+        return float(model.compound_scores([text])[0])
+
+    def _score_batch(self, model, texts: list[str]) -> list[float]:
+        return model.compound_scores(texts).tolist()
+
+class NltkVaderBackend(SentimentBackend):
+    """
+    VADER של NLTK. הלקסיקון מחופש קודם ב-nltk_data המקומי (כולל SENTIMENT_LEXICON_CACHE_DIR); אם אינו שם – מורד פעם אחת
+    ל-SENTIMENT_LEXICON_CACHE_DIR (אם SENTIMENT_LEXICON_DOWNLOAD_ENABLED), ובלי רשת – נטען קובץ הלקסיקון של vaderSentiment.
+    """
+    name = "nltk_vader"
+    _NLTK_LEXICON_RESOURCE = "sentiment/vader_lexicon.zip"
+    _NLTK_LEXICON_FILE = "sentiment/vader_lexicon.zip/vader_lexicon/vader_lexicon.txt"
+    _BUNDLED_LEXICON_FILE = "vaderSentiment/vader_lexicon.txt"
+
+    @property
+    def version(self) -> str:
+        return f"nltk-{_package_version('nltk')}-vader"
+
+    def _find_nltk_lexicon(self, nltk) -> bool:
+        try:
+            nltk.data.find(self._NLTK_LEXICON_RESOURCE)
+            return True
+        except LookupError:
+            return False
+
+    def _lexicon_file(self) -> str:
+        import nltk
+        if SENTIMENT_LEXICON_CACHE_DIR not in nltk.data.path:
+            nltk.data.path.insert(0, SENTIMENT_LEXICON_CACHE_DIR)
+        if self._find_nltk_lexicon(nltk):
+            return self._NLTK_LEXICON_FILE
+
+        if SENTIMENT_LEXICON_DOWNLOAD_ENABLED:
+            logger.info(f"NLTK vader_lexicon not found locally. Downloading it once to {SENTIMENT_LEXICON_CACHE_DIR}...")
+            try:
+                os.makedirs(SENTIMENT_LEXICON_CACHE_DIR, exist_ok=True)
+                # השגיאה נרשמת ללוג למטה, ולכן ההדפסה של NLTK ל-stderr מושתקת
+                nltk.download("vader_lexicon", download_dir=SENTIMENT_LEXICON_CACHE_DIR, quiet=True, raise_on_error=True, print_error_to=io.StringIO())
+            except Exception as e:
+                logger.warning(f"Could not download NLTK vader_lexicon to {SENTIMENT_LEXICON_CACHE_DIR}: {e}")
+            if self._find_nltk_lexicon(nltk):
+                return self._NLTK_LEXICON_FILE
+
+        # NLTK טוען רק משאבים מתוך nltk.data.path, ולכן מעתיקים את הלקסיקון של vaderSentiment לתיקיית ה-cache (בנתיב נפרד
+        # מזה של NLTK, כך שבהמשך עדיין ייעשה ניסיון להוריד את המקורי)
+        cached_lexicon = os.path.join(SENTIMENT_LEXICON_CACHE_DIR, *self._BUNDLED_LEXICON_FILE.split("/"))
+        if not os.path.exists(cached_lexicon):
+            import vaderSentiment.vaderSentiment as vader_module
+            bundled_lexicon = os.path.join(os.path.dirname(os.path.abspath(vader_module.__file__)), "vader_lexicon.txt")
+            os.makedirs(os.path.dirname(cached_lexicon), exist_ok=True)
+            shutil.copyfile(bundled_lexicon, cached_lexicon)
+        logger.warning(f"NLTK vader_lexicon unavailable. Using the lexicon bundled with vaderSentiment: {cached_lexicon}")
+        return self._BUNDLED_LEXICON_FILE
+
+    def _load(self):
+        from nltk.sentiment.vader import SentimentIntensityAnalyzer
+        return SentimentIntensityAnalyzer(lexicon_file=self._lexicon_file())
+
+    def _score(self, model, text: str) -> float:
+        return model.polarity_scores(text)["compound"]
+
+BACKEND_CLASSES = {
+    backend_class.name: backend_class
+    for backend_class in (VaderSentimentBackend, VectorizedVaderBackend, NltkVaderBackend)
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+def available_backends() -> list[str]:
+    return list(BACKEND_CLASSES)
+
+def get_backend(name: str) -> SentimentBackend:
+    """המופע המשותף של המנוע name (בלי לטעון אותו – הטעינה בשימוש הראשון). ValueError לשם לא מוכר."""
+    backend = _backends.get(name)
+    if backend is None:
+        if name not in BACKEND_CLASSES:
+            raise ValueError(f"Unknown sentiment backend '{name}'. Available backends: {', '.join(BACKEND_CLASSES)}")
+        with _backends_lock:
+            backend = _backends.setdefault(name, BACKEND_CLASSES[name]())
+    return backend
+
+def cold_start_report(names: list[str] | None = None, sample_text: str = "Stocks rally as earnings beat expectations!") -> dict[str, dict]:
+    """
+    טוען כל מנוע (אם עוד לא נטען) ומנקד טקסט אחד, ומחזיר name -> {"version", "load_seconds", "first_call_seconds", "error"}.
+    מנוע שכבר נטען בתהליך מדווח את הזמנים מהטעינה המקורית.
+    """
+    report = {}
+    for name in names or available_backends():
+        backend = get_backend(name)
+        error = None
+        try:
+            backend.compound(sample_text)
+        except Exception as e:
+            error = str(e)
+            logger.error(f"Sentiment backend '{name}' failed to load or score: {e}", exc_info=True)
+        report[name] = {
+            "version": backend.version, "load_seconds": backend.load_seconds,
+            "first_call_seconds": backend.first_call_seconds, "error": error,
+        }
+    return report
+
+if __name__ == "__main__":
+    # דוגמה: זמני cold start של כל המנועים בתהליך חדש
+    for backend_name, timings in cold_start_report().items():
+        if timings["error"]:
+            print(f"{backend_name:<12} FAILED: {timings['error']}")
+        else:
+            print(f"{backend_name:<12} {timings['version']:<28} load: {timings['load_seconds']:.3f}s, first call: {timings['first_call_seconds']:.3f}s")
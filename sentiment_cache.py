@@ -0,0 +1,174 @@
+# sentiment_cache.py
+# Cache לציוני ה-compound של VADER: אותן כותרות חוזרות בפידים במשך כמה ימים (וכותרת CNBC יכולה להתאים לכמה סמלים),
+# ולכן שומרים את הציון לפי hash של הטקסט המנורמל וגרסת ה-analyzer – LRU בזיכרון התהליך ו-SQLite על הדיסק בין ריצות.
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from settings import (
+    setup_logger, SENTIMENT_CACHE_ENABLED, SENTIMENT_CACHE_DB_PATH, SENTIMENT_CACHE_MEMORY_ITEMS,
+    SENTIMENT_CACHE_MAX_AGE_SECONDS, SENTIMENT_CACHE_MAX_ENTRIES
+)
+
+logger = setup_logger(__name__)
+
+_SQLITE_MAX_PARAMS = 500 # מספר המפתחות בכל שאילתת IN
+
+def normalize_text(text: str) -> str:
+    # רק איחוד רווחים – בלי lower(), כי VADER מתייחס לאותיות גדולות כהדגשה ומחזיר ציון שונה
+    return " ".join(text.split())
+
+def make_cache_key(text: str, analyzer_version: str) -> str:
+    return hashlib.sha256(f"{analyzer_version}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+class SentimentCache:
+    """
+    מיפוי key -> compound score. get_many בודק קודם את ה-LRU בזיכרון ורק את החסרים ב-SQLite;
+    put_many מכניס לזיכרון ולתור כתיבה, ו-flush כותב את התור (ואת זמני השימוש של ה-hits) בטרנזקציה אחת.
+    evict מוחק לפי גיל (זמן שימוש אחרון) ולפי מספר רשומות. בטוח לשימוש מכמה threads.
+    """
+
+    def __init__(self, db_path: str = SENTIMENT_CACHE_DB_PATH, max_memory_items: int = SENTIMENT_CACHE_MEMORY_ITEMS):
+        self.db_path = db_path
+        self.max_memory_items = max_memory_items
+        self._memory = OrderedDict()
+        self._pending_writes = {} # key -> score, עדיין לא נכתבו לדיסק
+        self._pending_touches = set() # מפתחות שנמצאו בדיסק – עדכון last_used_at ב-flush
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS sentiment_cache (key TEXT PRIMARY KEY, score REAL NOT NULL, created_at REAL NOT NULL, last_used_at REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sentiment_cache_last_used ON sentiment_cache (last_used_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _remember(self, key: str, score: float):
+        self._memory[key] = score
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: list[str]) -> dict[str, float]:
+        found = {}
+        missing = {} # dict כ-set שומר סדר
+        with self._lock:
+            for key in keys:
+                if key in found:
+                    continue
+                score = self._memory.get(key)
+                if score is None:
+                    score = self._pending_writes.get(key)
+                if score is not None:
+                    self._memory[key] = score
+                    self._memory.move_to_end(key)
+                    found[key] = score
+                    self.memory_hits += 1
+                else:
+                    missing[key] = None
+
+        disk_found = {}
+        missing = list(missing)
+        if missing:
+            try:
+                with self._connect() as conn:
+                    for start in range(0, len(missing), _SQLITE_MAX_PARAMS):
+                        chunk = missing[start:start + _SQLITE_MAX_PARAMS]
+                        rows = conn.execute(f"SELECT key, score FROM sentiment_cache WHERE key IN ({', '.join('?' for _ in chunk)})", chunk)
+                        disk_found.update(rows)
+            except sqlite3.Error as e:
+                logger.warning(f"Could not read sentiment cache {self.db_path}: {e}")
+
+        with self._lock:
+            for key, score in disk_found.items():
+                self._remember(key, score)
+                self._pending_touches.add(key)
+            self.disk_hits += len(disk_found)
+            self.misses += len(missing) - len(disk_found)
+        found.update(disk_found)
+        return found
+
+    def put_many(self, scores: dict[str, float]):
+        with self._lock:
+            for key, score in scores.items():
+                self._remember(key, score)
+                self._pending_writes[key] = score
+
+    def flush(self) -> int:
+        """כותב לדיסק את הציונים החדשים ואת זמני השימוש של ה-hits. מחזיר את מספר הרשומות החדשות שנכתבו."""
+        with self._lock:
+            pending_writes, self._pending_writes = self._pending_writes, {}
+            pending_touches, self._pending_touches = self._pending_touches, set()
+        if not pending_writes and not pending_touches:
+            return 0
+
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT INTO sentiment_cache (key, score, created_at, last_used_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET score = excluded.score, last_used_at = excluded.last_used_at",
+                    [(key, score, now, now) for key, score in pending_writes.items()]
+                )
+                conn.executemany("UPDATE sentiment_cache SET last_used_at = ? WHERE key = ?", [(now, key) for key in pending_touches])
+        except sqlite3.Error as e:
+            logger.warning(f"Could not write {len(pending_writes)} entries to sentiment cache {self.db_path}: {e}")
+            return 0
+        return len(pending_writes)
+
+    def evict(self, max_age_seconds: int = SENTIMENT_CACHE_MAX_AGE_SECONDS, max_entries: int = SENTIMENT_CACHE_MAX_ENTRIES) -> int:
+        """מוחק רשומות שלא נעשה בהן שימוש יותר מ-max_age_seconds, ואז את הישנות ביותר מעבר ל-max_entries."""
+        try:
+            with self._connect() as conn:
+                evicted = conn.execute("DELETE FROM sentiment_cache WHERE last_used_at < ?", (time.time() - max_age_seconds,)).rowcount
+                excess = conn.execute("SELECT COUNT(*) FROM sentiment_cache").fetchone()[0] - max_entries
+                if excess > 0:
+                    evicted += conn.execute(
+                        "DELETE FROM sentiment_cache WHERE key IN (SELECT key FROM sentiment_cache ORDER BY last_used_at LIMIT ?)", (excess,)
+                    ).rowcount
+        except sqlite3.Error as e:
+            logger.warning(f"Could not evict entries from sentiment cache {self.db_path}: {e}")
+            return 0
+        if evicted:
+            logger.info(f"Evicted {evicted} sentiment cache entries (max age: {max_age_seconds}s, max entries: {max_entries}).")
+        return evicted
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_items": len(self._memory),
+            }
+
+_cache = None
+_cache_unavailable = False
+_cache_lock = threading.Lock()
+
+def get_sentiment_cache() -> SentimentCache | None:
+    """ה-cache המשותף של התהליך (נוצר בשימוש הראשון), או None אם הוא כבוי או שלא ניתן לפתוח אותו."""
+    global _cache, _cache_unavailable
+    if not SENTIMENT_CACHE_ENABLED or _cache_unavailable:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None and not _cache_unavailable:
+                try:
+                    _cache = SentimentCache()
+                except (OSError, sqlite3.Error) as e:
+                    logger.warning(f"Sentiment cache unavailable ({SENTIMENT_CACHE_DB_PATH}): {e}. Scoring without cache.")
+                    _cache_unavailable = True
+                    return None
+                atexit.register(_cache.flush) # גם סקריפטים שלא קוראים ל-flush בעצמם שומרים את הציונים החדשים
+    return _cache
@@ -1,29 +1,164 @@
 # settings.py – הגדרות מרכזיות לפרויקט Sentibot
 
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
 import os
+import threading
+import time
 
 # --- הגדרות Logger ---
-def setup_logger(name='sentibot', level=logging.INFO):
+# LOG_ASYNC_ENABLED: הרשומות נכנסות לתור, ו-thread רקע אחד מפרמט וכותב אותן ל-stdout (הקוד החם לא ממתין לכתיבה)
+LOG_ASYNC_ENABLED = os.getenv("LOG_ASYNC_ENABLED", "true").lower() == "true"
+
+def _parse_per_module_setting(env_name: str) -> dict[str, float]:
+    # פורמט: "yahoo_scraper:0.1,cnbc_scraper:0.5"
+    values = {}
+    for item in os.getenv(env_name, "").split(","):
+        module_name, _, value = item.partition(":")
+        try:
+            values[module_name.strip()] = float(value)
+        except ValueError:
+            continue
+    return values
+
+# דגימה (חלק ההודעות שנכתבות, 0-1) ותקרה להודעות לדקה – לכל מודול, רק להודעות DEBUG/INFO (כל תבנית הודעה נספרת בנפרד)
+LOG_SAMPLE_RATES = _parse_per_module_setting("LOG_SAMPLE_RATES")
+LOG_MAX_PER_MINUTE = _parse_per_module_setting("LOG_MAX_PER_MINUTE")
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(module)s.%(funcName)s:%(lineno)d] - %(message)s'
+
+class SamplingFilter(logging.Filter):
+    """
+    מסנן להודעות per-item: מכל תבנית הודעה (record.msg – ולכן חשוב להשתמש ב-%-style ולא ב-f-string) עוברת
+    הראשונה ואחריה כל הודעה 1/sample_rate, ולכל היותר max_per_minute הודעות בדקה. WARNING ומעלה תמיד עוברות.
+    הודעה שעוברת אחרי הודעות שסוננו מציינת כמה הודעות דומות דולגו.
+    """
+
+    def __init__(self, sample_rate: float = 1.0, max_per_minute: float | None = None, exempt_level: int = logging.WARNING):
+        super().__init__()
+        self.sample_every = max(1, round(1 / sample_rate)) if 0 < sample_rate < 1 else 1
+        self.max_per_minute = max_per_minute
+        self.exempt_level = exempt_level
+        self._counters = {} # תבנית -> [כמה נראו, כמה דולגו מאז האחרונה שעברה, תחילת חלון הדקה, כמה עברו בחלון]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.exempt_level:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            counter = self._counters.get(record.msg)
+            if counter is None:
+                counter = self._counters[record.msg] = [0, 0, now, 0]
+            counter[0] += 1
+            passes = (counter[0] - 1) % self.sample_every == 0
+            if passes and self.max_per_minute is not None:
+                if now - counter[2] >= 60:
+                    counter[2], counter[3] = now, 0
+                passes = counter[3] < self.max_per_minute
+            if not passes:
+                counter[1] += 1
+                return False
+            counter[3] += 1
+            suppressed, counter[1] = counter[1], 0
+        if suppressed:
+            record.msg = f"{record.msg} [{suppressed} similar messages suppressed]"
+        return True
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    # ה-QueueHandler הרגיל מפרמט את ההודעה כבר ב-thread שקורא ל-logger; כאן הרשומה עוברת כמו שהיא
+    # והפירמוט (כולל הצבת ה-args של %-style ו-traceback) נעשה ב-thread הכותב
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+_log_handler = None
+_log_listener = None
+_log_handler_lock = threading.Lock()
+
+def _build_stream_handler() -> logging.Handler:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    return handler
+
+def _start_log_listener():
+    global _log_listener
+    log_queue = queue.SimpleQueue()
+    _log_handler.queue = log_queue
+    _log_listener = logging.handlers.QueueListener(log_queue, _build_stream_handler(), respect_handler_level=False)
+    _log_listener.start()
+
+class _SynchronousLogQueue:
+    # "תור" שכותב מיד – לתהליכים שנוצרו ב-fork: הם לא יורשים את ה-thread הכותב, ותהליכי pool יוצאים בלי atexit
+    def __init__(self, handler: logging.Handler):
+        self.handler = handler
+
+    def put_nowait(self, record: logging.LogRecord):
+        self.handler.handle(record)
+
+def _use_synchronous_logging():
+    global _log_listener
+    _log_listener = None
+    _log_handler.queue = _SynchronousLogQueue(_build_stream_handler())
+
+def _stop_log_listener():
+    # נקרא ב-atexit: הכותב מרוקן את התור לפני סיום התהליך
+    if _log_listener is not None:
+        _log_listener.stop()
+
+def _get_log_handler() -> logging.Handler:
+    """ה-handler המשותף לכל הלוגרים: QueueHandler עם כותב ברקע (LOG_ASYNC_ENABLED), או StreamHandler סינכרוני."""
+    global _log_handler
+    if _log_handler is None:
+        with _log_handler_lock:
+            if _log_handler is None:
+                if LOG_ASYNC_ENABLED:
+                    _log_handler = _DeferredQueueHandler(None)
+                    _start_log_listener()
+                    atexit.register(_stop_log_listener)
+                    os.register_at_fork(after_in_child=_use_synchronous_logging) # למשל ה-pool של create_backtest_dataset
+                else:
+                    _log_handler = _build_stream_handler()
+    return _log_handler
+
+def setup_logger(name='sentibot', level=logging.INFO, sample_rate: float | None = None, max_per_minute: float | None = None):
+    """
+    לוגר עם ה-handler המשותף. sample_rate / max_per_minute (או LOG_SAMPLE_RATES / LOG_MAX_PER_MINUTE לפי שם הלוגר)
+    מוסיפים SamplingFilter להודעות DEBUG/INFO של הלוגר הזה.
+    בלולאות חמות השתמשו ב-%-style (logger.debug("... %s", value)), כך שההודעה לא נבנית כשהרמה מסננת אותה.
+    """
     logger = logging.getLogger(name)
     if logger.hasHandlers(): # מנקה handlers קיימים כדי למנוע כפילות בהודעות אם הפונקציה נקראת מספר פעמים
         logger.handlers.clear()
     logger.setLevel(level)
-    handler = logging.StreamHandler(sys.stdout) 
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - [%(module)s.%(funcName)s:%(lineno)d] - %(message)s')
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    logger.addHandler(_get_log_handler())
+
+    for existing_filter in [f for f in logger.filters if isinstance(f, SamplingFilter)]:
+        logger.removeFilter(existing_filter)
+    sample_rate = sample_rate if sample_rate is not None else LOG_SAMPLE_RATES.get(name, 1.0)
+    max_per_minute = max_per_minute if max_per_minute is not None else LOG_MAX_PER_MINUTE.get(name)
+    if sample_rate < 1 or max_per_minute is not None:
+        logger.addFilter(SamplingFilter(sample_rate, max_per_minute))
     return logger
 
 # --- הגדרות מקורות חדשות (NEWS_SOURCES_CONFIG) ---
+# בקשה אחת של Yahoo לכמה סמלים (s=AAPL,TSLA,...) חוסכת בקשות אבל משנה את הכיסוי: הפיד מוגבל במספר הפריטים ומתחלק בין
+# כל הסמלים, ופריט שלא ניתן לשייך לסמל (בלי tag ובלי מילת מפתח בכותרת/בתקציר) נזרק. ברירת המחדל 1 – פיד לכל סמל, כמו קודם
+try:
+    YAHOO_SYMBOLS_PER_REQUEST = max(1, int(os.getenv("YAHOO_SYMBOLS_PER_REQUEST", "1")))
+except ValueError:
+    YAHOO_SYMBOLS_PER_REQUEST = 1
+
 NEWS_SOURCES_CONFIG = {
     "Yahoo Finance": {
         "enabled": True, 
         "scraper_function_name": "get_yahoo_news", 
         # השינוי כאן: הסרת ®ion=US מה-URL
         "rss_url_template": "https://feeds.finance.yahoo.com/rss/2.0/headline?s={symbol}&lang=en-US", 
-        "weight": 1.0 
+        "weight": 1.0,
+        "symbols_per_request": YAHOO_SYMBOLS_PER_REQUEST # 1 = בקשה לכל סמל; יותר – בקשה מקובצת (opt-in, ראו למעלה)
     },
     "CNBC": {
         "enabled": True,
@@ -61,6 +196,25 @@ DEFAULT_MAX_HEADLINES_PER_SOURCE = 10
 MIN_HEADLINE_LENGTH = 10 
 MAIN_MAX_TOTAL_HEADLINES = 50 
 
+# --- הגדרות Yahoo Finance (yahoo_scraper.py) ---
+try:
+    YAHOO_REQUEST_TIMEOUT_SECONDS = float(os.getenv("YAHOO_REQUEST_TIMEOUT_SECONDS", "20")) # timeout לבקשה בודדת (לא גלובלי ל-socket)
+    # שיעור הבקשות (0 עד 1) שעבורן נרשמת ללוג ברמת DEBUG דגימה של התוכן הגולמי של הפיד. 0 = כבוי
+    YAHOO_RAW_SAMPLE_RATE = min(1.0, max(0.0, float(os.getenv("YAHOO_RAW_SAMPLE_RATE", "0"))))
+except ValueError:
+    YAHOO_REQUEST_TIMEOUT_SECONDS = 20.0
+    YAHOO_RAW_SAMPLE_RATE = 0.0
+
+# --- הגדרות שכבת האיסוף האסינכרונית (news_aggregator.fetch_all_news_for_symbols) ---
+try:
+    NEWS_FETCH_MAX_CONCURRENCY = max(1, int(os.getenv("NEWS_FETCH_MAX_CONCURRENCY", "32"))) # סה"כ בקשות במקביל
+    NEWS_FETCH_MAX_PER_HOST = max(1, int(os.getenv("NEWS_FETCH_MAX_PER_HOST", "8"))) # בקשות במקביל לאותו שרת
+    NEWS_FETCH_TIMEOUT_SECONDS = float(os.getenv("NEWS_FETCH_TIMEOUT_SECONDS", "30")) # timeout לכל בקשה (symbol, source)
+except ValueError:
+    NEWS_FETCH_MAX_CONCURRENCY = 32
+    NEWS_FETCH_MAX_PER_HOST = 8
+    NEWS_FETCH_TIMEOUT_SECONDS = 30.0
+
 # --- ספי החלטה (עבור recommender.py) ---
 RECOMMENDER_THRESHOLD_BUY = 0.70
 RECOMMENDER_THRESHOLD_SELL = 0.40 
@@ -80,6 +234,46 @@ except ValueError:
     settings_init_logger.warning("Could not parse Reddit limit/comments parameters from environment variables. Using defaults: Limit=10, Comments=2.")
     REDDIT_LIMIT_PER_SUBREDDIT = 10
     REDDIT_COMMENTS_PER_POST = 2
+# חיפוש אחד לכל subreddit וקבוצת סמלים ('"AAPL" OR "MSFT" ...') במקום חיפוש לכל סמל; השאילתה ב-Reddit מוגבלת ל-512 תווים
+REDDIT_BATCHED_SEARCH_ENABLED = os.getenv("REDDIT_BATCHED_SEARCH_ENABLED", "true").lower() == "true"
+try:
+    REDDIT_SEARCH_SYMBOLS_PER_QUERY = max(1, int(os.getenv("REDDIT_SEARCH_SYMBOLS_PER_QUERY", "10")))
+except ValueError:
+    REDDIT_SEARCH_SYMBOLS_PER_QUERY = 10
+# ההתאמה המקומית של סמלים בפוסטים היא לפי אותיות גדולות (AAPL, $aapl); סמלים שהם גם מילה נפוצה (או אות אחת) נספרים רק
+# עם $ לפניהם, אחרת כל "ALL IN" או "IT" בכותרת היה משויך אליהם
+REDDIT_CASHTAG_ONLY_TICKERS = {
+    ticker.strip().upper() for ticker in os.getenv(
+        "REDDIT_CASHTAG_ONLY_TICKERS",
+        "ALL,ANY,ARE,BE,BIG,CAN,CAR,DD,EAT,FOR,FUN,GO,GOOD,HAS,HE,IT,LOVE,NEW,NOW,ON,ONE,OPEN,OUT,PLAY,REAL,RUN,SEE,SO,TWO,U,WELL,YOU"
+    ).split(",") if ticker.strip()
+}
+# כמה תוצאות לכל היותר עוברים בכל חיפוש משותף: סמלים בקבוצה x פוסטים לסמל x המקדם (מקום לסמל "חם" שממלא את התוצאות המובילות)
+try:
+    REDDIT_SEARCH_RESULTS_FACTOR = max(1, int(os.getenv("REDDIT_SEARCH_RESULTS_FACTOR", "2")))
+except ValueError:
+    REDDIT_SEARCH_RESULTS_FACTOR = 2
+# שליפת התגובות המובילות של הפוסטים במקביל (pool אחד לתהליך, עם client נפרד לכל thread); מוגבל כדי לא לחרוג מקצב הבקשות של Reddit
+try:
+    REDDIT_COMMENT_FETCH_WORKERS = max(1, int(os.getenv("REDDIT_COMMENT_FETCH_WORKERS", "4")))
+except ValueError:
+    REDDIT_COMMENT_FETCH_WORKERS = 4
+# חיפוש מצטבר: כל ריצה מחפשת רק פוסטים חדשים מסימן המים של כל (subreddit, symbol) ומשלבת אותם בחלון שמור של השבוע האחרון
+REDDIT_INCREMENTAL_SEARCH_ENABLED = os.getenv("REDDIT_INCREMENTAL_SEARCH_ENABLED", "true").lower() == "true"
+try:
+    REDDIT_SEARCH_WINDOW_HOURS = float(os.getenv("REDDIT_SEARCH_WINDOW_HOURS", str(7 * 24))) # ה-time_filter של החיפוש נגזר מהחלון (day/week/month/year/all)
+except ValueError:
+    REDDIT_SEARCH_WINDOW_HOURS = 7 * 24.0
+# מצב listing-scan: ב-subreddits האלה (עמוסים, כמו wallstreetbets) עוברים פעם אחת על "new" מאז הריצה הקודמת
+# ומתאימים סמלים מקומית במקום לחפש; שאר ה-subreddits ממשיכים בחיפוש
+REDDIT_LISTING_SCAN_SUBREDDITS = [sub.strip() for sub in os.getenv("REDDIT_LISTING_SCAN_SUBREDDITS", "").split(',') if sub.strip()]
+REDDIT_SEARCH_SUBREDDITS = [sub for sub in REDDIT_SUBREDDITS if sub not in REDDIT_LISTING_SCAN_SUBREDDITS]
+try:
+    REDDIT_LISTING_SCAN_MAX_POSTS = int(os.getenv("REDDIT_LISTING_SCAN_MAX_POSTS", "1000")) # Reddit לא מחזיר יותר מ-~1000 פוסטים ב-listing
+    REDDIT_LISTING_INITIAL_LOOKBACK_HOURS = float(os.getenv("REDDIT_LISTING_INITIAL_LOOKBACK_HOURS", "24")) # בסריקה הראשונה (אין סימן מים)
+except ValueError:
+    REDDIT_LISTING_SCAN_MAX_POSTS = 1000
+    REDDIT_LISTING_INITIAL_LOOKBACK_HOURS = 24.0
 
 # --- הגדרות Alpaca ---
 ALPACA_BASE_URL = "https://paper-api.alpaca.markets" 
@@ -95,6 +289,119 @@ REPORTS_BASE_DIR = "sentibot_reports"
 
 REPORTS_OUTPUT_DIR = REPORTS_BASE_DIR 
 LEARNING_LOG_CSV_PATH = os.path.join(REPORTS_OUTPUT_DIR, "learning_log_cumulative.csv")
+# הלוג המצטבר נשמר גם ב-SQLite עם טיפוסים מפורשים ואינדקס על (symbol, datetime); ה-CSV נשאר כקובץ מצורף למייל
+LEARNING_LOG_DB_PATH = os.getenv("LEARNING_LOG_DB_PATH", os.path.join(REPORTS_OUTPUT_DIR, "learning_log.sqlite3"))
+
+# --- שכבת HTTP משותפת (http_client.py): Session אחד עם keep-alive, pool לכל שרת ו-retry עם backoff ---
+HTTP_USER_AGENT = os.getenv("HTTP_USER_AGENT", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
+HTTP_POOL_MAXSIZE_DEFAULT = 10 # חיבורים פתוחים לכל שרת שלא מוגדר בנפרד
+HTTP_POOL_MAXSIZE_BY_HOST = { # שרתים שאליהם יוצאות הרבה בקשות במקביל מקבלים pool גדול יותר
+    "feeds.finance.yahoo.com": 16,
+    "research.investors.com": 8,
+    "www.marketwatch.com": 4,
+    "drive.google.com": 2,
+}
+HTTP_MAX_RETRIES = 3 # ניסיונות חוזרים לשגיאות חיבור ולתשובות 5xx (על 429 – rate_limiter)
+HTTP_RETRY_BACKOFF_FACTOR = 0.5 # המתנה של 0.5, 1, 2... שניות בין ניסיונות
+
+# --- מגביל קצב מרכזי (rate_limiter.py): token bucket לכל שירות חיצוני, משותף לכל ה-threads וה-sessions של התהליך ---
+# "בקשות לשנייה/burst"; כשהשירות מחזיר headers של מכסה (X-Ratelimit-Remaining/Reset) הקצב מתעדכן לפיהם.
+# שינוי דרך env בפורמט "reddit:1.5/5,yahoo:5/10"; שירות שאינו כאן (או שהקצב שלו 0) לא מוגבל
+def _parse_rate_limits(env_name: str, defaults: dict[str, tuple[float, float]]) -> dict[str, tuple[float, float]]:
+    rate_limits = dict(defaults)
+    for item in os.getenv(env_name, "").split(","):
+        service, _, value = item.partition(":")
+        rate, _, burst = value.partition("/")
+        try:
+            rate_limits[service.strip()] = (float(rate), float(burst or 1))
+        except ValueError:
+            continue
+    return {service: limits for service, limits in rate_limits.items() if limits[0] > 0}
+
+RATE_LIMITS = _parse_rate_limits("RATE_LIMITS", {
+    "reddit": (1.5, 5), # OAuth: 100 בקשות לדקה
+    "yahoo": (5.0, 10),
+    "cnbc": (2.0, 4),
+    "investors": (1.0, 2),
+    "marketwatch": (1.0, 2),
+    "alpaca": (3.0, 10), # 200 בקשות לדקה
+    "drive": (2.0, 4),
+})
+RATE_LIMIT_SERVICE_BY_HOST_SUFFIX = { # שרת (או סיומת של שרת) -> השירות שה-bucket שלו משמש לבקשות אליו
+    "reddit.com": "reddit",
+    "yahoo.com": "yahoo",
+    "cnbc.com": "cnbc",
+    "investors.com": "investors",
+    "marketwatch.com": "marketwatch",
+    "alpaca.markets": "alpaca",
+    "drive.google.com": "drive",
+    "drive.usercontent.google.com": "drive",
+    "googleusercontent.com": "drive",
+}
+try:
+    RATE_LIMIT_MAX_429_RETRIES = int(os.getenv("RATE_LIMIT_MAX_429_RETRIES", "4"))
+    RATE_LIMIT_429_BACKOFF_SECONDS = float(os.getenv("RATE_LIMIT_429_BACKOFF_SECONDS", "2")) # בלי Retry-After: 2, 4, 8... שניות
+except ValueError:
+    RATE_LIMIT_MAX_429_RETRIES = 4
+    RATE_LIMIT_429_BACKOFF_SECONDS = 2.0
+
+# --- Cache של פידי RSS בין ריצות (http_cache.py) – Conditional GET עם ETag/Last-Modified ---
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", os.path.join(REPORTS_BASE_DIR, "http_cache"))
+try:
+    HTTP_CACHE_TTL_SECONDS = int(os.getenv("HTTP_CACHE_TTL_SECONDS", str(3 * 24 * 3600))) # רשומה שלא אומתה מול השרת זמן זה – נמחקת
+    HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(50 * 1024 * 1024))) # מעבר לגודל זה נמחקות הרשומות הישנות ביותר
+except ValueError:
+    HTTP_CACHE_TTL_SECONDS = 3 * 24 * 3600
+    HTTP_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+# --- מנוע הניקוד (sentiment_backends.py): "vader" – המימוש המקורי טקסט-אחר-טקסט, "vectorized" – vader_engine.py (באצ'ים עם NumPy, אותו ציון),
+# "nltk_vader" – VADER של NLTK ---
+SENTIMENT_ENGINE = os.getenv("SENTIMENT_ENGINE", "vader").lower()
+# הלקסיקון של NLTK נטען מ-nltk_data המקומי או מהתיקייה הזו; הורדה (פעם אחת, לתיקייה הזו) רק בשימוש הראשון ורק אם אינו קיים מקומית
+SENTIMENT_LEXICON_CACHE_DIR = os.getenv("SENTIMENT_LEXICON_CACHE_DIR", os.path.join(REPORTS_BASE_DIR, "nltk_data"))
+SENTIMENT_LEXICON_DOWNLOAD_ENABLED = os.getenv("SENTIMENT_LEXICON_DOWNLOAD_ENABLED", "true").lower() == "true"
+
+# --- Cache של ציוני VADER בין ריצות (sentiment_cache.py): LRU בזיכרון + SQLite על הדיסק ---
+SENTIMENT_CACHE_ENABLED = os.getenv("SENTIMENT_CACHE_ENABLED", "true").lower() == "true"
+SENTIMENT_CACHE_DB_PATH = os.getenv("SENTIMENT_CACHE_DB_PATH", os.path.join(REPORTS_BASE_DIR, "sentiment_cache.sqlite3"))
+try:
+    SENTIMENT_CACHE_MEMORY_ITEMS = int(os.getenv("SENTIMENT_CACHE_MEMORY_ITEMS", "50000")) # גודל ה-LRU בזיכרון התהליך
+    SENTIMENT_CACHE_MAX_AGE_SECONDS = int(os.getenv("SENTIMENT_CACHE_MAX_AGE_SECONDS", str(30 * 24 * 3600))) # רשומה שלא נעשה בה שימוש זמן זה – נמחקת
+    SENTIMENT_CACHE_MAX_ENTRIES = int(os.getenv("SENTIMENT_CACHE_MAX_ENTRIES", "500000")) # מעבר לכך נמחקות הרשומות שהשימוש האחרון בהן הכי ישן
+except ValueError:
+    SENTIMENT_CACHE_MEMORY_ITEMS = 50000
+    SENTIMENT_CACHE_MAX_AGE_SECONDS = 30 * 24 * 3600
+    SENTIMENT_CACHE_MAX_ENTRIES = 500000
+
+# --- צובר סנטימנט דועך לכל סמל בין ריצות (sentibot_weighted_sentiment.DecayedSentimentState) ---
+DECAYED_SENTIMENT_STATE_PATH = os.getenv("DECAYED_SENTIMENT_STATE_PATH", os.path.join(REPORTS_BASE_DIR, "decayed_sentiment_state.json"))
+try:
+    DECAYED_SENTIMENT_LAMBDA = float(os.getenv("DECAYED_SENTIMENT_LAMBDA", "0.1")) # קצב דעיכה לשעה
+    DECAYED_SENTIMENT_DEDUP_HOURS = float(os.getenv("DECAYED_SENTIMENT_DEDUP_HOURS", "72")) # אותה כותרת בחלון זה נספרת פעם אחת
+except ValueError:
+    DECAYED_SENTIMENT_LAMBDA = 0.1
+    DECAYED_SENTIMENT_DEDUP_HOURS = 72.0
+
+# --- מצב מתמשך של איסוף Reddit: סימני המים של סריקת ה-listing לכל subreddit (reddit_scraper.scan_new_posts_for_symbols),
+# וסימני המים לכל (subreddit, symbol) + חלון הפוסטים השמור של החיפוש המצטבר (reddit_scraper.get_new_reddit_posts_for_symbols) ---
+REDDIT_LISTING_STATE_PATH = os.getenv("REDDIT_LISTING_STATE_PATH", os.path.join(REPORTS_BASE_DIR, "reddit_listing_state.json"))
+REDDIT_SEARCH_WINDOW_STATE_PATH = os.getenv("REDDIT_SEARCH_WINDOW_STATE_PATH", os.path.join(REPORTS_BASE_DIR, "reddit_search_window.json"))
+
+# --- עיבוד נתוני Reddit היסטוריים (process_reddit_data.py): קריאה ב-chunks וניקוד כל פוסט פעם אחת ---
+REDDIT_DAILY_KEEP_COMBINED_TEXT = os.getenv("REDDIT_DAILY_KEEP_COMBINED_TEXT", "false").lower() == "true" # שמירת עמודת הטקסט המאוחד היומי (גדולה)
+try:
+    REDDIT_RAW_CSV_CHUNK_ROWS = max(1, int(os.getenv("REDDIT_RAW_CSV_CHUNK_ROWS", "50000")))
+except ValueError:
+    REDDIT_RAW_CSV_CHUNK_ROWS = 50000
+
+# --- ניקוד סנטימנט מקבילי ב-create_backtest_dataset.py (pool של תהליכים, fork) ---
+# BACKTEST_SENTIMENT_WORKERS: 1 = ריצה סדרתית, 0 = מספר הליבות במכונה
+try:
+    BACKTEST_SENTIMENT_WORKERS = int(os.getenv("BACKTEST_SENTIMENT_WORKERS", "0"))
+    BACKTEST_SENTIMENT_CHUNK_SIZE = max(1, int(os.getenv("BACKTEST_SENTIMENT_CHUNK_SIZE", "200"))) # מספר השורות בכל משימה של worker
+except ValueError:
+    BACKTEST_SENTIMENT_WORKERS = 0
+    BACKTEST_SENTIMENT_CHUNK_SIZE = 200
 
 # --- רשימת סימולי המניות למעקב (מיובאת מ-smart_universe.py ב-main.py) ---
 # המשתנה SYMBOLS עצמו מיובא מקובץ smart_universe.py בתוך main.py
@@ -19,3 +19,35 @@ SYMBOL_TO_NAME = {
     "META": "Meta",
     "SNAP": "Snap"
 }
+
+# מילות מפתח לזיהוי אזכור של כל סמל בכותרות (CNBC, ושיוך פריטים בפידים מרובי-סמלים של Yahoo)
+KEYWORDS_BY_SYMBOL = {
+    "TSLA": ["Tesla", "Elon Musk", "TSLA"],
+    "NVDA": ["Nvidia", "Jensen Huang", "NVDA", "GPU"],
+    "AAPL": ["Apple", "AAPL", "iPhone", "MacBook", "iPad", "Tim Cook"],
+    "MSFT": ["Microsoft", "MSFT", "Azure", "Windows", "Satya Nadella", "OpenAI"],
+    "META": ["Meta", "Facebook", "META", "Instagram", "WhatsApp", "Zuckerberg"],
+    "AMZN": ["Amazon", "AMZN", "AWS", "Bezos", "Prime"],
+    "GOOGL": ["Google", "Alphabet", "GOOGL", "GOOG", "Android", "Search", "Sundar Pichai", "Waymo"],
+    "GOOG": ["Google", "Alphabet", "GOOG", "Android", "Search", "Sundar Pichai", "Waymo"],
+    "PFE": ["Pfizer", "PFE", "BioNTech"],
+    "XOM": ["Exxon", "ExxonMobil", "XOM", "oil", "gas"],
+    "JPM": ["JPMorgan", "JPM", "Jamie Dimon", "Chase"],
+    "DIS": ["Disney", "DIS", "Disney+", "ESPN", "parks"],
+    "WMT": ["Walmart", "WMT", "retail"],
+    "GME": ["GameStop", "GME", "Gamestop"],
+    "AMC": ["AMC", "AMC Entertainment"],
+    "PLTR": ["Palantir", "PLTR"],
+    "COIN": ["Coinbase", "COIN", "crypto"],
+    "MSTR": ["MicroStrategy", "MSTR", "Saylor", "Bitcoin"],
+    "BYND": ["Beyond Meat", "BYND"],
+    "RIVN": ["Rivian", "RIVN"],
+    "AFRM": ["Affirm", "AFRM"],
+    "SOFI": ["SoFi", "SOFI"],
+    "BB": ["BlackBerry", "BB"],
+    "BBBYQ": ["Bed Bath", "BBBYQ"],
+    "NIO": ["NIO Inc", "NIO"],
+    "LCID": ["Lucid", "Lucid Motors", "LCID"],
+    "NKLA": ["Nikola", "NKLA"],
+    "SNAP": ["Snap", "Snapchat", "SNAP"],
+}
@@ -0,0 +1,142 @@
+# בדיקות להתאמה המקומית של סמלים בפוסטים של Reddit ולסריקת ה-listing מול סימן המים
+import time
+
+import pytest
+
+import reddit_scraper
+from json_state import load_json_state, save_json_state
+from reddit_scraper import get_new_reddit_posts_for_symbols, match_symbols_in_text, scan_new_posts_for_symbols
+
+SYMBOLS = ["AAPL", "TSLA", "ALL", "IT", "F", "BRK.B"]
+
+@pytest.mark.parametrize("text, expected", [
+    ("AAPL beat earnings", {"AAPL"}),
+    ("$tsla and $AAPL to the moon", {"TSLA", "AAPL"}),
+    ("TSLA's delivery numbers", {"TSLA"}),
+    ("BRK.B hits a new high", {"BRK.B"}),
+    ("aapl is still cheap", set()), # בלי $ – רק באותיות גדולות
+    ("AAPLX and XAAPL are different tickers", set()),
+])
+def test_matches_uppercase_tickers_and_cashtags(text, expected):
+    assert match_symbols_in_text(text, SYMBOLS) == expected
+
+@pytest.mark.parametrize("text, expected", [
+    ("it is all over now, I am going ALL IN on TSLA", {"TSLA"}),
+    ("IT stocks are up. F this market", set()),
+    ("Loading up on $ALL and $it, also $F", {"ALL", "IT", "F"}),
+])
+def test_common_word_tickers_need_a_cashtag(text, expected):
+    assert match_symbols_in_text(text, SYMBOLS) == expected
+
+class FakeSubmission:
+    def __init__(self, post_id: str, created_utc: float, title: str):
+        self.id = post_id
+        self.fullname = f"t3_{post_id}"
+        self.created_utc = created_utc
+        self.title = title
+        self.selftext = ""
+        self.stickied = False
+        self.over_18 = False
+        self.score = 1
+        self.num_comments = 0
+
+class FakeSubreddit:
+    def __init__(self, submissions: list[FakeSubmission]):
+        self.submissions = sorted(submissions, key=lambda submission: submission.created_utc, reverse=True)
+
+        self.search_time_filters = []
+
+    def new(self, limit: int | None = None):
+        return iter(self.submissions[:limit])
+
+    def search(self, query: str, sort: str, time_filter: str, limit: int | None = None):
+        self.search_time_filters.append(time_filter)
+        return iter(self.submissions[:limit])
+
+class FakeReddit:
+    def __init__(self, subreddits: dict[str, FakeSubreddit]):
+        self.subreddits = subreddits
+
+    def subreddit(self, name: str) -> FakeSubreddit:
+        return self.subreddits[name]
+
+def _scan(monkeypatch, tmp_path, submissions: list[FakeSubmission], high_water_mark: dict | None) -> tuple[dict, dict]:
+    state_path = str(tmp_path / "listing_state.json")
+    if high_water_mark is not None:
+        save_json_state(state_path, {"stocks": high_water_mark})
+    monkeypatch.setattr(reddit_scraper, "get_reddit_client", lambda: FakeReddit({"stocks": FakeSubreddit(submissions)}))
+    monkeypatch.setattr(reddit_scraper, "fetch_top_comments", lambda refs, comments_limit: {})
+    collected = scan_new_posts_for_symbols(["AAPL"], ["stocks"], limit_per_sub=10, comments_limit=0,
+                                           state_path=state_path, initial_lookback_hours=24)
+    return collected, load_json_state(state_path)
+
+def test_listing_scan_with_old_mark_covers_the_whole_gap(monkeypatch, tmp_path):
+    now = time.time()
+    submissions = [
+        FakeSubmission("recent", now - 3600, "AAPL recent post about earnings"),
+        FakeSubmission("gap", now - 3 * 86400, "AAPL post from the missed days"),
+        FakeSubmission("marked", now - 5 * 86400, "AAPL post already scanned last time"),
+        FakeSubmission("older", now - 6 * 86400, "AAPL older post already scanned"),
+    ]
+    # הריצה הקודמת הייתה לפני 5 ימים – יותר מה-lookback של 24 שעות
+    mark = {"created_utc": now - 5 * 86400, "fullnames": ["t3_marked"]}
+    collected, state = _scan(monkeypatch, tmp_path, submissions, mark)
+    assert [text for text, _ in collected["AAPL"]] == ["AAPL recent post about earnings", "AAPL post from the missed days"]
+    assert state["stocks"] == {"created_utc": now - 3600, "fullnames": ["t3_recent"]}
+
+def test_first_listing_scan_uses_the_lookback(monkeypatch, tmp_path):
+    now = time.time()
+    submissions = [
+        FakeSubmission("recent", now - 3600, "AAPL recent post about earnings"),
+        FakeSubmission("old", now - 3 * 86400, "AAPL post from before the lookback"),
+    ]
+    collected, state = _scan(monkeypatch, tmp_path, submissions, None)
+    assert [text for text, _ in collected["AAPL"]] == ["AAPL recent post about earnings"]
+    assert state["stocks"]["fullnames"] == ["t3_recent"]
+
+def test_listing_scan_reports_a_gap_when_the_mark_is_not_reached():
+    now = time.time()
+    subreddit = FakeSubreddit([FakeSubmission(f"p{i}", now - i * 60, f"AAPL post number {i}") for i in range(5)])
+    mark = {"created_utc": now - 86400, "fullnames": ["t3_gone"]}
+    scan = reddit_scraper.SubredditListingScan(subreddit, ["AAPL"], high_water_mark=mark, max_posts=3, oldest_created_utc=now - 3600)
+    assert len(list(scan)) == 3
+    assert not scan.reached_mark and scan.may_have_gap
+
+def _search(monkeypatch, tmp_path, subreddit: FakeSubreddit, high_water_mark: dict | None, window_hours: float = 7 * 24) -> dict:
+    state_path = str(tmp_path / "search_window.json")
+    if high_water_mark is not None:
+        save_json_state(state_path, {"searches": {"stocks|AAPL": {"high_water_mark": high_water_mark, "post_ids": []}}})
+    monkeypatch.setattr(reddit_scraper, "get_reddit_client", lambda: FakeReddit({"stocks": subreddit}))
+    monkeypatch.setattr(reddit_scraper, "_refresh_post_scores", lambda reddit_client, window: None)
+    monkeypatch.setattr(reddit_scraper, "fetch_top_comments", lambda refs, comments_limit: {})
+    get_new_reddit_posts_for_symbols(["AAPL"], ["stocks"], limit_per_sub=5, comments_limit=0,
+                                     state_path=state_path, window_hours=window_hours)
+    return load_json_state(state_path)["searches"]["stocks|AAPL"]["high_water_mark"]
+
+def test_search_that_hits_the_results_cap_keeps_the_mark(monkeypatch, tmp_path):
+    now = time.time()
+    subreddit = FakeSubreddit([FakeSubmission(f"p{i}", now - i * 60, f"AAPL post number {i}")
+                               for i in range(reddit_scraper._SEARCH_RESULTS_CAP)])
+    mark = {"created_utc": now - 86400, "fullnames": ["t3_marked"]}
+    assert _search(monkeypatch, tmp_path, subreddit, mark) == mark
+
+def test_search_that_reaches_the_mark_advances_it(monkeypatch, tmp_path):
+    now = time.time()
+    subreddit = FakeSubreddit([
+        FakeSubmission("recent", now - 60, "AAPL recent post about earnings"),
+        FakeSubmission("marked", now - 86400, "AAPL post already searched"),
+    ])
+    mark = {"created_utc": now - 86400, "fullnames": ["t3_marked"]}
+    assert _search(monkeypatch, tmp_path, subreddit, mark) == {"created_utc": now - 60, "fullnames": ["t3_recent"]}
+
+def test_search_exhausted_below_the_cap_covers_the_window(monkeypatch, tmp_path):
+    now = time.time()
+    subreddit = FakeSubreddit([FakeSubmission("recent", now - 60, "AAPL recent post about earnings")])
+    assert _search(monkeypatch, tmp_path, subreddit, None, window_hours=30 * 24) == {"created_utc": now - 60, "fullnames": ["t3_recent"]}
+    assert subreddit.search_time_filters == ["month"]
+
+@pytest.mark.parametrize("window_hours, time_filter", [
+    (12, "day"), (24, "day"), (7 * 24, "week"), (10 * 24, "month"), (90 * 24, "year"), (2 * 365 * 24, "all"),
+])
+def test_search_time_filter_covers_the_window(window_hours, time_filter):
+    assert reddit_scraper._search_time_filter(window_hours) == time_filter
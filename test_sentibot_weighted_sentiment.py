@@ -0,0 +1,64 @@
+# בדיקות לגרסת המערכים של הסנטימנט המשוקלל: אותן תוצאות כמו calculate_weighted_sentiment על אותן כותרות
+import random
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from sentibot_weighted_sentiment import Headline, calculate_weighted_sentiment, calculate_weighted_sentiment_arrays
+
+NOW = datetime(2025, 6, 30, 12, 0)
+
+def _headlines(size: int = 2000, seed: int = 0) -> list[Headline]:
+    rng = random.Random(seed)
+    return [
+        Headline(
+            symbol=rng.choice(["AAPL", "TSLA", "NVDA", "GME", "AMC"]),
+            sentiment_score=rng.uniform(-1, 1),
+            source=rng.choice(["Bloomberg", "CNBC", "Yahoo Finance", "Unknown", "Reddit"]),
+            published_at=NOW - timedelta(minutes=rng.randint(0, 60 * 24 * 30)),
+        )
+        for _ in range(size)
+    ]
+
+def _arrays(headlines: list[Headline]) -> tuple[list, list, list, list]:
+    return (
+        [headline.symbol for headline in headlines], [headline.sentiment_score for headline in headlines],
+        [headline.source for headline in headlines], [headline.published_at for headline in headlines],
+    )
+
+@pytest.mark.parametrize("lambda_decay", [0.0, 0.1, 0.5])
+def test_arrays_match_headline_loop(lambda_decay):
+    headlines = _headlines()
+    expected = calculate_weighted_sentiment(headlines, lambda_decay=lambda_decay, now=NOW)
+    result = calculate_weighted_sentiment_arrays(*_arrays(headlines), lambda_decay=lambda_decay)
+    assert set(result) == set(expected)
+    for symbol, score in expected.items():
+        assert result[symbol] == pytest.approx(score, abs=1e-9)
+
+def test_arrays_use_custom_source_weights():
+    headlines = _headlines(size=300, seed=1)
+    source_weights = {"CNBC": 2.0, "Reddit": 0.5}
+    expected = calculate_weighted_sentiment(headlines, source_weights=source_weights, now=NOW)
+    result = calculate_weighted_sentiment_arrays(*_arrays(headlines), source_weights=source_weights)
+    assert result == pytest.approx(expected, abs=1e-9)
+
+def test_daily_buckets_match_loop_per_day():
+    headlines = _headlines(size=1000, seed=2)
+    result = calculate_weighted_sentiment_arrays(*_arrays(headlines), bucket="D")
+
+    by_day = {}
+    for headline in headlines:
+        by_day.setdefault(pd.Timestamp(headline.published_at.date()), []).append(headline)
+    expected_rows = []
+    for day, day_headlines in by_day.items():
+        for symbol, score in calculate_weighted_sentiment(day_headlines, now=NOW).items():
+            expected_rows.append((symbol, day, score, sum(headline.symbol == symbol for headline in day_headlines)))
+    expected = pd.DataFrame(expected_rows, columns=["symbol", "bucket", "weighted_sentiment", "num_headlines"])
+    expected = expected.sort_values(["symbol", "bucket"], ignore_index=True)
+
+    assert len(result) == len(expected)
+    assert result["symbol"].tolist() == expected["symbol"].tolist()
+    assert result["bucket"].tolist() == expected["bucket"].tolist()
+    assert result["num_headlines"].tolist() == expected["num_headlines"].tolist()
+    assert result["weighted_sentiment"].tolist() == pytest.approx(expected["weighted_sentiment"].tolist(), abs=1e-9)
@@ -0,0 +1,52 @@
+# בדיקות לגרסת הבאץ' של ניתוח הסנטימנט: אותם ציונים ואותה סטטיסטיקה לכל סמל כמו המסלול של פריט-פריט
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import sentiment_analyzer
+from sentiment_analyzer import analyze_sentiment, analyze_sentiments, aggregate_sentiment_by_symbol
+
+SOURCES = ["Yahoo Finance", "CNBC", "Reddit_Post", "Reddit_Comment", "Unknown Blog"]
+WORDS = ["stock", "surges", "crashes", "great", "terrible", "earnings", "beat", "miss", "not", "very", "good", "bad", "!!", "LOL"]
+
+@pytest.fixture(autouse=True)
+def no_sentiment_cache(monkeypatch):
+    # בלי ה-cache על הדיסק, כדי שכל ציון יחושב מחדש בשני המסלולים
+    monkeypatch.setattr(sentiment_analyzer, "get_sentiment_cache", lambda: None)
+
+def _corpus(size: int = 300, seed: int = 0) -> tuple[list[str], list[str], list[str]]:
+    rng = random.Random(seed)
+    texts = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 12))) for _ in range(size)]
+    texts[::37] = [""] * len(texts[::37]) # טקסטים ריקים מקבלים NaN / None
+    symbols = [rng.choice(["AAPL", "TSLA", "NVDA", "GME"]) for _ in range(size)]
+    sources = [rng.choice(SOURCES) for _ in range(size)]
+    return texts, symbols, sources
+
+def test_analyze_sentiments_matches_analyze_sentiment():
+    texts, _, sources = _corpus()
+    batch_scores = analyze_sentiments(texts, sources)
+    for text, source_name, batch_score in zip(texts, sources, batch_scores):
+        single_score = analyze_sentiment(text, source_name)
+        if single_score is None:
+            assert np.isnan(batch_score)
+        else:
+            assert batch_score == single_score
+
+def test_aggregate_sentiment_by_symbol_matches_per_symbol_statistics():
+    texts, symbols, sources = _corpus(seed=1)
+    scores = analyze_sentiments(texts, sources)
+    stats = aggregate_sentiment_by_symbol(symbols, scores, sources)
+
+    # החישוב הקודם של main לכל סמל בנפרד
+    expected_symbols = list(dict.fromkeys(symbol for symbol, score in zip(symbols, scores) if not np.isnan(score)))
+    assert list(stats) == expected_symbols
+    for symbol in expected_symbols:
+        symbol_scores = [score for sym, score in zip(symbols, scores) if sym == symbol and not np.isnan(score)]
+        symbol_sources = [source_name for sym, source_name, score in zip(symbols, sources, scores) if sym == symbol and not np.isnan(score)]
+        assert stats[symbol]["num_items"] == len(symbol_scores)
+        assert stats[symbol]["avg_sentiment"] == pytest.approx(sum(symbol_scores) / len(symbol_scores), abs=1e-12)
+        expected_std = pd.Series(symbol_scores).std() if len(symbol_scores) > 1 else 0.0
+        assert stats[symbol]["sentiment_std"] == pytest.approx(expected_std, abs=1e-12)
+        assert stats[symbol]["main_source"] == pd.Series(symbol_sources).value_counts().index[0]
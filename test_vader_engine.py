@@ -0,0 +1,50 @@
+# בדיקות למנוע הווקטורי: ציוני compound בטווח COMPOUND_TOLERANCE מהמימוש המקורי של VADER
+import random
+
+import numpy as np
+import pytest
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+from vader_engine import VectorizedVader, COMPOUND_TOLERANCE
+
+# מקרים שכל אחד מהם מפעיל כלל אחר (booster, שלילה, ALL CAPS, "but", ביטויים מיוחדים, סימני פיסוק, אימוג'י)
+RULE_CASES = [
+    "", "   ", "The stock is good.", "The stock is VERY GOOD!!!", "not good", "never so bad", "isn't great at all",
+    "The results were good, but the guidance was terrible.", "kind of great", "at least it is not the worst",
+    "without doubt the best quarter", "the shit bomb of earnings", "no way this beats", "Is it good??", "LOL :) 😀",
+    "GOOD good Good", "least bad", "nor good or bad", "extremely disappointing but strong", "$NVDA to the moon 🚀🚀",
+]
+
+@pytest.fixture(scope="module")
+def reference():
+    return SentimentIntensityAnalyzer()
+
+@pytest.fixture(scope="module")
+def engine(reference):
+    return VectorizedVader(reference)
+
+def _random_corpus(reference: SentimentIntensityAnalyzer, size: int = 1000, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    lexicon_words = list(reference.lexicon)
+    filler = ["the", "stock", "AAPL", "$TSLA", "not", "very", "extremely", "but", "never", "kind of", "without doubt",
+              "least", "so", "!!", "?", ":)", "LOL"]
+    texts = []
+    for _ in range(size):
+        words = [rng.choice(lexicon_words) if rng.random() < 0.3 else rng.choice(filler) for _ in range(rng.randint(1, 40))]
+        words = [word.upper() if rng.random() < 0.05 else word for word in words]
+        texts.append(" ".join(words) + rng.choice(["", ".", "!", "?", "!!!"]))
+    return texts
+
+@pytest.mark.parametrize("corpus", ["rules", "random"])
+def test_compound_scores_match_reference(reference, engine, corpus):
+    texts = RULE_CASES if corpus == "rules" else _random_corpus(reference)
+    expected = np.array([reference.polarity_scores(text)["compound"] for text in texts])
+    scores = engine.compound_scores(texts)
+    assert scores.shape == expected.shape
+    np.testing.assert_allclose(scores, expected, rtol=0, atol=COMPOUND_TOLERANCE)
+
+def test_compound_scores_do_not_depend_on_batching(engine):
+    texts = RULE_CASES * 3
+    batch_scores = engine.compound_scores(texts)
+    single_scores = np.array([engine.compound_scores([text])[0] for text in texts])
+    np.testing.assert_array_equal(batch_scores, single_scores)
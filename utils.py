@@ -1,16 +1,13 @@
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-import nltk
-
-nltk.download("vader_lexicon")
+from sentiment_backends import get_backend
 
 def analyze_sentiment(headlines):
-    sia = SentimentIntensityAnalyzer()
+    sia = get_backend("nltk_vader") # הלקסיקון נטען בשימוש הראשון, לא ב-import
     sentiment_data = []
 
     for headline in headlines:
         if not isinstance(headline, str) or not headline.strip():
             continue
-        sentiment_score = sia.polarity_scores(headline.strip())["compound"]
+        sentiment_score = sia.compound(headline.strip())
         sentiment_data.append({
             "headline": headline.strip(),
             "sentiment": float(sentiment_score)
@@ -0,0 +1,273 @@
+# vader_engine.py
+# מנוע חישוב ציון ה-compound של VADER לבאצ'ים של טקסטים עם NumPy.
+# הלקסיקון וכללי ה-booster/שלילה/ALL CAPS/"but" מקומפלים פעם אחת למערכים לפי מזהה מילה (token id),
+# כל הטוקנים של הבאץ' נפרשים למערך שטוח אחד, וכל כלל מחושב כפעולה וקטורית על המערך כולו
+# (השכנים i-1..i-3 ו-i+1..i+2 הם הזזות של המערך עם מסכה של גבולות הטקסט).
+#
+# תאימות ל-vaderSentiment.SentimentIntensityAnalyzer.polarity_scores(text)["compound"] (גרסה 3.3.2):
+# אותו לקסיקון, אותם קבועים, אותה טוקניזציה ואותו סדר פעולות, כך שהציון זהה. הסטייה המתועדת (COMPOUND_TOLERANCE):
+# np.round במקום round() של Python וסכימה ב-np.bincount – לכל היותר 0.0001 במקרי גבול של העיגול.
+# benchmark_vader_engine.py מודד את ההפרש ואת הקצב מול המימוש המקורי.
+import bisect
+import string
+
+import numpy as np
+from vaderSentiment.vaderSentiment import (
+    SentimentIntensityAnalyzer, BOOSTER_DICT, NEGATE, SPECIAL_CASES, C_INCR, N_SCALAR
+)
+
+COMPOUND_TOLERANCE = 1e-4 # הפרש מקסימלי מול המימוש המקורי
+NORMALIZE_ALPHA = 15
+_TOKEN_CACHE_MAX_ITEMS = 500000 # מעבר לכך ה-cache של הטוקנים הגולמיים מתרוקן (המילון עצמו נשמר)
+
+# קודים למילים שהכללים בודקים בשמן (0 – כל מילה אחרת)
+_RULE_WORDS = ["no", "or", "nor", "kind", "of", "least", "at", "very", "never", "so", "this", "without", "doubt", "but"]
+_RULE_CODE = {word: code for code, word in enumerate(_RULE_WORDS, start=1)}
+
+def _special_ngrams() -> tuple[dict, dict]:
+    # הצירופים הרב-מילתיים של SPECIAL_CASES ושל BOOSTER_DICT ("kind of", "sort of"...), לפי מספר המילים
+    special = {key: value for key, value in SPECIAL_CASES.items() if " " in key}
+    boosters = {key: value for key, value in BOOSTER_DICT.items() if " " in key}
+    return special, boosters
+
+def _reference_but_check(sentiments: list[float], but_index: int) -> list[float]:
+    """
+    הכלל של "but" בדיוק כמו ב-_but_check המקורי: הציון במיקום t מחופש לפי ערכו (sentiments.index – המופע הראשון
+    של אותו ערך) ברשימה שמשתנה תוך כדי, ולכן כששני ציונים שווים, ההכפלה (0.5 לפני ה-"but", 1.5 אחריו) יכולה ליפול
+    על מיקום אחר. עם ערכים בדידים של הלקסיקון זה קורה הרבה בטקסטים ארוכים, ולכן משחזרים את זה ולא רק את הכוונה.
+    מיקומים לכל ערך נשמרים ממוינים, כך שהחיפוש לא סורק את כל הרשימה. אפסים לא משתנים ולא משפיעים – מדלגים עליהם.
+    """
+    positions_by_value = {}
+    for position, value in enumerate(sentiments):
+        if value != 0:
+            positions_by_value.setdefault(value, []).append(position)
+    for position in range(len(sentiments)):
+        value = sentiments[position]
+        if value == 0:
+            continue
+        holders = positions_by_value[value]
+        first_position = holders[0]
+        if first_position == but_index:
+            continue
+        new_value = value * (0.5 if first_position < but_index else 1.5)
+        holders.pop(0)
+        if not holders:
+            del positions_by_value[value]
+        sentiments[first_position] = new_value
+        bisect.insort(positions_by_value.setdefault(new_value, []), first_position)
+    return sentiments
+
+class VectorizedVader:
+    """
+    compound_scores(texts) -> np.ndarray של ציוני compound (כמו polarity_scores(text)["compound"]) לכל הטקסטים.
+    העבודה לכל טקסט ב-Python היא רק פיצול לטוקנים ומיפוי למזהים (עם cache לטוקן הגולמי); כל כללי הניקוד וקטוריים.
+    """
+
+    def __init__(self, reference: SentimentIntensityAnalyzer | None = None):
+        reference = reference or SentimentIntensityAnalyzer() # הלקסיקונים נטענים מקבצי החבילה המקורית
+        self.lexicon = reference.lexicon
+        self._emojis = {char: description for char, description in reference.emojis.items() if len(char) == 1}
+        self._emoji_chars = frozenset(self._emojis)
+
+        special, boosters = _special_ngrams()
+        ngram_words = sorted({word for phrase in list(special) + list(boosters) for word in phrase.split()})
+        self._ngram_code = {word: code for code, word in enumerate(ngram_words, start=1)}
+        size = len(ngram_words) + 1
+        # טבלאות צפופות: bigram[a, b] / trigram[a, b, c] לפי קודי המילים, NaN = אין צירוף כזה
+        self._special_bigram = np.full((size, size), np.nan)
+        self._special_trigram = np.full((size, size, size), np.nan)
+        self._booster_bigram = np.zeros((size, size))
+        for phrase, value in special.items():
+            codes = tuple(self._ngram_code[word] for word in phrase.split())
+            (self._special_bigram if len(codes) == 2 else self._special_trigram)[codes] = value
+        for phrase, value in boosters.items():
+            codes = tuple(self._ngram_code[word] for word in phrase.split())
+            if len(codes) == 2: # אין ב-BOOSTER_DICT צירופים של שלוש מילים
+                self._booster_bigram[codes] = value
+
+        # מאפייני כל מזהה מילה. המילון גדל בזמן הריצה – כל מילה חדשה מקבלת מזהה ומאפיינים פעם אחת
+        self._vocab = {}
+        self._token_cache = {} # טוקן גולמי (אחרי split) -> (מזהה, isupper)
+        self._valence, self._in_lexicon, self._booster, self._negation, self._rule_code, self._ngram = [], [], [], [], [], []
+        self._arrays = None
+
+    def _word_id(self, word_lower: str) -> int:
+        word_id = self._vocab.get(word_lower)
+        if word_id is None:
+            word_id = len(self._vocab)
+            self._vocab[word_lower] = word_id
+            self._valence.append(self.lexicon.get(word_lower, 0.0))
+            self._in_lexicon.append(word_lower in self.lexicon)
+            self._booster.append(BOOSTER_DICT.get(word_lower, 0.0))
+            self._negation.append(word_lower in NEGATE or "n't" in word_lower)
+            self._rule_code.append(_RULE_CODE.get(word_lower, 0))
+            self._ngram.append(self._ngram_code.get(word_lower, 0))
+            self._arrays = None
+        return word_id
+
+    def _feature_arrays(self) -> tuple:
+        if self._arrays is None:
+            self._arrays = (
+                np.array(self._valence, dtype=float), np.array(self._in_lexicon, dtype=bool),
+                np.array(self._booster, dtype=float), np.array(self._negation, dtype=bool),
+                np.array(self._rule_code, dtype=np.int8), np.array(self._ngram, dtype=np.int16),
+            )
+        return self._arrays
+
+    def _replace_emojis(self, text: str) -> str:
+        # כמו ב-polarity_scores: כל אמוג'י מוחלף בתיאור שלו, עם רווח לפניו אם התו הקודם אינו רווח (ובלי רווח אחריו)
+        if text.isascii() or self._emoji_chars.isdisjoint(text):
+            return text
+        parts = []
+        prev_space = True
+        for char in text:
+            description = self._emojis.get(char)
+            if description is not None:
+                if not prev_space:
+                    parts.append(" ")
+                parts.append(description)
+                prev_space = False
+            else:
+                parts.append(char)
+                prev_space = char == " "
+        return "".join(parts)
+
+    def _tokenize(self, token: str) -> tuple[int, bool]:
+        cached = self._token_cache.get(token)
+        if cached is None:
+            if len(self._token_cache) >= _TOKEN_CACHE_MAX_ITEMS:
+                self._token_cache.clear()
+            stripped = token.strip(string.punctuation)
+            word = token if len(stripped) <= 2 else stripped # אמוטיקונים (":)") נשארים כמו שהם
+            cached = (self._word_id(word.lower()), word.isupper())
+            self._token_cache[token] = cached
+        return cached
+
+    @staticmethod
+    def _punctuation_amplifier(text: str) -> float:
+        ep_amplifier = min(text.count("!"), 4) * 0.292
+        qm_count = text.count("?")
+        qm_amplifier = 0.0
+        if qm_count > 1:
+            qm_amplifier = qm_count * 0.18 if qm_count <= 3 else 0.96
+        return ep_amplifier + qm_amplifier
+
+    def compound_scores(self, texts: list[str]) -> np.ndarray:
+        tokens, doc_lengths, amplifiers = [], [], []
+        token_cache = self._token_cache
+        for text in texts:
+            text = self._replace_emojis(text).strip()
+            words = text.split()
+            tokens.extend([token_cache.get(word) or self._tokenize(word) for word in words])
+            doc_lengths.append(len(words))
+            amplifiers.append(self._punctuation_amplifier(text))
+        token_ids, token_upper = zip(*tokens) if tokens else ((), ())
+
+        doc_lengths = np.array(doc_lengths, dtype=np.int64)
+        sums = self._sentiment_sums(np.array(token_ids, dtype=np.int64), np.array(token_upper, dtype=bool), doc_lengths)
+
+        amplifiers = np.array(amplifiers)
+        sums = np.where(sums > 0, sums + amplifiers, np.where(sums < 0, sums - amplifiers, sums))
+        compound = np.clip(sums / np.sqrt(sums * sums + NORMALIZE_ALPHA), -1.0, 1.0)
+        compound[doc_lengths == 0] = 0.0
+        return np.round(compound, 4)
+
+    def _sentiment_sums(self, ids: np.ndarray, upper: np.ndarray, doc_lengths: np.ndarray) -> np.ndarray:
+        n_docs = len(doc_lengths)
+        if ids.size == 0:
+            return np.zeros(n_docs)
+        valence, in_lexicon, booster, negation, rule_code, ngram = self._feature_arrays()
+
+        doc = np.repeat(np.arange(n_docs), doc_lengths)
+        doc_start = np.cumsum(doc_lengths) - doc_lengths
+        pos = np.arange(ids.size) - doc_start[doc]
+        remaining = doc_lengths[doc] - 1 - pos # כמה טוקנים יש אחרי הטוקן הנוכחי באותו טקסט
+
+        def back(values, k, fill):
+            shifted = np.full_like(values, fill)
+            shifted[k:] = values[:-k]
+            return np.where(pos >= k, shifted, fill)
+
+        def ahead(values, k, fill):
+            shifted = np.full_like(values, fill)
+            shifted[:-k] = values[k:]
+            return np.where(remaining >= k, shifted, fill)
+
+        word_lex = in_lexicon[ids]
+        word_code = rule_code[ids]
+        word_ngram = ngram[ids]
+        word_booster = booster[ids]
+        word_negation = negation[ids]
+        upper_count = np.bincount(doc, weights=upper, minlength=n_docs)
+        cap_diff = ((upper_count > 0) & (upper_count < doc_lengths))[doc]
+
+        code_1, code_2, code_3 = (back(word_code, k, 0) for k in (1, 2, 3))
+        # מילות booster (ו-"kind" לפני "of") מקבלות 0, וכך גם מילים שאינן בלקסיקון
+        active = word_lex & (word_booster == 0) & ~((word_code == _RULE_CODE["kind"]) & (ahead(word_code, 1, 0) == _RULE_CODE["of"]))
+
+        lexicon_valence = valence[ids]
+        v = lexicon_valence.copy()
+        v[(word_code == _RULE_CODE["no"]) & ahead(word_lex, 1, False)] = 0.0
+        after_no = (code_1 == _RULE_CODE["no"]) | (code_2 == _RULE_CODE["no"]) | \
+                   ((code_3 == _RULE_CODE["no"]) & np.isin(code_1, (_RULE_CODE["or"], _RULE_CODE["nor"])))
+        v = np.where(after_no, lexicon_valence * N_SCALAR, v)
+        v = np.where(upper & cap_diff, np.where(v > 0, v + C_INCR, v - C_INCR), v)
+
+        so_this = (_RULE_CODE["so"], _RULE_CODE["this"])
+        for k, damping in ((1, 1.0), (2, 0.95), (3, 0.9)):
+            applies = (pos >= k) & ~back(word_lex, k, True)
+            prev_booster = back(word_booster, k, 0.0)
+            scalar = np.where(v < 0, -prev_booster, prev_booster)
+            scalar = np.where((prev_booster != 0) & back(upper, k, False) & cap_diff,
+                              np.where(v > 0, scalar + C_INCR, scalar - C_INCR), scalar)
+            v = np.where(applies, v + scalar * damping, v)
+
+            prev_negated = back(word_negation, k, False)
+            if k == 1:
+                factor = np.where(prev_negated, N_SCALAR, 1.0)
+            elif k == 2:
+                never_so = (code_2 == _RULE_CODE["never"]) & np.isin(code_1, so_this)
+                without_doubt = (code_2 == _RULE_CODE["without"]) & (code_1 == _RULE_CODE["doubt"])
+                factor = np.where(never_so, 1.25, np.where(without_doubt, 1.0, np.where(prev_negated, N_SCALAR, 1.0)))
+            else:
+                never_so = ((code_3 == _RULE_CODE["never"]) & np.isin(code_2, so_this)) | np.isin(code_1, so_this)
+                without_doubt = (code_3 == _RULE_CODE["without"]) & ((code_2 == _RULE_CODE["doubt"]) | (code_1 == _RULE_CODE["doubt"]))
+                factor = np.where(never_so, 1.25, np.where(without_doubt, 1.0, np.where(prev_negated, N_SCALAR, 1.0)))
+            v = np.where(applies, v * factor, v)
+            if k == 3:
+                v = np.where(applies, self._special_idioms(v, word_ngram, back, ahead), v)
+
+        least = _RULE_CODE["least"]
+        least_before = ~back(word_lex, 1, True) & (code_1 == least)
+        v = np.where(least_before & (pos > 1) & ~np.isin(code_2, (_RULE_CODE["at"], _RULE_CODE["very"])), v * N_SCALAR, v)
+        v = np.where(least_before & (pos == 1), v * N_SCALAR, v)
+
+        sentiments = np.where(active, v, 0.0)
+
+        # "but": רק בטקסטים שיש בהם "but" – לפי ה-"but" הראשון בטקסט (ראו _reference_but_check)
+        is_but = word_code == _RULE_CODE["but"]
+        if is_but.any():
+            first_but = np.full(n_docs, -1)
+            but_docs = np.unique(doc[is_but])
+            first_but[but_docs] = pos[is_but][np.searchsorted(doc[is_but], but_docs)]
+            for doc_index in but_docs.tolist():
+                start = doc_start[doc_index]
+                end = start + doc_lengths[doc_index]
+                sentiments[start:end] = _reference_but_check(sentiments[start:end].tolist(), int(first_but[doc_index]))
+
+        return np.bincount(doc, weights=sentiments, minlength=n_docs)
+
+    def _special_idioms(self, v, word_ngram, back, ahead):
+        # כמו _special_idioms_check: הצירוף הראשון שנמצא (לפי הסדר המקורי) קובע את הציון, ואחריו צירופים קדימה
+        g0, g1, g2, g3 = word_ngram, back(word_ngram, 1, 0), back(word_ngram, 2, 0), back(word_ngram, 3, 0)
+        candidates = [
+            self._special_bigram[g1, g0], self._special_trigram[g2, g1, g0], self._special_bigram[g2, g1],
+            self._special_trigram[g3, g2, g1], self._special_bigram[g3, g2],
+        ]
+        result = v
+        for candidate in reversed(candidates): # הראשון ברשימה גובר – ולכן מוחל אחרון
+            result = np.where(np.isnan(candidate), result, candidate)
+        next_1, next_2 = ahead(word_ngram, 1, 0), ahead(word_ngram, 2, 0)
+        for candidate in (self._special_bigram[g0, next_1], self._special_trigram[g0, next_1, next_2]):
+            result = np.where(np.isnan(candidate), result, candidate)
+        return result + self._booster_bigram[g3, g2] + self._booster_bigram[g2, g1]
@@ -6,6 +6,8 @@ import time
 import logging 
 import os 
 
+from http_client import http_get, set_host_cookies
+
 try:
     from email_sender import send_email 
     from settings import setup_logger 
@@ -26,33 +28,27 @@ EUCONSENT_VALUE = "CQTNA8AQTNA8AAOACBHEBvFoAP_gAEPgACiQKptB9G7WTXFneTp2YPskOYwX0
 GUC_VALUE = "AQABCAFoVBBofkIfRgSY&s=AQAAAB405PQD&g=aFLHVw"
 GUCS_VALUE = "AX9tHvLB"
 
-# הרכבת מחרוזת העוגיות - נתחיל עם EuConsent ו-GUCS
+# העוגיות נרשמות ב-Session המשותף של http_client עבור .yahoo.com - נשלחות רק לשרתי Yahoo.
 # הוספתי גם את GUC למקרה ששלושתן יחד יעבדו טוב יותר.
-# סדר העוגיות בדרך כלל לא קריטי, אבל לפעמים כן.
-COOKIE_STRING = f"EuConsent={EUCONSENT_VALUE}; GUCS={GUCS_VALUE}; GUC={GUC_VALUE}"
-# אם זה לא עובד, נוכל לנסות רק EuConsent ו-GUCS:
-# COOKIE_STRING = f"EuConsent={EUCONSENT_VALUE}; GUCS={GUCS_VALUE}"
-# או רק EuConsent:
-# COOKIE_STRING = f"EuConsent={EUCONSENT_VALUE}"
+# אם זה לא עובד, נוכל לנסות רק EuConsent ו-GUCS, או רק EuConsent.
+YAHOO_COOKIES = {"EuConsent": EUCONSENT_VALUE, "GUCS": GUCS_VALUE, "GUC": GUC_VALUE}
 
+# User-Agent, Accept-Language ו-keep-alive מגיעים מה-Session המשותף
 HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
-    'Accept-Language': 'en-US,en;q=0.9', 
-    'Connection': 'keep-alive',
-    'Cookie': COOKIE_STRING 
 }
 # ------------------------------------
 
 def scrape_yahoo_news_page(symbol: str) -> list[dict]:
     url = YAHOO_NEWS_URL_TEMPLATE.format(symbol=symbol) 
     logger.info(f"Attempting to scrape: {url} with custom cookies.")
-    logger.debug(f"Using Cookies string: {HEADERS.get('Cookie', 'None')}")
+    set_host_cookies(".yahoo.com", YAHOO_COOKIES)
+    logger.debug(f"Using cookies: {', '.join(YAHOO_COOKIES)}")
     
     collected_articles = []
 
     try:
-        response = requests.get(url, headers=HEADERS, timeout=30) 
+        response = http_get(url, headers=HEADERS, timeout=30) 
         logger.info(f"Response status code for {url}: {response.status_code}")
         
         # בדוק אם הכותרת של הדף היא עדיין דף ההסכמה
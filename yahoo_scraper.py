@@ -1,12 +1,35 @@
 # yahoo_scraper.py
 import feedparser
-import socket
-from settings import setup_logger, MIN_HEADLINE_LENGTH
+import random
+import requests
+from settings import setup_logger, MIN_HEADLINE_LENGTH, YAHOO_REQUEST_TIMEOUT_SECONDS, YAHOO_RAW_SAMPLE_RATE
 import logging 
-import urllib.request # נוסיף את זה לבדיקה ישירה יותר
+from http_cache import fetch_url
+from keyword_matcher import KeywordMatcher
+from symbol_names import KEYWORDS_BY_SYMBOL
 
-# logger = setup_logger(__name__) # ברירת המחדל המקורית שלך היא INFO
-logger = setup_logger(__name__, level=logging.DEBUG) # הפעל DEBUG באופן זמני עבור הלוגר של הקובץ הזה
+logger = setup_logger(__name__)
+
+def _fetch_feed(rss_url: str, timeout_seconds: float) -> tuple[bytes, int | None, dict]:
+    """
+    הורדה יחידה של הפיד (דרך ה-cache של http_cache – אם הפיד לא השתנה מאז הריצה הקודמת, השרת מחזיר 304 והתוכן מגיע מה-cache).
+    ה-timeout מוגדר לבקשה עצמה ולא דרך socket.setdefaulttimeout,
+    כך שאפשר להריץ את ה-scraper מכמה threads במקביל בלי שישפיעו זה על זה.
+    """
+    response = fetch_url(rss_url, timeout=timeout_seconds)
+    return response.body, response.status, response.headers
+
+def _log_raw_content_sample(symbol: str, feed_content_bytes: bytes):
+    # דגימה של התוכן הגולמי רק בחלק מהבקשות (YAHOO_RAW_SAMPLE_RATE) ורק כשרמת DEBUG פעילה
+    if YAHOO_RAW_SAMPLE_RATE <= 0 or not logger.isEnabledFor(logging.DEBUG):
+        return
+    if random.random() >= YAHOO_RAW_SAMPLE_RATE:
+        return
+    raw_feed_content_sample = feed_content_bytes[:1000].decode('utf-8', errors='ignore')
+    if raw_feed_content_sample:
+        logger.debug("Raw content sample for %s (first 1000 chars):\n%s", symbol, raw_feed_content_sample)
+    else:
+        logger.debug("Raw content fetched for %s was empty.", symbol)
 
 def get_yahoo_news(symbol: str, rss_url_template: str) -> list[tuple[str, str]]:
     source_name = "Yahoo Finance"
@@ -18,40 +41,22 @@ def get_yahoo_news(symbol: str, rss_url_template: str) -> list[tuple[str, str]]:
 
     rss_url = rss_url_template.replace("{symbol}", symbol)
     logger.info(f"Fetching news for '{symbol}' from {source_name} using URL: {rss_url}")
-    
-    original_timeout = socket.getdefaulttimeout()
-    socket.setdefaulttimeout(20) # הגדלתי מעט את ה-timeout ל-20 שניות
-    raw_feed_content_sample = "N/A" # אתחול למקרה שהשליפה הישירה נכשלת
 
     try:
-        # --- ניסיון לשלוף תוכן גולמי קודם ---
         try:
-            logger.debug(f"Directly fetching content from {rss_url} for {symbol} using urllib.request...")
-            user_agent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            request = urllib.request.Request(rss_url, headers={'User-Agent': user_agent})
-            with urllib.request.urlopen(request, timeout=15) as response: # timeout גם כאן
-                feed_content_bytes = response.read()
-                # נסה לפענח כ-UTF-8, התעלם משגיאות אם יש תווים בעייתיים רק לצורך הדגימה
-                raw_feed_content_sample = feed_content_bytes.decode('utf-8', errors='ignore')
-                logger.info(f"Successfully fetched raw content from {rss_url} for {symbol}. Length: {len(feed_content_bytes)} bytes.")
-                # הדפס רק אם יש תוכן, ולוגר ברמת DEBUG
-                if raw_feed_content_sample:
-                    logger.debug(f"Raw content sample for {symbol} (first 1000 chars):\n{raw_feed_content_sample[:1000]}")
-                else:
-                    logger.debug(f"Raw content fetched for {symbol} was empty.")
+            feed_content_bytes, http_status, response_headers = _fetch_feed(rss_url, YAHOO_REQUEST_TIMEOUT_SECONDS)
+        except requests.exceptions.Timeout:
+            logger.error(f"Timeout ({YAHOO_REQUEST_TIMEOUT_SECONDS}s) occurred while fetching news from {source_name} for '{symbol}'. URL: {rss_url}", exc_info=False)
+            return []
         except Exception as e_fetch:
-            logger.error(f"Failed to fetch raw content directly for {symbol} from {rss_url}: {e_fetch}", exc_info=False)
-            # המשך לנסות עם feedparser בכל מקרה, אולי הוא יצליח איפה ש-urllib נכשל
-        # --- סוף ניסיון שליפת תוכן גולמי ---
+            logger.error(f"Failed to fetch feed for {symbol} from {rss_url}: {e_fetch}", exc_info=False)
+            return []
 
-        logger.debug(f"Attempting to parse feed for {symbol} from: {rss_url} using feedparser")
-        # feedparser אמור להשתמש ב-socket timeout שהוגדר גלובלית
-        feed = feedparser.parse(rss_url) 
-        
-        if hasattr(feed, 'status'): # feedparser לא תמיד מוסיף 'status' ישירות, זה תלוי ב-handler
-            logger.info(f"Feed HTTP status (from feedparser if available) for {symbol} from {source_name}: {feed.status}")
-        # אם אין status, ייתכן שהייתה שגיאה ברמת הרשת עוד לפני ש-feedparser קיבל תגובה.
-        # במקרה כזה, ההודעות מ-urllib.request עשויות להיות יותר אינפורמטיביות.
+        logger.info(f"Successfully fetched feed from {rss_url} for {symbol}. HTTP status: {http_status}, Length: {len(feed_content_bytes)} bytes.")
+        _log_raw_content_sample(symbol, feed_content_bytes)
+
+        # מפענחים את הבייטים שכבר הורדנו – בלי בקשה שנייה לאותו URL
+        feed = feedparser.parse(feed_content_bytes, response_headers=response_headers)
             
         logger.info(f"Feed declared encoding (from feedparser) for {symbol} from {source_name}: {feed.get('encoding', 'N/A')}")
         logger.info(f"Feed declared version (from feedparser) for {symbol} from {source_name}: {feed.get('version', 'N/A')}")
@@ -73,35 +78,115 @@ def get_yahoo_news(symbol: str, rss_url_template: str) -> list[tuple[str, str]]:
         if not feed.entries: 
             logger.info(f"No entries (headlines) found by feedparser in the parsed RSS feed from {source_name} for '{symbol}'. (URL: {rss_url})")
             # בדוק אם התוכן הגולמי גם נראה ריק מפריטים
-            if num_entries_found == 0 and raw_feed_content_sample != "N/A":
-                if "<item>" not in raw_feed_content_sample.lower() and "<entry>" not in raw_feed_content_sample.lower():
-                     logger.warning(f"The raw feed content for {symbol} (fetched via urllib) also seems to lack <item> or <entry> tags, suggesting the feed might indeed be empty or in an unexpected format.")
-                else: # התוכן הגולמי מכיל פריטים, אבל feedparser לא מצא אותם!
-                     logger.error(f"CRITICAL: Raw feed content for {symbol} appears to have <item> or <entry> tags, but feedparser found 0 entries. This indicates a parsing issue with feedparser for this feed.")
+            raw_content_lower = feed_content_bytes.lower()
+            if b"<item" not in raw_content_lower and b"<entry" not in raw_content_lower:
+                 logger.warning(f"The raw feed content for {symbol} also seems to lack <item> or <entry> tags, suggesting the feed might indeed be empty or in an unexpected format.")
+            else: # התוכן הגולמי מכיל פריטים, אבל feedparser לא מצא אותם!
+                 logger.error(f"CRITICAL: Raw feed content for {symbol} appears to have <item> or <entry> tags, but feedparser found 0 entries. This indicates a parsing issue with feedparser for this feed.")
             return []
 
         for entry_idx, entry in enumerate(feed.entries):
             title = entry.get("title", "").strip()
-            logger.debug(f"  Processing entry {entry_idx + 1}/{num_entries_found} for {symbol} from {source_name}. Title: '{title[:100]}...'")
+            # %-style בלולאה: ההודעות לא נבנות כש-DEBUG כבוי
+            logger.debug("  Processing entry %d/%d for %s from %s. Title: '%.100s...'", entry_idx + 1, num_entries_found, symbol, source_name, title)
             if title and len(title) >= MIN_HEADLINE_LENGTH:
                 headlines.append((title, source_name))
-                logger.debug(f"    Added headline: '{title[:100]}...'")
+                logger.debug("    Added headline: '%.100s...'", title)
             elif title: # אם הכותרת לא ריקה אבל קצרה מדי
-                logger.debug(f"    Skipping short title: '{title}' (Length: {len(title)})")
+                logger.debug("    Skipping short title: '%s' (Length: %d)", title, len(title))
             else: # אם אין כותרת כלל
-                logger.debug(f"    Skipping empty title for entry {entry_idx + 1}.")
+                logger.debug("    Skipping empty title for entry %d.", entry_idx + 1)
         
         logger.info(f"Successfully processed {len(headlines)} valid headlines for '{symbol}' from {source_name} after filtering (out of {num_entries_found} initial entries).")
 
-    except socket.timeout:
-        logger.error(f"Socket timeout ({socket.getdefaulttimeout()}s) occurred while fetching/processing news from {source_name} for '{symbol}'. URL: {rss_url}", exc_info=False)
     except Exception as e:
         logger.error(f"An unexpected error occurred while fetching/processing news from {source_name} for '{symbol}': {e} (URL: {rss_url})", exc_info=True)
-    finally:
-        socket.setdefaulttimeout(original_timeout) 
     
     return headlines
 
+def _get_group_matcher(symbols: tuple[str, ...]) -> KeywordMatcher:
+    # הטיקר עצמו + מילות המפתח של הסמל, כמילים שלמות (כדי ש-"BB" לא יתאים ל-"BBBYQ")
+    return KeywordMatcher(
+        {symbol: [symbol] + KEYWORDS_BY_SYMBOL.get(symbol, []) for symbol in symbols},
+        whole_words=True
+    )
+
+def _get_entry_symbols(entry, group_symbols: tuple[str, ...], matcher: KeywordMatcher) -> list[str]:
+    """
+    שיוך פריט מפיד מרובה-סמלים לסמלים שלו: קודם לפי מטא-דאטה של הטיקר בפריט (tags/category),
+    ואם אין – לפי התאמת מילות מפתח בכותרת ובתקציר.
+    """
+    group_symbols_set = set(group_symbols)
+    tagged_symbols = [
+        tag.get("term", "").strip().upper() for tag in entry.get("tags", []) or []
+        if tag.get("term", "").strip().upper() in group_symbols_set
+    ]
+    if tagged_symbols:
+        return [symbol for symbol in group_symbols if symbol in tagged_symbols]
+    return matcher.find_labels(f"{entry.get('title', '')} {entry.get('summary', '')}")
+
+def _fetch_symbol_group(group_symbols: tuple[str, ...], rss_url_template: str) -> dict[str, list[tuple[str, str]]] | None:
+    source_name = "Yahoo Finance"
+    rss_url = rss_url_template.replace("{symbol}", ",".join(group_symbols))
+    logger.info(f"Fetching batched news for {len(group_symbols)} symbols ({', '.join(group_symbols)}) from {source_name} using URL: {rss_url}")
+
+    try:
+        feed_content_bytes, http_status, response_headers = _fetch_feed(rss_url, YAHOO_REQUEST_TIMEOUT_SECONDS)
+    except requests.exceptions.Timeout:
+        logger.error(f"Timeout ({YAHOO_REQUEST_TIMEOUT_SECONDS}s) occurred while fetching batched news from {source_name}. URL: {rss_url}", exc_info=False)
+        return None
+    except Exception as e_fetch:
+        logger.error(f"Failed to fetch batched feed from {rss_url}: {e_fetch}", exc_info=False)
+        return None
+
+    _log_raw_content_sample(",".join(group_symbols), feed_content_bytes)
+    feed = feedparser.parse(feed_content_bytes, response_headers=response_headers)
+    if feed.bozo:
+        bozo_reason_msg = feed.get("bozo_exception", "Unknown parsing error")
+        logger.warning(f"Failed to parse batched RSS feed from {source_name} (HTTP status: {http_status}). Reason: {bozo_reason_msg} (URL: {rss_url})")
+        return None
+
+    headlines_by_symbol = {symbol: [] for symbol in group_symbols}
+    matcher = _get_group_matcher(group_symbols)
+    unattributed_entries = 0
+    for entry in feed.entries:
+        title = entry.get("title", "").strip()
+        if not title or len(title) < MIN_HEADLINE_LENGTH:
+            continue
+        entry_symbols = _get_entry_symbols(entry, group_symbols, matcher)
+        if not entry_symbols and len(group_symbols) == 1:
+            entry_symbols = list(group_symbols) # פיד של סמל בודד – כל הפריטים שלו, כמו ב-get_yahoo_news
+        if not entry_symbols:
+            unattributed_entries += 1
+            continue
+        for symbol in entry_symbols:
+            headlines_by_symbol[symbol].append((title, source_name))
+
+    logger.info(f"Batched {source_name} feed for {', '.join(group_symbols)}: {len(feed.entries)} entries, {unattributed_entries} could not be attributed to a symbol.")
+    return headlines_by_symbol
+
+def get_yahoo_news_for_symbols(symbols: list[str], rss_url_template: str, symbols_per_request: int | None = None) -> dict[str, list[tuple[str, str]]]:
+    """
+    גרסה מרובת-סמלים של get_yahoo_news: בקשה אחת לכל קבוצה של symbols_per_request סמלים
+    (ה-endpoint של Yahoo מקבל s=AAPL,TSLA,...), וכל פריט משויך חזרה לסמלים שהוא שייך אליהם.
+    symbols_per_request=None – בקשה אחת לכל הסמלים שהועברו (news_aggregator כבר מחלק לקבוצות לפי ההגדרות).
+    מחזיר מילון symbol -> רשימת (title, "Yahoo Finance"); סמל שהבקשה שלו נכשלה יקבל רשימה ריקה.
+    הכיסוי שונה מפיד לכל סמל: מספר הפריטים בפיד מתחלק בין כל הסמלים, ופריט שלא שויך לאף סמל נזרק (ולכן זה opt-in,
+    YAHOO_SYMBOLS_PER_REQUEST ב-settings).
+    """
+    if not rss_url_template:
+        logger.error(f"RSS URL template not provided for Yahoo Finance. Cannot fetch news for {len(symbols)} symbols.")
+        return {symbol: [] for symbol in symbols}
+
+    symbols_per_request = max(1, symbols_per_request or len(symbols))
+    headlines_by_symbol = {}
+    for group_start in range(0, len(symbols), symbols_per_request):
+        group_symbols = tuple(symbols[group_start:group_start + symbols_per_request])
+        group_headlines = _fetch_symbol_group(tuple(symbol.upper() for symbol in group_symbols), rss_url_template) or {}
+        for symbol in group_symbols:
+            headlines_by_symbol[symbol] = group_headlines.get(symbol.upper(), [])
+    return headlines_by_symbol
+
 if __name__ == '__main__':
     # --- בלוק בדיקה מקומית (אופציונלי) ---
     test_logger = setup_logger("yahoo_scraper_test", level=logging.DEBUG)